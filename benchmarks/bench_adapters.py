@@ -0,0 +1,129 @@
+"""
+Round trips of a ping message over loopback connections, through the network adapters: the
+  asyncio TCP server and the Tornado websocket handler (skipped if Tornado is not installed).
+  Servers and clients run on the same event loop: an uvloop one if uvloop is installed (Tornado
+  runs on asyncio too).
+
+Two timings are reported per adapter: sequential round trips (each ping is sent when the
+  previous pong arrives) and pipelined ones (WINDOW pings are sent at once, and then their pongs
+  are awaited), both as time per message.
+
+Usage: python benchmarks/bench_adapters.py [count]
+"""
+import asyncio
+from common import main
+from bench_processor import NAMESPACE, PING, PingLayer
+from cantrips.protocol.asyncio.server import MessageProtocol, new_event_loop, serve
+from cantrips.protocol.messaging.formats import MsgPackTranslator
+from cantrips.protocol.messaging.framing import LengthPrefixedDecoder
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.messaging.metrics import clock
+
+
+WINDOW = 100
+
+
+class PingProtocol(MessageProtocol):
+    TRANSLATOR = MsgPackTranslator
+    LAYERS = [PingLayer]
+
+
+async def measure(send, receive, count):
+    """
+    Times count sequential round trips, and then count pipelined ones (in rounds of WINDOW).
+    """
+    start = clock()
+    for _ in range(count):
+        send(1)
+        await receive(1)
+    sequential = (clock() - start) / count
+    rounds = max(1, count // WINDOW)
+    start = clock()
+    for _ in range(rounds):
+        send(WINDOW)
+        await receive(WINDOW)
+    pipelined = (clock() - start) / (rounds * WINDOW)
+    return {'round_trip_ns': sequential, 'pipelined_ns': pipelined}
+
+
+async def bench_asyncio(data, count):
+    server = await serve(PingProtocol, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    decoder = LengthPrefixedDecoder()
+    frame = decoder.encode(data)
+
+    def send(amount):
+        writer.write(frame * amount)
+
+    async def receive(amount):
+        while amount > 0:
+            chunk = await reader.read(1 << 16)
+            if not chunk:
+                raise AssertionError("The server closed the connection")
+            amount -= len(decoder.feed(chunk))
+
+    try:
+        return dict(name='asyncio', **(await measure(send, receive, count)))
+    finally:
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+
+async def bench_tornado(data, count):
+    from tornado.httpserver import HTTPServer
+    from tornado.testing import bind_unused_port
+    from tornado.web import Application
+    from tornado.websocket import websocket_connect
+    from cantrips.protocol.tornado.websocket_server import MessageHandler
+
+    handler = type('PingHandler', (MessageHandler,), {'TRANSLATOR': MsgPackTranslator, 'LAYERS': [PingLayer]})
+    sock, port = bind_unused_port()
+    server = HTTPServer(Application([('/', handler, {'strict': True})]))
+    server.add_sockets([sock])
+    connection = await websocket_connect('ws://127.0.0.1:%d/' % port)
+
+    def send(amount):
+        for _ in range(amount):
+            connection.write_message(data, True)
+
+    async def receive(amount):
+        for _ in range(amount):
+            if await connection.read_message() is None:
+                raise AssertionError("The server closed the connection")
+
+    try:
+        return dict(name='tornado', **(await measure(send, receive, count)))
+    finally:
+        connection.close()
+        server.stop()
+
+
+async def bench_all(count):
+    data = MsgPackTranslator().serialize(Message(NAMESPACE, PING, 1, text='hello'))
+    results = [await bench_asyncio(data, count)]
+    try:
+        results.append(await bench_tornado(data, count))
+    except ImportError:
+        pass
+    for result in results:
+        result['bytes'] = len(data)
+    return results
+
+
+def run(count=10000):
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        results = loop.run_until_complete(bench_all(count))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    for result in results:
+        result['loop'] = type(loop).__module__
+    return {'benchmark': 'adapters', 'count': count, 'results': results}
+
+
+if __name__ == '__main__':
+    main(run)
@@ -0,0 +1,72 @@
+"""
+Dispatching a parsed message through N protocol layers: either the first layer handles
+  the command (the others do not handle it), or every layer forwards it to the next one
+  (returning CANNOT_HANDLE) until the last one handles it.
+
+Usage: python benchmarks/bench_dispatch.py [count]
+"""
+from common import main, ns_per_call, MemoryProcessor
+from cantrips.protocol.messaging.formats import CommandSpec, JSONTranslator
+from cantrips.protocol.messaging.layers import ProtocolLayer
+from cantrips.protocol.messaging.messages import Message
+
+
+NAMESPACE = CommandSpec('bench', 0x00000001)
+COMMAND = CommandSpec('dispatch', 0x00000001)
+OTHER = CommandSpec('other', 0x00000002)
+LAYER_COUNTS = (1, 4, 16)
+
+
+class HandlingLayer(ProtocolLayer):
+
+    def __init__(self, processor_class):
+        super(HandlingLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, COMMAND, self._handle)
+
+    def _handle(self, socket, message):
+        return True
+
+
+class ForwardingLayer(ProtocolLayer):
+
+    def __init__(self, processor_class):
+        super(ForwardingLayer, self).__init__(processor_class)
+        self.add_namespace_handler(NAMESPACE, self._forward)
+
+    def _forward(self, socket, message):
+        return self.CANNOT_HANDLE
+
+
+class UnrelatedLayer(ProtocolLayer):
+
+    def __init__(self, processor_class):
+        super(UnrelatedLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, OTHER, self._handle)
+
+    def _handle(self, socket, message):
+        return True
+
+
+def processor(layers):
+    return type('DispatchProcessor', (MemoryProcessor,), {'TRANSLATOR': JSONTranslator, 'LAYERS': layers})()
+
+
+def run(count=100000):
+    message = Message(NAMESPACE, COMMAND, 1, text='hello')
+    results = []
+    for layers in LAYER_COUNTS:
+        first = processor([HandlingLayer] + [UnrelatedLayer] * (layers - 1))
+        last = processor([ForwardingLayer] * (layers - 1) + [HandlingLayer])
+        results.append({
+            'name': 'first-of-%d' % layers,
+            'dispatch_ns': ns_per_call(lambda: first._dispatch(message), count),
+        })
+        results.append({
+            'name': 'forwarded-through-%d' % layers,
+            'dispatch_ns': ns_per_call(lambda: last._dispatch(message), count),
+        })
+    return {'benchmark': 'dispatch', 'count': count, 'results': results}
+
+
+if __name__ == '__main__':
+    main(run)
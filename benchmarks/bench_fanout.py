@@ -0,0 +1,69 @@
+"""
+Fanout of a chat message, as SayBroadcast does it: a user says something, gets a response,
+  and the message is sent to every other user. Users have in-memory processors.
+
+Usage: python benchmarks/bench_fanout.py [count]
+The count is the amount of messages said with 10 users: it is scaled down for more users.
+"""
+from common import main, ns_per_call, MemoryProcessor
+from cantrips.patterns.broadcast import IBroadcast
+from cantrips.protocol.messaging.formats import CommandSpec, JSONTranslator
+from cantrips.protocol.traits.user.base import UserBroadcast, UserEndpoint
+
+
+USER_COUNTS = (10, 1000, 10000)
+
+
+class ChatProcessor(MemoryProcessor):
+    TRANSLATOR = JSONTranslator
+    LAYERS = ()
+
+
+class ChatBroadcast(UserBroadcast):
+    """
+    A broadcast where every connected user is logged in and inside. command_say() does what
+      SayBroadcast does for an accepted message, without its access checks: only the
+      response and the fanout are measured.
+    """
+
+    SAY_NS = CommandSpec('say', 0x00000011)
+    SAY_CODE_SAID = CommandSpec('said', 0x00010001)
+    SAY_RESPONSE_NS = CommandSpec('notify', 0x80000001)
+    SAY_RESPONSE_CODE_RESPONSE = CommandSpec('response', 0x00000001)
+
+    def register(self, user, *args, **kwargs):
+        return self.list.insert(user)
+
+    def command_say(self, socket, message):
+        socket.send_message(self.SAY_RESPONSE_NS, self.SAY_RESPONSE_CODE_RESPONSE, result='ok', message=message)
+        others = IBroadcast.BROADCAST_FILTER_OTHERS(self.users()[socket.user])
+        self.broadcast((self.SAY_NS, self.SAY_CODE_SAID), user=socket.user.key, message=message, filter=others)
+
+
+def bench(users, count):
+    broadcast = ChatBroadcast('chat')
+    sockets = []
+    for index in range(users):
+        socket = ChatProcessor()
+        socket.user = broadcast.register(UserEndpoint('user-%d' % index, socket))
+        sockets.append(socket)
+    speaker = sockets[0]
+    elapsed = ns_per_call(lambda: broadcast.command_say(speaker, 'hello everybody'), count)
+    return {
+        'name': '%d-users' % users,
+        'say_ns': elapsed,
+        'per_recipient_ns': elapsed / max(users - 1, 1),
+        'sent': sum(socket.sent for socket in sockets),
+    }
+
+
+def run(count=2000):
+    return {
+        'benchmark': 'fanout',
+        'count': count,
+        'results': [bench(users, max(1, count * 10 // users)) for users in USER_COUNTS],
+    }
+
+
+if __name__ == '__main__':
+    main(run)
@@ -0,0 +1,40 @@
+"""
+Compares the formats on a fixed-shape command (a position update): encoded size, and
+  serialization and parsing time per message.
+
+Usage: python benchmarks/bench_formats.py [count]
+"""
+from common import main, ns_per_call
+from cantrips.protocol.messaging.formats import CommandSpec, JSONTranslator, MsgPackTranslator, \
+    CompactTranslator, StructTranslator
+from cantrips.protocol.messaging.messages import Message
+
+
+NAMESPACE = CommandSpec('game', 0x00000001)
+MOVE = CommandSpec('move', 0x00000001, schema='IIff')
+
+
+def bench(name, translator, count):
+    translator.namespace(NAMESPACE).add_command(MOVE)
+    message = Message(NAMESPACE, MOVE, 1234, 7, 10.5, -3.25)
+    data = translator.serialize(message)
+    return {
+        'name': name,
+        'bytes': len(data),
+        'serialize_ns': ns_per_call(lambda: translator.serialize(message), count),
+        'parse_ns': ns_per_call(lambda: translator.parse_data(data), count),
+    }
+
+
+def run(count=100000):
+    results = [
+        bench('json', JSONTranslator(), count),
+        bench('msgpack', MsgPackTranslator(), count),
+        bench('compact', CompactTranslator(), count),
+        bench('struct', StructTranslator(), count),
+    ]
+    return {'benchmark': 'formats', 'count': count, 'results': results}
+
+
+if __name__ == '__main__':
+    main(run)
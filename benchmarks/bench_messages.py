@@ -0,0 +1,72 @@
+"""
+Compares the slotted Message against the former Arguments-based implementation:
+  construction time, attribute access time, and memory per instance.
+
+Usage: python benchmarks/bench_messages.py [count]
+"""
+import gc
+import tracemalloc
+from common import main, ns_per_call
+from cantrips.types.arguments import Arguments
+from cantrips.protocol.messaging.messages import Message
+
+
+class LegacyPacket(Arguments):
+    """
+    The Packet implementation this library used before (an Arguments subclass).
+    """
+
+    def __init__(self, code, *args, **kwargs):
+        super(LegacyPacket, self).__init__(*args, **kwargs)
+        self.__code = code
+
+    @property
+    def code(self):
+        return self.__code
+
+    def __setattr__(self, key, value):
+        if key == '_LegacyPacket__code':
+            return object.__setattr__(self, key, value)
+        return super(LegacyPacket, self).__setattr__(key, value)
+
+
+class LegacyMessage(LegacyPacket):
+
+    def __init__(self, namespace, command, *args, **kwargs):
+        super(LegacyMessage, self).__init__((namespace, command), *args, **kwargs)
+
+
+def memory_per_instance(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del instances
+    return float(size) / count
+
+
+def bench(name, factory, count):
+    instance = factory()
+    return {
+        'name': name,
+        'construct_ns': ns_per_call(factory, count),
+        'access_ns': ns_per_call(lambda: (instance.code, instance.message, instance.args), count),
+        'bytes_per_instance': memory_per_instance(factory, count),
+    }
+
+
+def run(count=100000):
+    code = ('say', 'say')
+    results = [
+        bench('legacy', lambda: LegacyMessage('say', 'say', 1, message='hello', user='me'), count),
+        bench('slotted', lambda: Message('say', 'say', 1, message='hello', user='me'), count),
+        bench('slotted-build', lambda: Message.from_parts(code, (1,), {'message': 'hello', 'user': 'me'}), count),
+    ]
+    return {'benchmark': 'messages', 'count': count, 'results': results}
+
+
+if __name__ == '__main__':
+    main(run)
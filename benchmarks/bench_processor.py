@@ -0,0 +1,48 @@
+"""
+The whole receiving path (MessageProcessor._conn_message: parsing, dispatching, and the
+  handler sending a reply) on a processor writing to an in-memory fake transport.
+
+Usage: python benchmarks/bench_processor.py [count]
+"""
+from common import main, ns_per_call, MemoryProcessor
+from cantrips.protocol.messaging.formats import CommandSpec, JSONTranslator, MsgPackTranslator
+from cantrips.protocol.messaging.layers import ProtocolLayer
+from cantrips.protocol.messaging.messages import Message
+
+
+NAMESPACE = CommandSpec('bench', 0x00000001)
+PING = CommandSpec('ping', 0x00000001)
+PONG = CommandSpec('pong', 0x00000002)
+
+
+class PingLayer(ProtocolLayer):
+
+    def __init__(self, processor_class):
+        super(PingLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, PING, self._ping)
+        self.processor_class.feed_translator(NAMESPACE, PONG)
+
+    def _ping(self, socket, message):
+        socket.send_message(NAMESPACE, PONG, *message.args, **message.kwargs)
+
+
+def bench(name, translator_class, count):
+    processor = type('PingProcessor', (MemoryProcessor,), {'TRANSLATOR': translator_class, 'LAYERS': [PingLayer]})()
+    binary = processor.TRANSLATOR.format != processor.TRANSLATOR.format.FORMAT_STRING
+    data = processor.TRANSLATOR.serialize(Message(NAMESPACE, PING, 1, text='hello'))
+    elapsed = ns_per_call(lambda: processor._conn_message(data, binary), count)
+    if processor.sent != count or processor.closed is not None:
+        raise AssertionError("Unexpected processing result: %d replies, closed: %r" % (processor.sent, processor.closed))
+    return {'name': name, 'bytes': len(data), 'round_trip_ns': elapsed}
+
+
+def run(count=50000):
+    return {
+        'benchmark': 'processor',
+        'count': count,
+        'results': [bench('json', JSONTranslator, count), bench('msgpack', MsgPackTranslator, count)],
+    }
+
+
+if __name__ == '__main__':
+    main(run)
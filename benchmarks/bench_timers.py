@@ -0,0 +1,108 @@
+"""
+Threaded timeouts: a started threading.Timer per timeout (one thread each, like the former
+  ThreadedTimeout) against the shared TimerService (one thread for all of them).
+
+For each implementation, `count` timers are started and cancelled (start_ns, cancel_ns,
+  per timer), and then `count` timers are started to fire after DELAY seconds (fire_ns: per
+  timer, since the first one was due until the last one ran; late_*_ns: percentiles of the
+  lateness of the timers). Since each threading.Timer is a thread, at most THREADS_LIMIT
+  of them are created at once: see the `timers` field of each result.
+
+Usage: python benchmarks/bench_timers.py [count]
+"""
+import threading
+from common import main
+from cantrips.protocol.messaging.metrics import clock, LatencyHistogram
+from cantrips.task.scheduler import TimerService
+
+
+THREADS_LIMIT = 2000
+DELAY = 0.2
+
+
+class ThreadTimers(object):
+    name = 'threading-timer'
+
+    def schedule(self, seconds, callback):
+        timer = threading.Timer(seconds, callback)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def cancel(self, timer):
+        timer.cancel()
+
+    def close(self):
+        pass
+
+
+class ServiceTimers(object):
+    name = 'timer-service'
+
+    def __init__(self):
+        self.service = TimerService()
+
+    def schedule(self, seconds, callback):
+        return self.service.schedule(seconds, callback)
+
+    def cancel(self, entry):
+        self.service.cancel(entry)
+
+    def close(self):
+        self.service.stop()
+
+
+def bench(timers, count):
+    started = clock()
+    entries = [timers.schedule(60, lambda: None) for index in range(count)]
+    scheduled = clock()
+    for entry in entries:
+        timers.cancel(entry)
+    cancelled = clock()
+    peak_threads = threading.active_count()
+    del entries
+
+    lateness = LatencyHistogram()
+    done = threading.Event()
+    remaining = [count]
+    lock = threading.Lock()
+    delay = int(DELAY * 1e9)
+
+    def fire(due):
+        lateness.record(clock() - due)
+        with lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                done.set()
+
+    first_due = clock() + delay
+    for index in range(count):
+        timers.schedule(DELAY, lambda due=clock() + delay: fire(due))
+    done.wait(60)
+    finished = clock()
+    timers.close()
+    return {
+        'name': timers.name,
+        'timers': count,
+        'start_ns': float(scheduled - started) / count,
+        'cancel_ns': float(cancelled - scheduled) / count,
+        'fire_ns': float(finished - first_due) / count,
+        'late_p50_ns': lateness.percentile(50),
+        'late_p99_ns': lateness.percentile(99),
+        'peak_threads': peak_threads,
+    }
+
+
+def run(count=100000):
+    return {
+        'benchmark': 'timers',
+        'count': count,
+        'results': [
+            bench(ThreadTimers(), min(count, THREADS_LIMIT)),
+            bench(ServiceTimers(), count),
+        ],
+    }
+
+
+if __name__ == '__main__':
+    main(run)
@@ -0,0 +1,48 @@
+"""
+Translator.serialize and Translator.parse_data, for the json and msgpack formats, across
+  payload sizes (few scalar arguments, a medium list of records, and a large text).
+
+Usage: python benchmarks/bench_translator.py [count]
+"""
+from common import main, ns_per_call
+from cantrips.protocol.messaging.formats import CommandSpec, JSONTranslator, MsgPackTranslator
+from cantrips.protocol.messaging.messages import Message
+
+
+NAMESPACE = CommandSpec('bench', 0x00000001)
+COMMAND = CommandSpec('payload', 0x00000001)
+
+PAYLOADS = (
+    ('small', (1, 'hello'), {'user': 'someone'}),
+    ('medium', (), {'users': [{'key': 'user-%d' % index, 'level': index, 'online': True} for index in range(50)]}),
+    ('large', (), {'history': ['message number %d, sent by someone' % index for index in range(2000)]}),
+)
+
+
+def bench(name, translator, count):
+    translator.namespace(NAMESPACE).add_command(COMMAND)
+    results = []
+    for size, args, kwargs in PAYLOADS:
+        message = Message(NAMESPACE, COMMAND, *args, **kwargs)
+        data = translator.serialize(message)
+        # Larger payloads are run fewer times, so each case takes a similar time.
+        times = max(1, count * 32 // max(len(data), 32))
+        results.append({
+            'name': '%s-%s' % (name, size),
+            'bytes': len(data),
+            'serialize_ns': ns_per_call(lambda: translator.serialize(message), times),
+            'parse_ns': ns_per_call(lambda: translator.parse_data(data), times),
+        })
+    return results
+
+
+def run(count=20000):
+    return {
+        'benchmark': 'translator',
+        'count': count,
+        'results': bench('json', JSONTranslator(), count) + bench('msgpack', MsgPackTranslator(), count),
+    }
+
+
+if __name__ == '__main__':
+    main(run)
@@ -0,0 +1,44 @@
+"""
+Helpers shared by the benchmarks: timing, an in-memory processor, and the JSON output.
+
+Each bench_*.py module has a run(count) function returning a dict like
+  {'benchmark': name, 'count': count, 'results': [{'name': ..., <metric>: <value>, ...}, ...]}
+  and may be run alone (python benchmarks/bench_<name>.py [count]). See run.py to run them all.
+"""
+import json
+import sys
+import timeit
+from cantrips.protocol.messaging.processor import MessageProcessor
+
+
+def ns_per_call(func, count):
+    """
+    Runs func() count times, and returns the average time per call, in nanoseconds.
+    """
+    return timeit.timeit(func, number=count) * 1e9 / count
+
+
+class MemoryProcessor(MessageProcessor):
+    """
+    A processor writing to an in-memory fake transport: sent data is only counted.
+    """
+
+    def __init__(self, strict=True):
+        super(MemoryProcessor, self).__init__(strict=strict)
+        self.sent = 0
+        self.sent_bytes = 0
+        self.closed = None
+
+    def _conn_send(self, data, binary=None):
+        self.sent += 1
+        self.sent_bytes += len(data)
+
+    def _conn_close(self, code, reason=''):
+        self.closed = code
+
+
+def main(run):
+    """
+    Runs a benchmark module from the command line: an optional count may be given.
+    """
+    print(json.dumps(run(*[int(arg) for arg in sys.argv[1:2]]), indent=2))
@@ -0,0 +1,122 @@
+"""
+Runs the benchmarks (every bench_*.py module in this directory), printing a single JSON
+  object with the environment (python, platform, git commit) and the results of each one.
+  Modules failing to import are skipped, and reported (with the error) in `skipped`.
+
+Usage: python benchmarks/run.py [--only NAME ...] [--scale FACTOR] [--output FILE]
+                                [--compare BASELINE_FILE] [--tolerance RATIO]
+
+With --compare, the timings (metrics ending with _ns) are compared against the ones of a
+  previous output file, and the regressions (slower by more than the tolerance ratio, by
+  default 0.1) are reported. The exit status is 1 if there are regressions.
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def available():
+    return sorted(os.path.basename(path)[6:-3] for path in glob.glob(os.path.join(HERE, 'bench_*.py')))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.STDOUT).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(names, scale):
+    benchmarks = []
+    skipped = {}
+    for name in names:
+        try:
+            run = importlib.import_module('bench_' + name).run
+        except (ImportError, SyntaxError) as e:
+            # e.g. a module needing an optional dependency, or a newer Python (async def
+            #   is a SyntaxError in Python 2): the other ones still run.
+            sys.stderr.write("Skipping %s: %s\n" % (name, e))
+            skipped[name] = str(e)
+            continue
+        count = max(1, int(run.__defaults__[0] * scale))
+        sys.stderr.write("Running %s (count=%d)...\n" % (name, count))
+        benchmarks.append(run(count))
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'commit': git_commit(),
+        'timestamp': int(time.time()),
+        'benchmarks': benchmarks,
+        'skipped': skipped,
+    }
+
+
+def timings(report):
+    """
+    Flattens a report as {(benchmark, result, metric): value}, for the timing metrics.
+    """
+    return dict(((benchmark['benchmark'], result['name'], metric), value)
+                for benchmark in report['benchmarks']
+                for result in benchmark['results']
+                for metric, value in result.items() if metric.endswith('_ns'))
+
+
+def compare(report, baseline, tolerance):
+    """
+    Lists the timings being slower than in the baseline by more than the tolerance ratio.
+    """
+    previous = timings(baseline)
+    regressions = []
+    for key, value in sorted(timings(report).items()):
+        if key in previous and previous[key] and value > previous[key] * (1 + tolerance):
+            regressions.append({
+                'benchmark': key[0],
+                'name': key[1],
+                'metric': key[2],
+                'baseline': previous[key],
+                'current': value,
+                'ratio': value / previous[key],
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the messaging benchmarks.")
+    parser.add_argument('--only', nargs='+', choices=available(), default=available(),
+                        help="Benchmarks to run (by default: all).")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Factor for the default iteration counts (e.g. 0.1 for a quick run).")
+    parser.add_argument('--output', help="File to write the results to (by default: standard output).")
+    parser.add_argument('--compare', help="A previous results file to compare the timings against.")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Allowed slowdown ratio when comparing (default: 0.1).")
+    args = parser.parse_args()
+
+    report = run_all(args.only, args.scale)
+    if args.compare:
+        with open(args.compare) as baseline:
+            report['regressions'] = compare(report, json.load(baseline), args.tolerance)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as stream:
+            stream.write(output + '\n')
+    else:
+        print(output)
+    if report.get('regressions'):
+        sys.stderr.write("%d timings regressed beyond the tolerance.\n" % len(report['regressions']))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+try:
+    import asyncio
+except:
+    raise ImportError("You need python 3.4 or newer for this to work")
+from cantrips.protocol.messaging.processor import MessageProcessor
+from cantrips.protocol.messaging.framing import FrameDecoder, LengthPrefixedDecoder, MsgPackStreamDecoder
+from cantrips.task.features import UvloopFeature
+from cantrips.task.timed import AsyncioTimingWheel, WheelTimeout
+
+
+class MessageProtocol(asyncio.Protocol, MessageProcessor):
+    """
+    This handler formats the messages using json. Messages
+      must match a certain specification defined in the
+      derivated classes.
+
+    Since TCP is a stream (chunks may split or join messages),
+      messages are delimited using FRAME_DECODER (by default,
+      length-prefixed frames). Frames larger than MAX_FRAME_SIZE
+      close the connection.
+
+    Outbound backpressure follows the flow control of the
+      transport (pause_writing/resume_writing), whose buffer
+      limits may be set with WRITE_BUFFER_LIMITS (a (high, low)
+      tuple; None keeps the ones of the loop).
+    """
+
+    FRAME_DECODER = LengthPrefixedDecoder
+    MAX_FRAME_SIZE = 1 << 20
+    WRITE_BUFFER_LIMITS = None
+
+    def __init__(self, strict=False, loop=None):
+        """
+        Initializes the protocol, stating whether, upon
+          the invalid messages can be processed by the
+          user or must be processed automatically.
+
+        Timeouts use the given loop or, if None, the
+          current one.
+        """
+
+        MessageProcessor.__init__(self, strict=strict)
+        self._loop = loop or asyncio.get_event_loop()
+        self.transport = None
+        if issubclass(self.FRAME_DECODER, MsgPackStreamDecoder):
+            options = dict(self.TRANSLATOR.format.unpacker_options)
+            if self.MSGPACK_PER_CONNECTION:
+                options.update(self.MSGPACK_UNPACKER_OPTIONS)
+            self._decoder = self.FRAME_DECODER(self.MAX_FRAME_SIZE, options)
+        else:
+            self._decoder = self.FRAME_DECODER(self.MAX_FRAME_SIZE)
+
+    def _conn_close(self, code, reason=''):
+        self._conn_send(self.TRANSLATOR.broker.dumps({'code': code, 'reason': reason}))
+        # Buffered data is still written before the socket is closed.
+        return self.transport.close()
+
+    def _conn_send(self, data, binary=None):
+        if self.transport.is_closing():
+            return None
+        return self.transport.write(self._decoder.encode(data))
+
+    def _conn_pause_reading(self):
+        self.transport.pause_reading()
+
+    def _conn_resume_reading(self):
+        self.transport.resume_reading()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self.WRITE_BUFFER_LIMITS:
+            high, low = self.WRITE_BUFFER_LIMITS
+            transport.set_write_buffer_limits(high, low)
+        self._conn_made()
+
+    def connection_lost(self, exc):
+        # Nothing else may be written: queued data is discarded.
+        self._outbound_closed = True
+        self._outbound.clear()
+        self.outbound_bytes = 0
+        self._conn_lost()
+
+    def pause_writing(self):
+        self._conn_write_paused()
+
+    def resume_writing(self):
+        self._conn_write_resumed()
+
+    def data_received(self, data):
+        try:
+            frames = self._decoder.feed(data)
+        except FrameDecoder.Error as e:
+            if e.code == FrameDecoder.Error.MALFORMED_STREAM:
+                # The decoder cannot resume after malformed data: the connection is closed even
+                #   if it is not strict.
+                if self.METRICS_SINK is not None:
+                    self.METRICS_SINK.error(self, 1003)
+                self._close_invalid_format(data)
+            else:
+                self._forceful_close(1009, "Frame too large")
+            return
+
+        if self._decoder.DECODED:
+            for payload in frames:
+                if not self._conn_payload(payload):
+                    break
+        else:
+            for frame in frames:
+                if not self._conn_message(frame):
+                    break
+
+    def _create_timeout(self, seconds, callback):
+        return WheelTimeout(AsyncioTimingWheel.shared(self._loop), seconds, callback)
+
+    def _call_later(self, seconds, callback):
+        return self._loop.call_later(seconds, callback)
+
+    def _conn_future(self, awaitable):
+        return asyncio.ensure_future(awaitable, loop=self._loop)
+
+    def _conn_wrap_future(self, future, then):
+        wrapped = self._loop.create_future()
+
+        def transfer(done):
+            if wrapped.cancelled():
+                return
+            try:
+                wrapped.set_result(then(done.result()))
+            except Exception as e:
+                wrapped.set_exception(e)
+
+        future.add_done_callback(lambda done: self._loop.call_soon_threadsafe(transfer, done))
+        return wrapped
+
+
+def new_event_loop():
+    """
+    Creates an event loop: an uvloop one, if uvloop is installed, or a standard asyncio one.
+    """
+
+    try:
+        return UvloopFeature.import_it().new_event_loop()
+    except UvloopFeature.Error:
+        return asyncio.new_event_loop()
+
+
+def serve(protocol_factory, host=None, port=None, loop=None, **kwargs):
+    """
+    Creates a TCP server whose connections are handled by protocols created by protocol_factory
+      (e.g. a MessageProtocol subclass, or a function creating instances of it). Extra arguments
+      are passed to loop.create_server (e.g. ssl, backlog, reuse_port).
+
+    It must be awaited (or run until complete in the loop) to get the asyncio Server object.
+    """
+
+    loop = loop or asyncio.get_event_loop()
+    return loop.create_server(protocol_factory, host, port, **kwargs)
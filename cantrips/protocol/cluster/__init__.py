@@ -0,0 +1 @@
+__author__ = 'luismasuelli'
\ No newline at end of file
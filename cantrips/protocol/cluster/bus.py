@@ -0,0 +1,272 @@
+import os
+import errno
+import socket
+import logging
+from six.moves import cPickle as pickle
+from cantrips.types.exception import factory
+from cantrips.protocol.cluster.features import AsyncioReaderFeature, TornadoReaderFeature, TwistedReaderFeature
+
+logger = logging.getLogger("cantrips.protocol.cluster.bus")
+
+
+class Bus(object):
+    """
+    Carries calls among the workers of a server (see cantrips.protocol.cluster.workers).
+      Calls are published to a channel (any hashable, picklable value) and run by the
+      handler subscribed to such channel in every other worker, or in a single worker if
+      one is given. Arguments must be picklable.
+
+    Delivery is not guaranteed: calls are dropped (and counted) when a worker cannot
+      receive them, instead of blocking the publisher.
+
+    Subclasses implement the transport (_send) and call _deliver(data) for each
+      received call.
+    """
+
+    Error = factory(['INVALID_WORKER', 'CALL_TOO_LARGE'])
+
+    def __init__(self, worker=0, workers=1):
+        if not 0 <= worker < workers:
+            raise self.Error("Worker %r is not in range(%d)" % (worker, workers), self.Error.INVALID_WORKER)
+        self.worker = worker
+        self.workers = workers
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self._handlers = {}
+
+    def subscribe(self, channel, handler):
+        """
+        Sets the handler (a callable accepting the published arguments) of a channel.
+        """
+        self._handlers[channel] = handler
+
+    def unsubscribe(self, channel):
+        self._handlers.pop(channel, None)
+
+    def publish(self, channel, *args, **kwargs):
+        """
+        Publishes a call to the other workers (or to the worker given as `worker` keyword
+          argument, which may be this one). Other keyword arguments are given to the handler.
+        """
+        worker = kwargs.pop('worker', None)
+        if worker is not None and not 0 <= worker < self.workers:
+            raise self.Error("Worker %r is not in range(%d)" % (worker, self.workers), self.Error.INVALID_WORKER)
+        data = pickle.dumps((channel, args, kwargs), pickle.HIGHEST_PROTOCOL)
+        self.published += 1
+        if worker == self.worker:
+            self._deliver(data)
+        else:
+            self._send(data, worker)
+
+    def _send(self, data, worker):
+        """
+        Sends encoded data to a worker, or to every other worker if worker is None.
+        """
+        raise NotImplementedError
+
+    def _deliver(self, data):
+        """
+        Runs a received call. Errors are logged, not raised: they must not stop the
+          delivery of the remaining calls.
+        """
+        self.received += 1
+        try:
+            channel, args, kwargs = pickle.loads(data)
+        except Exception:
+            logger.exception("Worker %d received a call it cannot decode", self.worker)
+            return
+        handler = self._handlers.get(channel)
+        if handler is not None:
+            try:
+                handler(*args, **kwargs)
+            except Exception:
+                logger.exception("Worker %d failed running a call to channel %r", self.worker, channel)
+
+    def close(self):
+        pass
+
+
+class LocalBus(Bus):
+    """
+    A bus connecting instances in the same process (e.g. to test clustered broadcasts with
+      many nodes, or to run them in a single process). Calls are still pickled, and they are
+      run synchronously, inside publish(). Create them with LocalBus.group(workers).
+    """
+
+    @classmethod
+    def group(cls, workers):
+        """
+        Creates the connected buses of `workers` nodes.
+        """
+        hub = {}
+        return [cls(hub, worker, workers) for worker in range(workers)]
+
+    def __init__(self, hub, worker=0, workers=1):
+        super(LocalBus, self).__init__(worker, workers)
+        self._hub = hub
+        hub[worker] = self
+
+    def _send(self, data, worker):
+        targets = range(self.workers) if worker is None else (worker,)
+        for target in targets:
+            if target == self.worker:
+                continue
+            bus = self._hub.get(target)
+            if bus is None:
+                self.dropped += 1
+            else:
+                bus._deliver(data)
+
+    def close(self):
+        if self._hub.get(self.worker) is self:
+            del self._hub[self.worker]
+
+
+class UnixBus(Bus):
+    """
+    A bus made of Unix datagram sockets: each worker binds one, named after its index, in a
+      private directory. Each call takes a single datagram, so its size is limited by the
+      system (usually around 200KB: see net.core.wmem_default).
+
+    Sockets are non-blocking: receive() must be invoked when the socket is readable (see the
+      *BusReader classes), and calls to a worker whose socket buffer is full are dropped.
+    """
+
+    MAX_CALL_SIZE = 1 << 18
+
+    def __init__(self, directory, worker=0, workers=1):
+        super(UnixBus, self).__init__(worker, workers)
+        self.directory = directory
+        self._path = self.path(worker)
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self._path)
+        self._socket.setblocking(False)
+        self._buffer = bytearray(self.MAX_CALL_SIZE)
+
+    def path(self, worker):
+        return os.path.join(self.directory, 'worker-%d.sock' % worker)
+
+    def fileno(self):
+        return self._socket.fileno()
+
+    def _send(self, data, worker):
+        if len(data) > self.MAX_CALL_SIZE:
+            raise self.Error("Call size (%d) exceeds the allowed maximum (%d)" % (len(data), self.MAX_CALL_SIZE),
+                             self.Error.CALL_TOO_LARGE)
+        targets = range(self.workers) if worker is None else (worker,)
+        for target in targets:
+            if target == self.worker:
+                continue
+            try:
+                self._socket.sendto(data, self.path(target))
+            except socket.error as e:
+                # Full buffers, and workers not running, drop the call.
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ECONNREFUSED, errno.ENOENT):
+                    raise
+                self.dropped += 1
+
+    def receive(self):
+        """
+        Runs every call received so far.
+        """
+        view = memoryview(self._buffer)
+        while True:
+            try:
+                size = self._socket.recv_into(self._buffer)
+            except socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            self._deliver(view[:size])
+
+    def detach(self):
+        """
+        Closes the socket, but keeps its file (e.g. in processes other than the worker owning it).
+        """
+        self._socket.close()
+
+    def close(self):
+        self._socket.close()
+        try:
+            os.unlink(self._path)
+        except OSError:
+            pass
+
+
+class BusReader(object):
+    """
+    Runs the calls a bus receives, as they arrive in the event loop.
+    """
+
+    def __init__(self, bus):
+        self._bus = bus
+        self._reader = None
+
+    def _add(self, fd, callback):
+        raise NotImplementedError
+
+    def _remove(self, reader):
+        raise NotImplementedError
+
+    def start(self):
+        if self._reader is None:
+            self._reader = self._add(self._bus.fileno(), self._bus.receive)
+
+    def stop(self):
+        if self._reader is not None:
+            self._remove(self._reader)
+            self._reader = None
+
+
+class AsyncioBusReader(BusReader):
+    """
+    Bus readers implemented in asyncio.
+    """
+
+    def __init__(self, loop, bus):
+        self.__add_reader, self.__remove_reader = AsyncioReaderFeature.import_it()
+        self.__loop = loop
+        super(AsyncioBusReader, self).__init__(bus)
+
+    def _add(self, fd, callback):
+        return self.__add_reader(self.__loop, fd, callback)
+
+    def _remove(self, reader):
+        self.__remove_reader(self.__loop, reader)
+
+
+class TornadoBusReader(BusReader):
+    """
+    Bus readers implemented in Tornado.
+    """
+
+    def __init__(self, ioloop, bus):
+        self.__add_reader, self.__remove_reader = TornadoReaderFeature.import_it()
+        self.__ioloop = ioloop
+        super(TornadoBusReader, self).__init__(bus)
+
+    def _add(self, fd, callback):
+        return self.__add_reader(self.__ioloop, fd, callback)
+
+    def _remove(self, reader):
+        self.__remove_reader(self.__ioloop, reader)
+
+
+class TwistedBusReader(BusReader):
+    """
+    Bus readers implemented in Twisted.
+    """
+
+    def __init__(self, reactor, bus):
+        self.__add_reader, self.__remove_reader = TwistedReaderFeature.import_it()
+        self.__reactor = reactor
+        super(TwistedBusReader, self).__init__(bus)
+
+    def _add(self, fd, callback):
+        return self.__add_reader(self.__reactor, fd, callback)
+
+    def _remove(self, reader):
+        self.__remove_reader(self.__reactor, reader)
@@ -0,0 +1,112 @@
+from cantrips.features import Feature
+
+
+class AsyncioReaderFeature(Feature):
+    """
+    Feature - Watching file descriptors in asyncio.
+    """
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports stuff related to add_reader and remove_reader.
+        Returns a pair of functions
+        """
+        import asyncio
+
+        def add_reader(loop, fd, callback):
+            loop.add_reader(fd, callback)
+            return fd
+
+        def remove_reader(loop, reader):
+            loop.remove_reader(reader)
+
+        return add_reader, remove_reader
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for asyncio not found.
+        """
+        return "You need python 3.4 or newer for this to work"
+
+
+class TornadoReaderFeature(Feature):
+    """
+    Feature - Watching file descriptors in Tornado.
+    """
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports stuff related to add_handler and remove_handler.
+        Returns a pair of functions
+        """
+        from tornado.ioloop import IOLoop
+
+        def add_reader(ioloop, fd, callback):
+            ioloop.add_handler(fd, lambda fd, events: callback(), IOLoop.READ)
+            return fd
+
+        def remove_reader(ioloop, reader):
+            ioloop.remove_handler(reader)
+
+        return add_reader, remove_reader
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for tornado.ioloop.IOLoop not found.
+        """
+        return "You need to install tornado for this to work (pip install tornado==4.0.2)"
+
+
+class TwistedReaderFeature(Feature):
+    """
+    Feature - Watching file descriptors in Twisted.
+    """
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports stuff related to addReader and removeReader.
+        Returns a pair of functions
+        """
+        from zope.interface import implementer
+        from twisted.internet.interfaces import IReadDescriptor
+
+        @implementer(IReadDescriptor)
+        class Reader(object):
+
+            def __init__(self, fd, callback):
+                self._fd = fd
+                self._callback = callback
+
+            def fileno(self):
+                return self._fd
+
+            def doRead(self):
+                self._callback()
+
+            def connectionLost(self, reason):
+                pass
+
+            def logPrefix(self):
+                return 'Bus'
+
+        def add_reader(reactor, fd, callback):
+            reader = Reader(fd, callback)
+            reactor.addReader(reader)
+            return reader
+
+        def remove_reader(reactor, reader):
+            reactor.removeReader(reader)
+
+        return add_reader, remove_reader
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for twisted.internet.interfaces not found.
+        """
+        return "You need to install twisted framework for this to work (pip install twisted==14.0.2)"
@@ -0,0 +1,73 @@
+import struct
+import hashlib
+from bisect import bisect, insort
+from cantrips.types.exception import factory
+
+
+class HashRing(object):
+    """
+    Consistent hashing of keys among nodes (any hashable value with a stable string
+      representation, e.g. worker indices). Each node takes `replicas` points in the ring,
+      and a key belongs to the node of the first point after the hash of the key.
+
+    Adding or removing a node only moves the keys of the points it takes or gives back
+      (around 1/N of them), so the other nodes keep their keys.
+    """
+
+    Error = factory(['EMPTY_RING'])
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._nodes = set()
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value):
+        return struct.unpack('>Q', hashlib.md5(('%s' % (value,)).encode('utf-8')).digest()[:8])[0]
+
+    @property
+    def nodes(self):
+        return frozenset(self._nodes)
+
+    def add(self, node):
+        """
+        Adds a node to the ring. Returns whether it was not already there.
+        """
+        if node in self._nodes:
+            return False
+        self._nodes.add(node)
+        for replica in range(self.replicas):
+            point = self._hash('%s#%d' % (node, replica))
+            if point not in self._owners:
+                self._owners[point] = node
+                insort(self._points, point)
+        return True
+
+    def remove(self, node):
+        """
+        Removes a node from the ring. Returns whether it was there.
+        """
+        if node not in self._nodes:
+            return False
+        self._nodes.discard(node)
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = dict((point, owner) for point, owner in self._owners.items() if owner != node)
+        return True
+
+    def node_for(self, key):
+        """
+        Gets the node owning a key.
+        """
+        if not self._points:
+            raise self.Error("The ring has no nodes", self.Error.EMPTY_RING)
+        index = bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def __contains__(self, node):
+        return node in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
@@ -0,0 +1,130 @@
+import shutil
+import signal
+import socket
+import tempfile
+import multiprocessing
+from cantrips.protocol.cluster.bus import UnixBus
+
+
+def reuseport_socket(port, address='', backlog=128, family=socket.AF_INET):
+    """
+    Creates a non-blocking listening TCP socket with SO_REUSEPORT: many processes may have
+      their own socket on the same port, and the kernel balances the incoming connections
+      among them (Linux 3.9+).
+
+    Serve on it with: HTTPServer.add_sockets([sock]) in Tornado, reactor.adoptStreamPort(
+      sock.fileno(), sock.family, factory) in Twisted (closing sock afterwards), or
+      loop.create_server(factory, sock=sock) in asyncio.
+    """
+
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise OSError("SO_REUSEPORT is not supported in this platform")
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((address, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+class WorkerPool(object):
+    """
+    Runs a server in many worker processes (by default, one per CPU), each one serving its own
+      connections on the same port (see reuseport_socket) and running its own event loop.
+
+    Each worker runs target(worker, bus, sock) where `worker` is its index, `bus` is its
+      UnixBus to reach the other workers (start a *BusReader for it, and attach it to the
+      broadcasts: see cantrips.protocol.traits.user.cluster), and `sock` is its listening
+      socket. The target serves until the worker is terminated.
+
+    Buses are created before the workers start, so no published call is lost because the
+      target worker is still starting. If port is 0, a free port is chosen (see the port
+      attribute after start()). Workers are forked: this needs Linux (or another Unix
+      supporting SO_REUSEPORT).
+    """
+
+    def __init__(self, target, port, address='', workers=None, backlog=128):
+        self.target = target
+        self.port = port
+        self.address = address
+        self.workers = workers or multiprocessing.cpu_count()
+        self.backlog = backlog
+        self.directory = None
+        self.processes = []
+        self._reserved = None
+
+    def _reserve_port(self):
+        """
+        Binds (but does not listen on) a socket to keep the port: the kernel does not send
+          connections to it, but other processes could not take the port meanwhile.
+        """
+        self._reserved = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._reserved.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._reserved.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self._reserved.bind((self.address, self.port))
+        self.port = self._reserved.getsockname()[1]
+
+    def _run(self, worker, buses):
+        """
+        Runs in the worker process.
+        """
+        self._reserved.close()
+        for other in buses:
+            if other is not buses[worker]:
+                other.detach()
+        bus = buses[worker]
+        try:
+            self.target(worker, bus, reuseport_socket(self.port, self.address, self.backlog))
+        finally:
+            bus.close()
+
+    def start(self):
+        self._reserve_port()
+        self.directory = tempfile.mkdtemp(prefix='cantrips-bus-')
+        buses = [UnixBus(self.directory, worker, self.workers) for worker in range(self.workers)]
+        context = multiprocessing.get_context('fork')
+        for worker in range(self.workers):
+            process = context.Process(target=self._run, args=(worker, buses), name='worker-%d' % worker)
+            process.start()
+            self.processes.append(process)
+        for bus in buses:
+            bus.detach()
+
+    def join(self, timeout=None):
+        for process in self.processes:
+            process.join(timeout)
+
+    def stop(self, timeout=5):
+        """
+        Terminates the workers (with SIGTERM), and removes the buses.
+        """
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        self.join(timeout)
+        self.processes = []
+        if self._reserved is not None:
+            self._reserved.close()
+            self._reserved = None
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+    def run(self):
+        """
+        Starts the workers and waits for them, stopping them on SIGINT or SIGTERM.
+        """
+
+        def terminate(signum, frame):
+            raise KeyboardInterrupt
+
+        self.start()
+        previous = signal.signal(signal.SIGTERM, terminate)
+        try:
+            self.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            self.stop()
@@ -0,0 +1,50 @@
+class CompressionStats(object):
+    """
+    Counts the sent messages and bytes of a connection, telling apart the ones sent with
+      (permessage-deflate) compression. The ratio is computed only for the compressed
+      messages: compressed bytes / original bytes (lower is better).
+    """
+
+    __slots__ = ('messages', 'bytes', 'compressed_messages', 'compressed_input_bytes', 'compressed_output_bytes')
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.compressed_messages = 0
+        self.compressed_input_bytes = 0
+        self.compressed_output_bytes = 0
+
+    def record(self, size, compressed_size=None):
+        """
+        Counts a sent message.
+        :param size: The size of the message, before compression.
+        :param compressed_size: The size of the compressed message, or None if it was sent uncompressed.
+        """
+        self.messages += 1
+        self.bytes += size
+        if compressed_size is not None:
+            self.compressed_messages += 1
+            self.compressed_input_bytes += size
+            self.compressed_output_bytes += compressed_size
+
+    @property
+    def ratio(self):
+        if not self.compressed_input_bytes:
+            return 1.0
+        return float(self.compressed_output_bytes) / self.compressed_input_bytes
+
+    @property
+    def saved_bytes(self):
+        return self.compressed_input_bytes - self.compressed_output_bytes
+
+    def as_dict(self):
+        return {
+            'messages': self.messages,
+            'bytes': self.bytes,
+            'compressed_messages': self.compressed_messages,
+            'compressed_input_bytes': self.compressed_input_bytes,
+            'compressed_output_bytes': self.compressed_output_bytes,
+            'saved_bytes': self.saved_bytes,
+            'ratio': self.ratio,
+        }
+
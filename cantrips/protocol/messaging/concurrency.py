@@ -0,0 +1,48 @@
+from collections import deque
+
+
+class HandlerLimiter(object):
+    """
+    Limits the amount of asynchronous handlers pending at once among many processors (see
+      MessageProcessor.HANDLERS_LIMITER): an instance is shared by them. Only handlers returning
+      awaitables take slots. Processors having messages waiting for a free slot are resumed, in
+      order, as slots are released.
+
+    Not thread-safe: processors sharing an instance must run in the same event loop.
+    """
+
+    def __init__(self, limit):
+        if limit < 1:
+            raise ValueError("The limit must be a positive integer")
+        self.limit = limit
+        self.pending = 0
+        self._waiting = deque()
+        self._queued = set()
+
+    def full(self):
+        return self.pending >= self.limit
+
+    def acquire(self):
+        self.pending += 1
+
+    def release(self):
+        self.pending -= 1
+        waiting = self._waiting
+        while waiting and self.pending < self.limit:
+            processor = waiting.popleft()
+            self._queued.discard(processor)
+            processor._resume_handlers()
+
+    def wait(self, processor):
+        """
+        Enqueues a processor to be resumed when a slot is released. A processor is enqueued
+          at most once.
+        """
+        if processor not in self._queued:
+            self._queued.add(processor)
+            self._waiting.append(processor)
+
+    def discard(self, processor):
+        if processor in self._queued:
+            self._queued.discard(processor)
+            self._waiting.remove(processor)
@@ -1,9 +1,12 @@
 from cantrips.features import Feature
 from cantrips.types.exception import factory
 from collections import namedtuple
+from functools import partial
 from enum import Enum
+from six import PY2, integer_types, string_types
 import json
-from cantrips.protocol.messaging import Message
+import struct
+from cantrips.protocol.messaging.messages import Message, LazyMessage
 
 _32bits = (1 << 32) - 1
 
@@ -24,14 +27,214 @@ class MsgPackFeature(Feature):
         """
         Message error for msgpack not found.
         """
-        return "You need to install msgpack for this to work (pip install msgpack-python>=0.4.6)"
+        return "You need to install msgpack for this to work (pip install msgpack>=0.5.2)"
+
+
+class MsgPackBroker(object):
+    """
+    An object with dumps() and loads() for msgpack formats, keeping a Packer and a streaming
+      Unpacker instead of creating the packing/unpacking state on each call. It is intended
+      to be owned by a single connection (see MessageProcessor.MSGPACK_PER_CONNECTION), and
+      it is not thread-safe. Requires msgpack>=0.5.
+
+    Brokers having the same `packing` (a hashable form of the packer options) serialize
+      the same data, so it may be shared among their connections (e.g. in broadcasts).
+    """
+
+    def __init__(self, packer_options=None, unpacker_options=None):
+        self._msgpack = MsgPackFeature.import_it()[0]
+        self._packer = self._msgpack.Packer(**(packer_options or {}))
+        self.packing = tuple(sorted((packer_options or {}).items()))
+        self._unpacker_options = unpacker_options or {}
+        self._reset()
+
+    def _reset(self):
+        self._unpacker = self._msgpack.Unpacker(**self._unpacker_options)
+        self._fed = 0
+        self._pending = False
+
+    def dumps(self, obj):
+        return self._packer.pack(obj)
+
+    def stream(self, data):
+        """
+        Feeds data to the unpacker, and returns the unpacker. Call finish() once the data was
+          fully read. Otherwise (e.g. on errors) the unpacker is replaced on the next call.
+        """
+        if self._pending:
+            self._reset()
+        self._unpacker.feed(data)
+        self._fed += len(data)
+        self._pending = True
+        return self._unpacker
+
+    def finish(self):
+        """
+        Tells the data fed in the last stream(data) call was fully read.
+        """
+        if self._unpacker.tell() != self._fed:
+            raise ValueError("Extra data after the unpacked object")
+        self._pending = False
+
+    def loads(self, data):
+        obj = self.stream(data).unpack()
+        self.finish()
+        return obj
+
+
+# Buffers the json libraries do not load: they are copied to bytes first.
+_JSON_COPIED_BUFFERS = (bytearray, memoryview) if PY2 else (memoryview,)
+
+
+class JSONBroker(object):
+    """
+    An object with the dumps() and loads() of a json library. loads() takes text, bytes, and
+      buffers (bytearray or memoryview objects) with every library: the buffers a library does
+      not load are copied to bytes.
+    """
+
+    def __init__(self, dumps, loads, copied=_JSON_COPIED_BUFFERS):
+        self.dumps = dumps
+        self._loads = loads
+        self._copied = copied
+        if not copied:
+            self.loads = loads
+
+    def loads(self, data):
+        if isinstance(data, self._copied):
+            data = data.tobytes() if isinstance(data, memoryview) else bytes(data)
+        return self._loads(data)
+
+
+class StdJSONFeature(Feature):
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports the standard json library.
+        """
+        return JSONBroker(json.dumps, json.loads), (TypeError, ValueError)
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        This message error should never be seen since json is standard stuff.
+        """
+        return "Your standard library is corrupted. Module `json` cannot be imported. Please reinstall" \
+               " your python distribution ASAP"
+
+
+class OrJSONFeature(Feature):
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports orjson library. Its output is decoded, since orjson dumps bytes. It loads
+          every buffer type by itself.
+        """
+        import orjson
+
+        def dumps(obj):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+        exceptions = (orjson.JSONDecodeError, orjson.JSONEncodeError, TypeError, ValueError)
+        return JSONBroker(dumps, orjson.loads, ()), exceptions
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for orjson not found.
+        """
+        return "You need to install orjson for this to work (pip install orjson)"
+
+
+class UJSONFeature(Feature):
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports ujson library.
+        """
+        import ujson
+        return JSONBroker(ujson.dumps, ujson.loads), (TypeError, ValueError, OverflowError)
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for ujson not found.
+        """
+        return "You need to install ujson for this to work (pip install ujson)"
+
+
+class RapidJSONFeature(Feature):
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports rapidjson library.
+        """
+        import rapidjson
+        return JSONBroker(rapidjson.dumps, rapidjson.loads), (TypeError, ValueError, OverflowError)
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for python-rapidjson not found.
+        """
+        return "You need to install python-rapidjson for this to work (pip install python-rapidjson)"
+
+
+# Available json backends, in auto-detection order (the first installed one is chosen).
+JSON_BACKENDS = (
+    ('orjson', OrJSONFeature),
+    ('rapidjson', RapidJSONFeature),
+    ('ujson', UJSONFeature),
+    ('json', StdJSONFeature),
+)
+_json_backend = []
+
+
+def json_backend(name=None):
+    """
+    Gets the (broker, exceptions) pair for a json backend, by name. If no name is given,
+      the selected backend (see select_json_backend) is returned. All the brokers (see
+      JSONBroker) dump text (not bytes) values, and load text, bytes and buffers.
+    """
+    if name is None:
+        if not _json_backend:
+            select_json_backend()
+        return _json_backend[0]
+    for key, feature in JSON_BACKENDS:
+        if key == name:
+            return feature.import_it()
+    raise ValueError("Unknown json backend: %r" % name)
+
+
+def select_json_backend(name=None):
+    """
+    Selects the json backend used by the FORMAT_STRING format. If no name is given,
+      the first installed backend in JSON_BACKENDS is chosen. Translators not given a
+      backend of their own use it from the next message they serialize or parse on,
+      even in already-running processors.
+    """
+    if name is None:
+        for key, feature in JSON_BACKENDS:
+            try:
+                backend = feature.import_it()
+                break
+            except Feature.Error:
+                pass
+    else:
+        backend = json_backend(name)
+    _json_backend[:] = [backend]
+    Formats.FORMAT_STRING.reset_broker()
 
 
 def _json_serializer():
     """
     Returns an object with dumps() and loads() for json format.
     """
-    return json
+    return json_backend()[0]
 
 
 def _msgpack_serializer():
@@ -41,18 +244,52 @@ def _msgpack_serializer():
     return MsgPackFeature.import_it()[0]
 
 
+def _compact_unpacker_options():
+    """
+    Returns the options to unpack compact msgpack data. Integer map keys must be allowed
+      (newer msgpack versions reject them by default).
+    """
+    if MsgPackFeature.import_it()[0].version < (0, 6, 1):
+        return {}
+    return {'strict_map_key': False}
+
+
+def _compact_serializer():
+    """
+    Returns an object with dumps() and loads() for compact msgpack format.
+    """
+    msgpack = MsgPackFeature.import_it()[0]
+    options = _compact_unpacker_options()
+    if not options:
+        return msgpack
+
+    class CompactMsgPack(object):
+        dumps = staticmethod(msgpack.dumps)
+        loads = staticmethod(partial(msgpack.loads, **options))
+
+    return CompactMsgPack
+
+
 def _json_serializer_exceptions():
     """
     Returns a tuple containing only the json-related exceptions.
     """
-    return TypeError, ValueError
+    return json_backend()[1]
 
 
 def _msgpack_serializer_exceptions():
     """
-    Returns a tuple containing only the MsgPack exceptions.
+    Returns a tuple containing only the MsgPack exceptions. Newer msgpack versions raise
+      ValueError subclasses on unpacking, and TypeError or OverflowError on packing.
     """
-    return MsgPackFeature.import_it()[1],
+    return MsgPackFeature.import_it()[1], TypeError, ValueError, OverflowError
+
+
+def _struct_serializer_exceptions():
+    """
+    Returns a tuple containing the MsgPack exceptions and the struct error.
+    """
+    return _msgpack_serializer_exceptions() + (struct.error,)
 
 
 def _split_string_command(command):
@@ -88,65 +325,196 @@ def _join_integer_command(ns, code):
     return ((ns & _32bits) << 32) | code & _32bits
 
 
-_JOINERS = (_join_string_command, _join_integer_command)
-_SPLITTERS = (_split_string_command, _split_integer_command)
-_BROKERS = (_json_serializer, _msgpack_serializer)
-_EXCEPTIONS = (_json_serializer_exceptions, _msgpack_serializer_exceptions)
-_MEMBER_NAMES = ('string', 'integer')
+def _join_json_batch(items):
+    """
+    Joins many already-serialized json messages as a json array.
+    """
+    return "[%s]" % ",".join(items)
+
+
+def _join_msgpack_batch(items):
+    """
+    Joins many already-serialized msgpack messages as a msgpack array.
+    """
+    return MsgPackFeature.import_it()[0].Packer().pack_array_header(len(items)) + b"".join(items)
+
+
+# Records (see Formats.FORMAT_STRUCT) start with a byte never used by msgpack, followed
+#   by the 64 bits full command. The fields, packed according to the schema, come next.
+RECORD_TAG = 0xc1
+_RECORD_HEADER = struct.Struct('>BQ')
+
+
+def _is_record(data):
+    """
+    Tells whether the (bytes or buffer) data is a fixed-schema record.
+    """
+    return len(data) >= _RECORD_HEADER.size and bytearray(data[:1])[0] == RECORD_TAG
+
+
+def _join_struct_batch(items):
+    """
+    Joins many already-serialized messages as a msgpack array. Records are included as
+      msgpack binary objects.
+    """
+    packer = MsgPackFeature.import_it()[0].Packer(use_bin_type=True)
+    return packer.pack_array_header(len(items)) + b"".join(packer.pack(item) if _is_record(item) else item
+                                                           for item in items)
+
+
+def _compile_schema(schema):
+    """
+    Compiles a schema (a struct format string) into a struct.Struct instance. Schemas not
+      telling the byte order use the network (big-endian) order, like the record header.
+    """
+    if schema is None or isinstance(schema, struct.Struct):
+        return schema
+    if schema[:1] not in ('@', '=', '<', '>', '!'):
+        schema = '!' + schema
+    return struct.Struct(schema)
+
+
+def _schema_entry(schema):
+    """
+    Pairs a compiled schema with its fields count, and the indices of its integer fields.
+    """
+    zeros = schema.unpack(bytes(bytearray(schema.size)))
+    return schema, len(zeros), tuple(index for index, zero in enumerate(zeros) if isinstance(zero, integer_types))
+
+
+def _pack_record(code, entry, args):
+    """
+    Packs the arguments of a message as a record. Returns None if they do not fit the schema
+      (e.g. a string, or an out-of-range value, in a numeric field): such messages are sent
+      in the compact envelope instead.
+    """
+    schema, fields, integers = entry
+    if PY2 and any(isinstance(args[index], float) for index in integers):
+        # Python 2 truncates the floats packed in integer fields, instead of failing.
+        return None
+    try:
+        return _RECORD_HEADER.pack(RECORD_TAG, code) + schema.pack(*args)
+    except struct.error:
+        return None
+
+
+_JOINERS = (_join_string_command, _join_integer_command, _join_integer_command, _join_integer_command)
+_BATCHERS = (_join_json_batch, _join_msgpack_batch, _join_msgpack_batch, _join_struct_batch)
+_SPLITTERS = (_split_string_command, _split_integer_command, _split_integer_command, _split_integer_command)
+_BROKERS = (_json_serializer, _msgpack_serializer, _compact_serializer, _compact_serializer)
+_EXCEPTIONS = (_json_serializer_exceptions, _msgpack_serializer_exceptions, _msgpack_serializer_exceptions,
+               _struct_serializer_exceptions)
+_POSITIONAL = (False, False, True, True)
+_RECORDS = (False, False, False, True)
+_UNPACKER_OPTIONS = (lambda: {}, lambda: {}, _compact_unpacker_options, _compact_unpacker_options)
+_SPEC_FIELDS = (0, 1, 1, 1)
+_MEMBER_NAMES = ('string', 'integer', 'compact', 'struct')
 
 
 class Formats(int, Enum):
     """
     Parsing formats for messages. Intended:
-    - 0 -> string -> JSON.
+    - 0 -> string -> JSON (see select_json_backend for the available codecs).
     - 1 -> integer -> MsgPack.
+    - 2 -> compact -> MsgPack, using integer commands and a positional [code, args, kwargs]
+      envelope instead of a map. Keyword arguments declared in the command spec (see
+      CommandSpec) travel with integer keys.
+    - 3 -> struct -> Like compact, but commands having a schema (see CommandSpec) are sent as
+      fixed binary records: a RECORD_TAG byte, the 64 bits full command, and the positional
+      arguments packed with the schema. Other commands, and messages not fitting the schema
+      (e.g. having keyword arguments, or values the schema cannot pack), are sent as in the
+      compact format.
     """
     FORMAT_STRING = 0
     FORMAT_INTEGER = 1
+    FORMAT_COMPACT = 2
+    FORMAT_STRUCT = 3
 
     @property
     def split(self):
-        if not hasattr(self, '__split'):
+        if not hasattr(self, '_Formats__split'):
             self.__split = _SPLITTERS[self.value]
         return self.__split
 
     @property
     def join(self):
-        if not hasattr(self, '__join'):
+        if not hasattr(self, '_Formats__join'):
             self.__join = _JOINERS[self.value]
         return self.__join
 
+    @property
+    def batch(self):
+        if not hasattr(self, '_Formats__batch'):
+            self.__batch = _BATCHERS[self.value]
+        return self.__batch
+
+    @property
+    def positional(self):
+        return _POSITIONAL[self.value]
+
+    @property
+    def records(self):
+        return _RECORDS[self.value]
+
+    @property
+    def unpacker_options(self):
+        return _UNPACKER_OPTIONS[self.value]()
+
     @property
     def member_name(self):
-        if not hasattr(self, '__member'):
+        if not hasattr(self, '_Formats__member'):
             self.__member = _MEMBER_NAMES[self.value]
         return self.__member
 
     @property
     def broker(self):
-        if not hasattr(self, '__broker'):
+        if not hasattr(self, '_Formats__broker'):
             self.__broker = _BROKERS[self.value]()
         return self.__broker
 
     @property
     def exceptions(self):
-        if not hasattr(self, '__exceptions'):
+        if not hasattr(self, '_Formats__exceptions'):
             self.__exceptions = _EXCEPTIONS[self.value]()
         return self.__exceptions
 
+    def reset_broker(self):
+        """
+        Discards the cached broker and exceptions, so they are taken again on next use
+          (e.g. after another json backend is selected).
+        """
+        if hasattr(self, '_Formats__broker'):
+            del self.__broker
+        if hasattr(self, '_Formats__exceptions'):
+            del self.__exceptions
+
     def spec_value(self, spec):
-        return spec[self.value]
+        return spec[_SPEC_FIELDS[self.value]]
 
 
-class CommandSpec(namedtuple('_CommandSpec', _MEMBER_NAMES)):
+class CommandSpec(namedtuple('_CommandSpec', ('string', 'integer'))):
     """
     This class will be used to instantiate each namespace and code (they, together, conform a command),
       which can be specified by integer or by string (regardless the output format, either msgpack or json).
 
     However, a message *must* have *str* keyword arguments, so as_keyword() will always yield the string
       component.
+
+    Commands may also declare their usual keyword arguments (e.g. CommandSpec('say', 1, ('message',))).
+      Formats having a compact envelope will send such arguments by their index instead of their name.
+
+    Commands having a fixed shape may declare a schema: a struct format string for their positional
+      arguments (e.g. CommandSpec('move', 2, schema='iif')). Formats having records will send them as
+      fixed binary records. Byte order defaults to network order.
     """
 
+    def __new__(cls, string, integer, keywords=(), schema=None):
+        instance = super(CommandSpec, cls).__new__(cls, string, integer)
+        instance.keywords = tuple(keywords)
+        instance.keyword_indices = dict((keyword, index) for index, keyword in enumerate(instance.keywords))
+        instance.schema = _compile_schema(schema)
+        return instance
+
     def as_keyword(self):
         return self.string
 ANY_COMMAND = CommandSpec(0xFFFFFFFF, '__any__')
@@ -173,6 +541,7 @@ class CommandNamespaceMap(namedtuple('_CommandNamespaceMap', ['translator', 'spe
             raise ValueError("Cannot add a command to a namespace map without translator")
         _cannot_add_any_or_unknown(spec)
         self.map[self.translator.format.spec_value(spec)] = spec
+        self.translator.memoize(self.spec, spec)
         return self
 UNKNOWN_NAMESPACE_MAP = CommandNamespaceMap(None, None)
 
@@ -182,6 +551,9 @@ class Translator(object):
     Stores a map of commands, according to the chosen command format.
     It will keep an inner mapping like {F_ : (C, {F_ : C})} where F_ is the appropriate received format
       (say: string or integer) while C is a CommandSpec instance.
+
+    Additionally, it keeps direct maps between full commands and (namespace, code) pairs, so translating
+      a command in either direction is a single lookup (see translation_stats()).
     """
 
     Error = factory([
@@ -189,20 +561,42 @@ class Translator(object):
         'UNEXPECTED_TEXT',
         'EXPECTED_MAP',
         'EXPECTED_MAP_WITH_CODE',
+        'EXPECTED_ARRAY_WITH_CODE',
         'EXPECTED_ARGS_AS_LIST',
         'EXPECTED_KWARGS_AS_DICT',
         'EXPECTED_KWARGS_KEYS_AS_STRING',
-        'UNKNOWN_COMMAND'
+        'UNKNOWN_COMMAND',
+        'INVALID_RECORD'
     ])
 
-    def __init__(self, format):
+    def __init__(self, format, backend=None, lazy=False):
+        """
+        Creates the translator for a format. A (broker, exceptions) pair may be given as backend
+          to use instead of the format's default broker. Lazy translators decode the arguments of
+          received messages only when accessed (see parse_lazy).
+        """
+        if lazy and format == Formats.FORMAT_STRING:
+            raise ValueError("Lazy parsing is only available for msgpack-based formats")
         self.__format = format
+        self.__backend = backend
+        self.lazy = lazy
         self.__map = {}
+        self.__commands = {}
+        self.__full_commands = {}
+        self.__schemas = {}
 
     @property
     def format(self):
         return self.__format
 
+    @property
+    def broker(self):
+        return self.__backend[0] if self.__backend else self.format.broker
+
+    @property
+    def exceptions(self):
+        return self.__backend[1] if self.__backend else self.format.exceptions
+
     def namespace(self, spec):
         """
         Adds a new namespace translation. ANY_COMMAND cannot be translated with this method.
@@ -212,6 +606,49 @@ class Translator(object):
         _cannot_add_any_or_unknown(spec)
         return self.__map.setdefault(self.format.spec_value(spec), CommandNamespaceMap(self, spec))
 
+    def memoize(self, namespace, code):
+        """
+        Adds a (namespace, code) pair to the direct translation maps. Commands are memoized when
+          added to a namespace map.
+        :param namespace: A CommandSpec instance.
+        :param code: A CommandSpec instance.
+        """
+        full_command = self.format.join(self.format.spec_value(namespace), self.format.spec_value(code))
+        self.__commands[full_command] = (namespace, code)
+        self.__full_commands[(namespace, code)] = full_command
+        if code.schema is not None:
+            self.__schemas[full_command] = _schema_entry(code.schema)
+
+    def declare_schema(self, namespace, code, schema):
+        """
+        Declares (or replaces) the schema of a command (see CommandSpec). Schemas are only used
+          by formats having records.
+        :param namespace: A CommandSpec (or a raw value, according to the format).
+        :param code: A CommandSpec (or a raw value, according to the format).
+        :param schema: A struct format string (or struct.Struct instance), or None to remove it.
+        """
+        full_command = self.format.join(self._raw_value(namespace), self._raw_value(code))
+        if schema is None:
+            self.__schemas.pop(full_command, None)
+        else:
+            self.__schemas[full_command] = _schema_entry(_compile_schema(schema))
+
+    def declare_schemas(self, schemas):
+        """
+        Declares many schemas, given as a {(namespace, code): schema} dict (see
+          IProtocolProvider.specifications_schemas).
+        """
+        for (namespace, code), schema in schemas.items():
+            self.declare_schema(namespace, code, schema)
+
+    def translation_stats(self):
+        """
+        Sizes of the direct translation maps.
+        :returns: A dict with translated (full commands known to translate) and untranslated
+          ((namespace, code) pairs memoized to untranslate) keys.
+        """
+        return {'translated': len(self.__commands), 'untranslated': len(self.__full_commands)}
+
     def translate(self, full_command):
         """
         Breaks a full command in namespace and code. If either of the command parts is not known, KeyError
@@ -219,6 +656,10 @@ class Translator(object):
         :param full_command: A raw value, according to the format.
         :returns: A tuple with (namespace, code).
         """
+        try:
+            return self.__commands[full_command]
+        except KeyError:
+            pass
         namespace, code = self.format.split(full_command)
         namespace_map = self.__map.get(namespace, UNKNOWN_NAMESPACE_MAP)
         return namespace_map.spec, namespace_map.map[code]
@@ -226,15 +667,40 @@ class Translator(object):
     def untranslate(self, namespace, code):
         """
         Untranslated a translated message. The inverse of translate(full_command).
-        :param namespace: A CommandSpec to pass.
-        :param code: A CommandSpec to pass.
+        :param namespace: A CommandSpec to pass (a raw value, according to the format, is also allowed).
+        :param code: A CommandSpec to pass (a raw value, according to the format, is also allowed).
         :returns: string or integer of 64bits.
         """
-        return self.format.join(self.format.spec_value(namespace), self.format.spec_value(code))
+        try:
+            return self.__full_commands[(namespace, code)]
+        except KeyError:
+            pass
+        full_command = self.format.join(self._raw_value(namespace), self._raw_value(code))
+        if full_command in self.__commands:
+            # Only known commands are memoized: arbitrary values would grow the map without limit.
+            self.__full_commands[(namespace, code)] = full_command
+        return full_command
+
+    def _raw_value(self, spec):
+        """
+        Gets the raw value of a CommandSpec, according to the format. Raw values are returned as they are.
+        """
+        return self.format.spec_value(spec) if isinstance(spec, CommandSpec) else spec
 
-    def parse_data(self, data, binary=None):
+    def create_broker(self, packer_options=None, unpacker_options=None):
         """
-        Parses the incomming data. Binary is a tri-state variable:
+        Creates a MsgPackBroker for this (msgpack-based) format, intended for a single connection.
+          Its methods may then be given as broker to decode, parse_data, parse_lazy and serialize.
+        """
+        if self.format == Formats.FORMAT_STRING:
+            raise ValueError("Msgpack brokers are only available for msgpack-based formats")
+        options = dict(self.format.unpacker_options)
+        options.update(unpacker_options or {})
+        return MsgPackBroker(packer_options, options)
+
+    def decode(self, data, binary=None, broker=None):
+        """
+        Decodes the incomming data, without building any message. Binary is a tri-state variable:
         - False: The parsed data is required to be text/json.
           It is an error to receive a binary content if this translator has a text format.
         - True: The parsed data is required to be binary/msgpack.
@@ -242,67 +708,305 @@ class Translator(object):
         - None: The parsed data is not required any format.
           The format is decided by the in-use translator.
 
-        Returns a Message instance.
-
-        :param data: Message to be parsed (str or unicode or bytes data).
+        :param data: Message to be parsed (str or unicode or bytes data). Buffers (bytearray or
+          memoryview objects) are also allowed.
         :param binary: Tri-state boolean telling the expected input value type.
-        :returns: A parsed Message
+        :param broker: An object to use instead of the translator's broker (see create_broker).
+        :returns: The decoded (json|msgpack) object, or the record (bytes) for formats having records.
+        """
+
+        self._check_binary(binary)
+        if isinstance(data, memoryview) and (PY2 or self.format == Formats.FORMAT_STRING):
+            # Json libraries do not support every buffer type. Msgpack decodes them without
+            #   copying, except in Python 2 (where memoryview is not an old-style buffer).
+            data = data.tobytes()
+        if self.format.records and _is_record(data):
+            # Records are decoded (unpacked) by parse_payload, since they need their command schema.
+            return bytes(data)
+        return (broker or self.broker).loads(data)
+
+    def _check_binary(self, binary):
+        """
+        Checks the received data type against the format. See decode(data, binary).
         """
 
         if binary is not None:
             if binary and self.format == Formats.FORMAT_STRING:
                 raise self.Error("Binary parsing was requested, but this translator uses a JSON format",
                                  self.Error.UNEXPECTED_BINARY)
-            if not binary and self.format == Formats.FORMAT_STRING:
+            if not binary and self.format != Formats.FORMAT_STRING:
                 raise self.Error("Text parsing was requested, but this translator uses a MSGPACK format",
                                  self.Error.UNEXPECTED_TEXT)
 
-        data = self.format.broker.loads(data)
-        if not isinstance(data, dict):
-            raise self.Error("Received data is not a valid map object (JSON literal / Msgpack Map)",
-                             self.Error.EXPECTED_MAP)
+    def parse_payload(self, payload):
+        """
+        Builds a message from an already-decoded object (see decode(data, binary)). It is a map
+          with `code`, `args` and `kwargs` members or, for positional formats, a [code, args, kwargs]
+          array (args and kwargs may be omitted). For formats having records, it may also be a record.
+
+        :param payload: A decoded map (or array) object, or a record.
+        :returns: A parsed Message
+        """
+
+        if self.format.records and isinstance(payload, bytes):
+            return self._parse_record(payload)
+        if self.format.positional:
+            if not isinstance(payload, (list, tuple)) or not payload:
+                raise self.Error("Received data is not a valid [code, args, kwargs] array",
+                                 self.Error.EXPECTED_ARRAY_WITH_CODE)
+            raw_code = payload[0]
+            args = payload[1] if len(payload) > 1 else ()
+            kwargs = payload[2] if len(payload) > 2 else {}
+        else:
+            if not isinstance(payload, dict):
+                raise self.Error("Received data is not a valid map object (JSON literal / Msgpack Map)",
+                                 self.Error.EXPECTED_MAP)
+            if 'code' not in payload:
+                raise self.Error("Received data has not a `code` member", self.Error.EXPECTED_MAP_WITH_CODE)
+            raw_code = payload['code']
+            args = payload.get('args', ())
+            kwargs = payload.get('kwargs', {})
+
+        command = self._translate_received(raw_code)
+        return Message.from_parts(command, *self._received_arguments(command[1], args, kwargs))
+
+    def _parse_record(self, record):
+        """
+        Builds a message from a record (see Formats.FORMAT_STRUCT).
+        """
 
-        if 'code' not in dict:
-            raise self.Error("Received data has not a `code` member", self.Error.EXPECTED_MAP_WITH_CODE)
+        if not _is_record(record):
+            raise self.Error("Received data is not a valid record", self.Error.INVALID_RECORD)
+        tag, raw_code = _RECORD_HEADER.unpack_from(record)
+        command = self._translate_received(raw_code)
+        schema = self.__schemas.get(raw_code, (None,))[0]
+        if schema is None or len(record) != _RECORD_HEADER.size + schema.size:
+            raise self.Error("Received record does not match the command schema", self.Error.INVALID_RECORD)
+        return Message.from_parts(command, schema.unpack_from(record, _RECORD_HEADER.size))
+
+    def _translate_received(self, raw_code):
+        """
+        Translates the code of a received message, failing with UNKNOWN_COMMAND.
+        """
 
         try:
-            ns, code = self.translate(dict['code'])
-        except KeyError:
+            return self.translate(raw_code)
+        except (KeyError, ValueError, TypeError):
             raise self.Error("Expected message with a known pair of namespace/code", self.Error.UNKNOWN_COMMAND)
 
-        args = data.get('args', ())
+    def _received_arguments(self, code, args, kwargs):
+        """
+        Validates the arguments of a received message (expanding the indexed keywords, if any).
+        :returns: A tuple (args, kwargs).
+        """
+
         if not isinstance(args, (list, tuple)):
             raise self.Error("Expected message args as list", self.Error.EXPECTED_ARGS_AS_LIST)
-        kwargs = data.get('kwargs', {})
         if not isinstance(kwargs, dict):
             raise self.Error("Expected message kwargs as dict", self.Error.EXPECTED_KWARGS_AS_DICT)
-        try:
-            return Message(ns, code, *args, **kwargs)
-        except SyntaxError as e:
-            raise self.Error("Expected message kwargs keys as string", self.Error.EXPECTED_KWARGS_KEYS_AS_STRING)
+        if self.format.positional and code.keywords:
+            keywords = code.keywords
+            expanded = {}
+            for key, value in kwargs.items():
+                if isinstance(key, integer_types):
+                    # Only the declared indices: negative ones must not wrap around.
+                    if not 0 <= key < len(keywords):
+                        raise self.Error("Expected message kwargs keys as string",
+                                         self.Error.EXPECTED_KWARGS_KEYS_AS_STRING)
+                    key = keywords[key]
+                expanded[key] = value
+            kwargs = expanded
+        for key in kwargs:
+            if not isinstance(key, string_types):
+                raise self.Error("Expected message kwargs keys as string", self.Error.EXPECTED_KWARGS_KEYS_AS_STRING)
+        return tuple(args), kwargs
+
+    def parse_lazy(self, data, binary=None, broker=None):
+        """
+        Parses the incomming data like parse_data(data, binary), but only the code is decoded
+          (and translated) right now: the arguments are decoded (and validated) when they are
+          first accessed in the returned message. This means that unknown commands are rejected
+          without decoding the whole data, and that errors in the arguments will be raised when
+          accessing them.
+
+        Only available for msgpack-based formats. Falls back to eager parsing if the
+          installed msgpack version cannot tell positions in the data.
+
+        :param data: Message to be parsed (bytes data, or a bytearray or memoryview buffer).
+        :param binary: Tri-state boolean telling the expected input value type.
+        :param broker: A MsgPackBroker to use instead of the translator's broker (see create_broker).
+        :returns: A parsed (lazy) Message
+        """
+
+        if self.format == Formats.FORMAT_STRING:
+            raise ValueError("Lazy parsing is only available for msgpack-based formats")
+        self._check_binary(binary)
+        if self.format.records and _is_record(data):
+            return self._parse_record(bytes(data))
+        msgpack = MsgPackFeature.import_it()[0]
+        if not hasattr(msgpack.Unpacker, 'tell'):
+            # Not parse_data(data, binary): it calls this method for lazy translators.
+            return self.parse_payload(self.decode(data, binary, broker))
+
+        if isinstance(broker, MsgPackBroker):
+            unpacker = broker.stream(data)
+        else:
+            unpacker = msgpack.Unpacker(**self.format.unpacker_options)
+            unpacker.feed(data)
+        raw_code = _missing = object()
+        args_span = kwargs_span = None
+
+        # Positions are relative to the current data (the unpacker may have been fed before).
+        base = unpacker.tell()
+
+        def span():
+            start = unpacker.tell()
+            unpacker.skip()
+            return start - base, unpacker.tell() - base
+
+        if self.format.positional:
+            try:
+                size = unpacker.read_array_header()
+            except ValueError:
+                size = 0
+            if not size:
+                raise self.Error("Received data is not a valid [code, args, kwargs] array",
+                                 self.Error.EXPECTED_ARRAY_WITH_CODE)
+            raw_code = unpacker.unpack()
+            if size > 1:
+                args_span = span()
+            if size > 2:
+                kwargs_span = span()
+            for index in range(3, size):
+                unpacker.skip()
+        else:
+            try:
+                size = unpacker.read_map_header()
+            except ValueError:
+                raise self.Error("Received data is not a valid map object (JSON literal / Msgpack Map)",
+                                 self.Error.EXPECTED_MAP)
+            for index in range(size):
+                key = unpacker.unpack()
+                if key in (u'code', b'code'):
+                    raw_code = unpacker.unpack()
+                elif key in (u'args', b'args'):
+                    args_span = span()
+                elif key in (u'kwargs', b'kwargs'):
+                    kwargs_span = span()
+                else:
+                    unpacker.skip()
+            if raw_code is _missing:
+                raise self.Error("Received data has not a `code` member", self.Error.EXPECTED_MAP_WITH_CODE)
+        if isinstance(broker, MsgPackBroker):
+            broker.finish()
+        elif unpacker.tell() - base != len(data):
+            # Like the eager parsing, data after the envelope is rejected.
+            raise msgpack.exceptions.ExtraData(raw_code, bytes(data[unpacker.tell() - base:]))
+
+        command = self._translate_received(raw_code)
+        if not isinstance(data, bytes):
+            # The message may outlive the buffer (e.g. a reused receive buffer), and the arguments
+            #   are decoded later: a private copy is needed.
+            data = bytes(data)
+        view = memoryview(data)
+        loads = (broker or self.broker).loads
+
+        def load():
+            args = loads(view[args_span[0]:args_span[1]]) if args_span else ()
+            kwargs = loads(view[kwargs_span[0]:kwargs_span[1]]) if kwargs_span else {}
+            return self._received_arguments(command[1], args, kwargs)
+
+        return LazyMessage.from_loader(command, load)
+
+    def is_batch(self, payload):
+        """
+        Tells whether a decoded object is an array of messages instead of a single message.
+          For positional formats, a single message is itself an array starting with its code.
+        """
+
+        if not isinstance(payload, (list, tuple)):
+            return False
+        return not self.format.positional or not payload or isinstance(payload[0], (list, tuple, bytes))
+
+    def parse_data(self, data, binary=None, batched=False, broker=None):
+        """
+        Parses the incomming data. Binary is a tri-state variable, as in decode(data, binary).
 
-    def serialize(self, message):
+        Returns a Message instance. If batched is True, the data may also be an array of
+          messages, and a list of Message instances will be returned (one element if the
+          data was a single message).
+
+        :param data: Message to be parsed (str or unicode or bytes data).
+        :param binary: Tri-state boolean telling the expected input value type.
+        :param batched: Whether the data may be an array of messages.
+        :param broker: An object to use instead of the translator's broker (see create_broker).
+        :returns: A parsed Message, or a list of them
+        """
+
+        if not batched:
+            if self.lazy:
+                return self.parse_lazy(data, binary, broker)
+            return self.parse_payload(self.decode(data, binary, broker))
+        payload = self.decode(data, binary, broker)
+        if self.is_batch(payload):
+            return [self.parse_payload(item) for item in payload]
+        return [self.parse_payload(payload)]
+
+    def serialize(self, message, broker=None):
         """
         Serializes the message data, ready to be sent.
 
         :param message: A Message instance.
+        :param broker: An object to use instead of the translator's broker (see create_broker).
+        :returns: data to be sent.
+        """
+
+        broker = broker or self.broker
+        code = self.untranslate(message.code[0], message.code[1])
+        if not self.format.positional:
+            return broker.dumps({
+                'code': code,
+                'args': message.args,
+                'kwargs': message.kwargs
+            })
+
+        kwargs = message.kwargs
+        if self.format.records and not kwargs:
+            entry = self.__schemas.get(code)
+            if entry is not None and entry[1] == len(message.args):
+                record = _pack_record(code, entry, message.args)
+                if record is not None:
+                    return record
+        indices = getattr(self.__commands.get(code, message.code)[1], 'keyword_indices', None)
+        if kwargs and indices:
+            kwargs = dict((indices.get(key, key), value) for key, value in kwargs.items())
+        if kwargs:
+            envelope = [code, message.args, kwargs]
+        elif message.args:
+            envelope = [code, message.args]
+        else:
+            envelope = [code]
+        return broker.dumps(envelope)
+
+    def serialize_batch(self, items):
+        """
+        Joins many serialized messages in a single array, ready to be sent as a single frame.
+
+        :param items: A list of values returned by serialize(message).
         :returns: data to be sent.
         """
 
-        return self.format.broker.dumps({
-            'code': self.untranslate(message.code[0], message.code[1]),
-            'args': message.args,
-            'kwargs': message.kwargs
-        })
+        return self.format.batch(items)
 
 
 class JSONTranslator(Translator):
     """
-    Translator using JSON format.
+    Translator using JSON format. A json backend may be given by name (see JSON_BACKENDS),
+      otherwise the selected one (by default: the fastest installed one) is used.
     """
 
-    def __init__(self):
-        super(JSONTranslator, self).__init__(Formats.FORMAT_STRING)
+    def __init__(self, backend=None):
+        super(JSONTranslator, self).__init__(Formats.FORMAT_STRING, json_backend(backend) if backend else None)
 
 
 class MsgPackTranslator(Translator):
@@ -310,5 +1014,24 @@ class MsgPackTranslator(Translator):
     Translator using MsgPack format.
     """
 
-    def __init__(self):
-        super(MsgPackTranslator, self).__init__(Formats.FORMAT_INTEGER)
\ No newline at end of file
+    def __init__(self, lazy=False):
+        super(MsgPackTranslator, self).__init__(Formats.FORMAT_INTEGER, lazy=lazy)
+
+
+class CompactTranslator(Translator):
+    """
+    Translator using MsgPack format with positional envelopes.
+    """
+
+    def __init__(self, lazy=False):
+        super(CompactTranslator, self).__init__(Formats.FORMAT_COMPACT, lazy=lazy)
+
+
+class StructTranslator(Translator):
+    """
+    Translator using fixed binary records for the commands having a schema, and MsgPack
+      with positional envelopes for the other commands.
+    """
+
+    def __init__(self, lazy=False):
+        super(StructTranslator, self).__init__(Formats.FORMAT_STRUCT, lazy=lazy)
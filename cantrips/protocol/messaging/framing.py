@@ -0,0 +1,171 @@
+import struct
+from six import text_type
+from cantrips.types.exception import factory
+from cantrips.protocol.messaging.formats import MsgPackFeature
+
+
+if hasattr(memoryview, 'release'):
+    def _release(views):
+        for view in views:
+            view.release()
+else:
+    def _release(views):
+        # Python 2 memoryviews cannot be released explicitly: they are when no longer referenced.
+        pass
+
+
+class FrameDecoder(object):
+    """
+    Splits a stream of bytes (e.g. a TCP connection) into frames. Data is fed in
+      chunks as they arrive, and complete frames are returned as soon as they are
+      available. Partial frames are kept until their remaining data arrives.
+
+    Frames are returned as raw data, unless DECODED is True: in such case the frames
+      are returned as already-decoded objects (e.g. when the format itself is able to
+      tell where an object ends). Such decoders raise an Error with code MALFORMED_STREAM
+      when the data cannot be decoded: the stream cannot be decoded any further.
+    """
+
+    Error = factory(['FRAME_TOO_LARGE', 'MALFORMED_STREAM'])
+
+    DECODED = False
+
+    def __init__(self, max_frame_size=1 << 20):
+        self.max_frame_size = max_frame_size
+
+    def feed(self, data):
+        """
+        Feeds a chunk of data.
+        :param data: A chunk of received bytes.
+        :returns: A list of the frames completed by this chunk.
+        """
+        raise NotImplementedError
+
+    def encode(self, data):
+        """
+        Frames outgoing data.
+        :param data: Serialized data to send.
+        :returns: Bytes to write.
+        """
+        raise NotImplementedError
+
+
+class LengthPrefixedDecoder(FrameDecoder):
+    """
+    Frames are prefixed by their length, as a 32 bits big-endian unsigned integer.
+
+    Received data is appended to a single per-connection buffer, and a read offset is kept
+      for it. Consumed data is only discarded when it takes the larger part of the buffer,
+      so the pending data is not copied each time a frame is extracted.
+
+    Frames are returned as memoryview objects over such buffer (they are not copied), and
+      they are valid until the next call to feed(data). Copy them (e.g. bytes(frame)) if they
+      must be kept for longer. When the buffer is emptied after having grown beyond
+      keep_buffer_size bytes, it is replaced so the memory of large frames is given back.
+    """
+
+    HEADER = struct.Struct('>I')
+
+    def __init__(self, max_frame_size=1 << 20, keep_buffer_size=1 << 16):
+        super(LengthPrefixedDecoder, self).__init__(max_frame_size)
+        self.keep_buffer_size = keep_buffer_size
+        self._buffer = bytearray()
+        self._offset = 0
+        self._peak = 0
+        self._views = []
+
+    def _reclaim(self):
+        """
+        Releases the frames returned by the previous call, and discards consumed data.
+        """
+        _release(self._views)
+        self._views = []
+        buffer, offset = self._buffer, self._offset
+        try:
+            if offset == len(buffer):
+                if self._peak > self.keep_buffer_size:
+                    self._buffer = bytearray()
+                    self._peak = 0
+                else:
+                    del buffer[:]
+                self._offset = 0
+            elif offset > len(buffer) // 2:
+                del buffer[:offset]
+                self._offset = 0
+        except BufferError:
+            # Somebody kept a reference to a frame: the buffer cannot be resized anymore.
+            self._buffer = bytearray(buffer[offset:])
+            self._offset = 0
+
+    def feed(self, data):
+        self._reclaim()
+        buffer = self._buffer
+        try:
+            buffer.extend(data)
+        except BufferError:
+            buffer = self._buffer = bytearray(buffer)
+            buffer.extend(data)
+        self._peak = max(self._peak, len(buffer))
+
+        header_size = self.HEADER.size
+        frames = []
+        offset = self._offset
+        view = memoryview(buffer)
+        try:
+            while len(buffer) - offset >= header_size:
+                size, = self.HEADER.unpack_from(buffer, offset)
+                if size > self.max_frame_size:
+                    raise self.Error("Frame size (%d) exceeds the allowed maximum (%d)" % (size, self.max_frame_size),
+                                     self.Error.FRAME_TOO_LARGE, size=size)
+                start = offset + header_size
+                end = start + size
+                if end > len(buffer):
+                    break
+                frames.append(view[start:end])
+                offset = end
+        finally:
+            _release((view,))
+            del view
+            self._views = frames
+            self._offset = offset
+        return frames
+
+    def encode(self, data):
+        if isinstance(data, text_type):
+            data = data.encode('utf-8')
+        return self.HEADER.pack(len(data)) + data
+
+
+class MsgPackStreamDecoder(FrameDecoder):
+    """
+    Msgpack objects tell, by themselves, where they end. No header is needed: received
+      data is directly fed to a msgpack.Unpacker, and decoded objects are returned.
+
+    Only useful with msgpack-based formats, but not with records (see Formats.FORMAT_STRUCT),
+      since they are not msgpack objects. Extra unpacker options (e.g. the ones of the format,
+      or raw=False) may be given.
+    """
+
+    DECODED = True
+
+    def __init__(self, max_frame_size=1 << 20, unpacker_options=None):
+        super(MsgPackStreamDecoder, self).__init__(max_frame_size)
+        msgpack, exception = MsgPackFeature.import_it()
+        options = dict(unpacker_options or {}, max_buffer_size=max_frame_size)
+        self._unpacker = msgpack.Unpacker(**options)
+        self._buffer_full = msgpack.exceptions.BufferFull
+        # Newer msgpack versions raise ValueError subclasses for malformed data.
+        self._malformed = (exception, ValueError)
+
+    def feed(self, data):
+        try:
+            self._unpacker.feed(data)
+            return list(self._unpacker)
+        except self._buffer_full as e:
+            raise self.Error("Pending data exceeds the allowed maximum (%d)" % self.max_frame_size,
+                             self.Error.FRAME_TOO_LARGE, error=e)
+        except self._malformed as e:
+            raise self.Error("Malformed msgpack stream", self.Error.MALFORMED_STREAM, error=e)
+
+    def encode(self, data):
+        return data
@@ -31,6 +31,8 @@ class ProtocolLayer(object):
         ... #   callable is meant to be an instance method in the same layer.
         ... # - They can call layer.i_cant_handle() to forward the message to the next layer.
         ... # - They can call layer.nobody_can_handle() to forward the message to the next layer.
+        ... # - Alternatively (and cheaper, since no exception is raised), they can return
+        ... #   ProtocolLayer.CANNOT_HANDLE or ProtocolLayer.NOBODY_CAN_HANDLE respectively.
 
     Methods:
     - __init__(self, processor_class): Override it to add custom handlers.
@@ -41,9 +43,18 @@ class ProtocolLayer(object):
     - _<handler>(self, socket, message): Any handler to be added.
     - i_cannot_handle(): Use it inside a handler to make the next layer process the message.
     - nobody_can_handle(): Use it inside a handler to make the message unprocessable by any handler.
+    - handler_for(namespace, code): Resolves the handler this layer would use for a command, or None.
     - process_message(socket, message): You will never need to call this method. It is part of the core.
+
+    Processors do not walk the layers for each message: they merge the handlers of every layer into a
+      single dispatch table (see MessageProcessorMetaClass.dispatch_chain), so layers not handling a
+      command are not even visited.
     """
 
+    # Sentinel values a handler may return instead of calling i_cannot_handle() or nobody_can_handle().
+    CANNOT_HANDLE = object()
+    NOBODY_CAN_HANDLE = object()
+
     class Exception(Exception):
         """
         A standard ProtocolLayer exception.
@@ -118,6 +129,27 @@ class ProtocolLayer(object):
 
         self.processor_class.feed_translator(namespace, command)
         self.__handlers[(namespace, command)] = handler
+        self.processor_class.invalidate_dispatch()
+
+    def handled_commands(self):
+        """
+        Lists the (namespace, code) keys registered in this layer. Any of them may be ANY_COMMAND.
+        :returns: A list of (namespace, code) tuples.
+        """
+        return list(self.__handlers)
+
+    def handler_for(self, namespace, code):
+        """
+        Resolves the handler this layer would use for a command: the specific one, or the one for the whole
+          namespace, or the one for every command (in that order of precedence).
+        :param namespace: A `CommandSpec` instance.
+        :param code: A `CommandSpec` instance.
+        :returns: A callable accepting (socket, message), or None if this layer does not handle the command.
+        """
+        handlers = self.__handlers
+        return (handlers.get((namespace, code)) or
+                handlers.get((namespace, ANY_COMMAND)) or
+                handlers.get((ANY_COMMAND, ANY_COMMAND)))
 
     def process_message(self, socket, message):
         """
@@ -128,12 +160,9 @@ class ProtocolLayer(object):
         :returns: Nothing
         """
 
-        def _get(ns, c):
-            return self.__handlers.get((ns, c))
-
-        handler = (_get(message.code[0], message.code[1]) or
-                   _get(message.code[0], ANY_COMMAND) or
-                   _get(ANY_COMMAND, ANY_COMMAND) or
-                   (lambda socket, message: self.i_cannot_handle()))
-
-        handler(socket, message)
\ No newline at end of file
+        handler = self.handler_for(message.code[0], message.code[1])
+        result = handler(socket, message) if handler else self.CANNOT_HANDLE
+        if result is self.CANNOT_HANDLE:
+            self.i_cannot_handle()
+        elif result is self.NOBODY_CAN_HANDLE:
+            self.nobody_can_handle()
\ No newline at end of file
@@ -1,24 +1,157 @@
+from future.utils import python_2_unicode_compatible
 from cantrips.types.arguments import Arguments
 
 
-class Packet(Arguments):
+class FrozenKwargs(dict):
+    """
+    The keyword arguments of a packet: a dict that cannot be modified.
+    """
+
+    __slots__ = ()
+
+    def _blocked(self, *args, **kwargs):
+        raise TypeError("'%s' object does not support modification" % type(self).__name__)
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _blocked
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+_NO_KWARGS = FrozenKwargs()
+
+
+def _freeze(kwargs):
+    if type(kwargs) is FrozenKwargs:
+        return kwargs
+    return FrozenKwargs(kwargs) if kwargs else _NO_KWARGS
+
+
+@python_2_unicode_compatible
+class Packet(object):
     """
     A packet fetches args, kwargs, and a command code.
     The command code is stored under the property `code`.
+
+    Keyword arguments are available as attributes (e.g. packet.message), and positional
+      arguments are available by index (e.g. packet[0]). Packets are read-only: kwargs is
+      a FrozenKwargs dict. As with the former Arguments-based packets, str() and bytes()
+      tell the arguments, and packet + packet gives an Arguments object with both sets.
+
+    Packets use __slots__ instead of a per-instance __dict__, since lots of them are
+      created (one per sent or received message).
     """
 
+    __slots__ = ('_code', '_args', '_kwargs')
+
     def __init__(self, code, *args, **kwargs):
-        super(Packet, self).__init__(*args, **kwargs)
-        self.__code = code
+        self._set(code, args, kwargs)
+
+    def _set(self, code, args, kwargs):
+        object.__setattr__(self, '_code', code)
+        object.__setattr__(self, '_args', args)
+        object.__setattr__(self, '_kwargs', _freeze(kwargs))
+
+    @classmethod
+    def from_parts(cls, code, args=(), kwargs=None):
+        """
+        Creates a packet from an existing code, args tuple and kwargs dict, without unpacking
+          them. Intended for internal use (e.g. when parsing messages): the args tuple is
+          kept as is, and the kwargs dict is frozen (copied, unless it is a FrozenKwargs).
+        """
+        packet = cls.__new__(cls)
+        Packet._set(packet, code, args, kwargs)
+        return packet
 
     @property
     def code(self):
-        return self.__code
+        return self._code
+
+    @property
+    def args(self):
+        """
+        Positional arguments.
+        """
+        return self._args
+
+    @property
+    def kwargs(self):
+        """
+        Keyword arguments (a FrozenKwargs dict).
+        """
+        return self._kwargs
+
+    def __len__(self):
+        """
+        Resolves length as the count of assigned arguments.
+        """
+        return len(self._args) + len(self._kwargs)
+
+    def __contains__(self, item):
+        """
+        Resolves whether an argument (position or kw) was passed.
+        """
+        if isinstance(item, str):
+            return item in self._kwargs
+        return 0 <= item < len(self._args)
+
+    def __getitem__(self, item):
+        """
+        Resolves an item by positional argument.
+        """
+        try:
+            return self._args[item]
+        except IndexError:
+            raise IndexError("argument index out of range")
+        except TypeError:
+            raise TypeError("argument indices must be integers, not %s" % type(item).__name__)
+
+    def __setitem__(self, key, value):
+        """
+        Fails when assigning item since it is inmutable.
+        """
+        raise TypeError("'%s' object does not support item assignment" % type(self).__name__)
+
+    def __getattr__(self, item):
+        """
+        Resolves an attribute by keyword argument.
+        """
+        if item.startswith('__') or item in Packet.__slots__:
+            raise AttributeError(item)
+        try:
+            return self._kwargs[item]
+        except KeyError as e:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, e.args[0]))
 
     def __setattr__(self, key, value):
-        if key == '_Packet__code':
-            return object.__setattr__(self, key, value)
-        return super(Packet, self).__setattr__(key, value)
+        """
+        Fails when assigning attribute since it is inmutable.
+        """
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, key))
+
+    def __add__(self, other):
+        """
+        Adds the arguments of another packet to these ones. Like with Arguments, the
+          result is an Arguments object (it has no code).
+        """
+        if not isinstance(other, type(self)):
+            raise TypeError("unsupported operand type(s) for +: '%s' and '%s'" % (type(self).__name__,
+                                                                                   type(other).__name__))
+        kwargs = dict(self.kwargs)
+        kwargs.update(other.kwargs)
+        return Arguments(*(tuple(self.args) + tuple(other.args)), **kwargs)
+
+    def __str__(self):
+        """
+        String representation (will be unicode representation in python 2).
+        """
+        return str((self.args, self.kwargs))
+
+    def __bytes__(self):
+        """
+        Bytes representation (will be str representation in python 2).
+        """
+        return str(self).encode('utf-8')
 
     def __repr__(self):
         """
@@ -31,7 +164,41 @@ class Message(Packet):
     """
     A message is a packet with a namespace and a command.
     Both values, when compound, build the `code` property.
+
+    Message.from_parts((namespace, command), args, kwargs) may be used to reuse an existing
+      (namespace, command) pair (e.g. the one returned by a translator).
     """
 
+    __slots__ = ()
+
     def __init__(self, namespace, command, *args, **kwargs):
-        super(Message, self).__init__((namespace, command), *args, **kwargs)
\ No newline at end of file
+        self._set((namespace, command), args, kwargs)
+
+
+class LazyMessage(Message):
+    """
+    A message whose arguments are loaded on first access. It is created with a loader
+      (a callable returning an (args, kwargs) tuple) that will be called only once.
+      Errors raised by the loader are raised when the arguments are accessed.
+    """
+
+    __slots__ = ('_loader',)
+
+    @classmethod
+    def from_loader(cls, code, loader):
+        """
+        Creates a lazy message for a (namespace, command) pair and a loader.
+        """
+        message = cls.__new__(cls)
+        object.__setattr__(message, '_code', code)
+        object.__setattr__(message, '_loader', loader)
+        return message
+
+    def __getattr__(self, item):
+        if item in ('_args', '_kwargs'):
+            args, kwargs = self._loader()
+            object.__setattr__(self, '_args', args)
+            object.__setattr__(self, '_kwargs', _freeze(kwargs))
+            object.__setattr__(self, '_loader', None)
+            return getattr(self, item)
+        return super(LazyMessage, self).__getattr__(item)
@@ -0,0 +1,234 @@
+import time
+from timeit import default_timer
+
+
+if hasattr(time, 'perf_counter_ns'):
+    clock = time.perf_counter_ns
+else:
+    def clock():
+        """
+        Current time of a monotonic clock, in nanoseconds.
+        """
+        return int(default_timer() * 1e9)
+
+
+class LatencyHistogram(object):
+    """
+    A log-linear (HDR-style) histogram of non-negative integer values (e.g. nanoseconds).
+      Values are counted in buckets having a relative width of 1 / 2 ** (SUB_BUCKET_BITS - 1):
+      about 3% with the default 6 bits. Values below 2 ** SUB_BUCKET_BITS are exact.
+
+    Recording is a few integer operations and a dict update. Only the used buckets take memory.
+    """
+
+    __slots__ = ('sub_bucket_bits', 'buckets', 'count', 'total', 'min', 'max')
+
+    SUB_BUCKET_BITS = 6
+
+    def __init__(self, sub_bucket_bits=None):
+        self.sub_bucket_bits = sub_bucket_bits or self.SUB_BUCKET_BITS
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = value.bit_length() - self.sub_bucket_bits
+        if shift <= 0:
+            return value
+        return (shift << (self.sub_bucket_bits - 1)) + (value >> shift)
+
+    def _lowest(self, index):
+        """
+        The lowest value counted in a bucket.
+        """
+        half = 1 << (self.sub_bucket_bits - 1)
+        if index < half << 1:
+            return index
+        shift = (index >> (self.sub_bucket_bits - 1)) - 1
+        return (index - (shift << (self.sub_bucket_bits - 1))) << shift
+
+    def record(self, value):
+        """
+        Counts a value. Negative values are counted as 0.
+        """
+        value = max(int(value), 0)
+        index = self._index(value)
+        buckets = self.buckets
+        buckets[index] = buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Adds the counts of another histogram (having the same sub_bucket_bits).
+        """
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Cannot merge histograms having different precision")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return float(self.total) / self.count if self.count else 0.0
+
+    def percentile(self, percent):
+        """
+        The value below which the given percent of the values are. The lowest value of its
+          bucket is returned (but never less than the minimum or more than the maximum).
+        """
+        if not self.count:
+            return 0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(max(self._lowest(index), self.min), self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min or 0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max or 0,
+        }
+
+
+class CommandMetrics(object):
+    """
+    Counters and latency histograms (in nanoseconds) of a single command.
+    """
+
+    __slots__ = ('messages_in', 'bytes_in', 'messages_out', 'bytes_out', 'errors', 'parse', 'dispatch', 'handler')
+
+    def __init__(self):
+        self.messages_in = 0
+        self.bytes_in = 0
+        self.messages_out = 0
+        self.bytes_out = 0
+        self.errors = {}
+        self.parse = LatencyHistogram()
+        self.dispatch = LatencyHistogram()
+        self.handler = LatencyHistogram()
+
+    def as_dict(self):
+        return {
+            'messages_in': self.messages_in,
+            'bytes_in': self.bytes_in,
+            'messages_out': self.messages_out,
+            'bytes_out': self.bytes_out,
+            'errors': dict(self.errors),
+            'parse_ns': self.parse.as_dict(),
+            'dispatch_ns': self.dispatch.as_dict(),
+            'handler_ns': self.handler.as_dict(),
+        }
+
+
+class MetricsSink(object):
+    """
+    Receives the instrumentation events of message processors (see MessageProcessor.METRICS_SINK).
+      This implementation ignores them: subclasses will aggregate them, or forward them to a
+      metrics system. Events are sent synchronously, so implementations should be cheap.
+
+    Commands are (namespace, code) tuples, as in Message.code, or None when not known (e.g.
+      when the received data could not be parsed). Times are in nanoseconds. Sizes may be None
+      when not known (e.g. for messages received in batches).
+
+    Errors are keyed by the close code they correspond to (even if the connection is not
+      closed because the processor is not strict): 1002 for unknown or unavailable messages,
+      1003 for invalid message formats, 1011 for unexpected exceptions, and 1001 for idle
+      connections being reaped (see MessageProcessor.IDLE_TIMEOUT).
+    """
+
+    def message_received(self, processor, command, size, parse_time, dispatch_time, handler_time):
+        pass
+
+    def message_sent(self, processor, command, size):
+        pass
+
+    def error(self, processor, code, command=None):
+        pass
+
+    def closed(self, processor, code, reason):
+        pass
+
+
+class MemorySink(MetricsSink):
+    """
+    Aggregates the events in memory: a CommandMetrics object per command, and tallies of the
+      errors and forceful closes by their close code. Not thread-safe.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.commands = {}
+        self.errors = {}
+        self.closes = {}
+
+    def command(self, command):
+        """
+        Gets (creating it if needed) the CommandMetrics object of a command.
+        """
+        try:
+            return self.commands[command]
+        except KeyError:
+            metrics = self.commands[command] = CommandMetrics()
+            return metrics
+
+    def message_received(self, processor, command, size, parse_time, dispatch_time, handler_time):
+        metrics = self.command(command)
+        metrics.messages_in += 1
+        if size is not None:
+            metrics.bytes_in += size
+        metrics.parse.record(parse_time)
+        metrics.dispatch.record(dispatch_time)
+        metrics.handler.record(handler_time)
+
+    def message_sent(self, processor, command, size):
+        metrics = self.command(command)
+        metrics.messages_out += 1
+        metrics.bytes_out += size
+
+    def error(self, processor, code, command=None):
+        self.errors[code] = self.errors.get(code, 0) + 1
+        if command is not None:
+            errors = self.command(command).errors
+            errors[code] = errors.get(code, 0) + 1
+
+    def closed(self, processor, code, reason):
+        self.closes[code] = self.closes.get(code, 0) + 1
+
+    def snapshot(self):
+        """
+        A JSON-friendly view of the aggregated data. Commands are keyed by their
+          "namespace.code" string (or "unknown").
+        """
+        return {
+            'commands': dict((_command_name(command), metrics.as_dict()) for command, metrics in self.commands.items()),
+            'errors': dict(self.errors),
+            'closes': dict(self.closes),
+        }
+
+
+def _command_name(command):
+    if command is None:
+        return 'unknown'
+    return '.'.join(str(getattr(part, 'string', part)) for part in command)
@@ -1,14 +1,33 @@
 import six
+import inspect
 import logging
+from collections import deque
 from cantrips.protocol.messaging.layers import ProtocolLayer
 from cantrips.protocol.messaging.formats import Translator, Formats, ANY_COMMAND
+from cantrips.protocol.messaging.messages import Message, LazyMessage
+from cantrips.protocol.messaging.compression import CompressionStats
+from cantrips.protocol.messaging.metrics import clock
 
 logger = logging.getLogger("cantrips.protocol.message.processor")
 
+# Result of running a handler chain when a handler returned a pending awaitable.
+PENDING = object()
+
+_iscoroutinefunction = getattr(inspect, 'iscoroutinefunction', lambda f: False)
+
+
+def _may_await(handler):
+    """
+    Tells whether a handler is known to return awaitables before running it: coroutine
+      functions, and handlers marked with an `awaitable` attribute (e.g. offloaded ones).
+    """
+    return getattr(handler, 'awaitable', False) or _iscoroutinefunction(handler)
+
 
 class MessageProcessorMetaClass(type):
     """
-    Initializes the class object by instantiating the ProtocolLayer objects.
+    Initializes the class object by instantiating the ProtocolLayer objects, and merging
+      their handlers into a single dispatch table.
     """
 
     def __init__(cls, what, bases=None, dict=None):
@@ -21,12 +40,14 @@ class MessageProcessorMetaClass(type):
                 raise TypeError("Elements of LAYERS attribute must be classes -not instances- being derived")
             return layer_class(processor_class)
 
-        super(MessageProcessorMetaClass, cls).__init__(what, bases=bases, dict=dict)
-        # Translator - recognizing/instantiating
+        super(MessageProcessorMetaClass, cls).__init__(what, bases, dict)
+        cls._DISPATCH = {}
+        cls._AWAITING = set()
+        # Abstract processors (e.g. the base class and the per-framework adapters) do not define
+        #   a translator, and so they are not initialized.
         if not hasattr(cls, 'TRANSLATOR'):
-            raise TypeError("TRANSLATOR member must be defined as a subclass of"
-                            " cantrips.protocol.messaging.formats.Translator, or an instance of"
-                            " such acceptable classes")
+            return
+        # Translator - recognizing/instantiating
         if not isinstance(cls.TRANSLATOR, Translator):
             if not isinstance(cls.TRANSLATOR, type) or not issubclass(cls.TRANSLATOR, Translator):
                 raise TypeError("TRANSLATOR must be defined as either a subclass of"
@@ -44,6 +65,12 @@ class MessageProcessorMetaClass(type):
                                  ' with at least one element being a class derived from'
                                  ' cantrips.protocol.messaging.layers.ProtocolLayer')
         cls.LAYERS = tuple(create_protocol_layer(layer_class, cls) for layer_class in layers)
+        # Precompiling the dispatch table for the explicitly handled commands.
+        cls.invalidate_dispatch()
+        for layer in cls.LAYERS:
+            for namespace, code in layer.handled_commands():
+                if namespace is not ANY_COMMAND and code is not ANY_COMMAND:
+                    cls.dispatch_chain((namespace, code))
 
     def feed_translator(cls, namespace, code=ANY_COMMAND):
         """
@@ -55,6 +82,33 @@ class MessageProcessorMetaClass(type):
             if code is not ANY_COMMAND:
                 ns_.add_command(code)
 
+    def invalidate_dispatch(cls):
+        """
+        Discards the dispatch table. It will be rebuilt, on demand, as messages arrive.
+          Layers call this method when new handlers are added.
+        """
+        cls._DISPATCH = {}
+        cls._AWAITING = set()
+
+    def dispatch_chain(cls, code):
+        """
+        Gets the handlers (by precedence: layer order first, and handler specificity then) that
+          can process a command. Only one handler per layer is considered, and layers having no
+          handler for the command are skipped. The result is computed once per command.
+        :param code: A (namespace, code) tuple of CommandSpec instances.
+        :returns: A tuple of callables accepting (socket, message).
+        """
+        try:
+            return cls._DISPATCH[code]
+        except KeyError:
+            namespace, command = code
+            chain = tuple(handler for handler in (layer.handler_for(namespace, command) for layer in cls.LAYERS)
+                          if handler)
+            cls._DISPATCH[code] = chain
+            if any(_may_await(handler) for handler in chain):
+                cls._AWAITING.add(code)
+            return chain
+
 
 class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
     """
@@ -69,6 +123,94 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         """
         pass
 
+    # Outbound batching. When enabled, messages sent in the same loop iteration are
+    #   sent together as a single frame carrying an array of messages (a single message
+    #   is sent as is). The frame is sent after BATCH_DELAY seconds, or as soon as the
+    #   batch has BATCH_MAX_SIZE messages.
+    BATCH_OUTPUT = False
+    BATCH_MAX_SIZE = 32
+    BATCH_DELAY = 0
+
+    # Inbound batching. When enabled, a received frame may carry an array of messages.
+    BATCH_INPUT = False
+
+    # Per-connection msgpack codec (msgpack-based formats only). When enabled, each connection
+    #   keeps its own msgpack.Packer and streaming msgpack.Unpacker (created with these options)
+    #   instead of using the module-level msgpack functions on each message. The default buffer
+    #   sizes are tuned for small frames, while keeping the allowed frame size.
+    MSGPACK_PER_CONNECTION = False
+    MSGPACK_PACKER_OPTIONS = {'use_bin_type': True}
+    MSGPACK_UNPACKER_OPTIONS = {'raw': False, 'read_size': 16 * 1024, 'max_buffer_size': 1 << 20}
+
+    # Websocket compression (permessage-deflate), used by the websocket adapters. When enabled,
+    #   it is negotiated with the clients supporting it, and messages shorter than
+    #   COMPRESSION_MIN_SIZE bytes are sent uncompressed. Disabling context takeover makes each
+    #   side compress every message from scratch: lower ratio, but no per-connection state kept
+    #   between messages. Sent messages are counted in the compression_stats attribute. Each
+    #   adapter documents which of these settings it honours.
+    COMPRESSION = False
+    COMPRESSION_MIN_SIZE = 256
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_MEM_LEVEL = 8
+    COMPRESSION_SERVER_CONTEXT_TAKEOVER = True
+    COMPRESSION_CLIENT_CONTEXT_TAKEOVER = True
+
+    # Instrumentation. When a sink (see cantrips.protocol.messaging.metrics) is set, it is told
+    #   about every received message (with its parse, dispatch and handler times), sent message,
+    #   error and forceful close. When None, nothing is measured.
+    METRICS_SINK = None
+
+    # Outbound backpressure. Data is written to the transport while it accepts more (adapters
+    #   tell when their transport buffers are full: see _conn_write_paused); otherwise it is
+    #   queued, and written as the transport drains. When the queued bytes exceed
+    #   OUTBOUND_HIGH_WATER, the OUTBOUND_OVERFLOW policy applies:
+    #   - OVERFLOW_CLOSE: the connection is forcefully closed with OUTBOUND_CLOSE_CODE.
+    #   - OVERFLOW_DROP: the oldest queued messages of the OUTBOUND_DROPPABLE commands are
+    #     dropped. If that is not enough, the connection is closed. With BATCH_OUTPUT, a batch
+    #     is only dropped if all of its messages are of such commands.
+    #   - OVERFLOW_PAUSE: producers are paused (see _on_outbound_paused; the adapters also stop
+    #     reading from the other end, if they can) until the queued bytes are not above
+    #     OUTBOUND_LOW_WATER again.
+    OVERFLOW_CLOSE = 'close'
+    OVERFLOW_DROP = 'drop'
+    OVERFLOW_PAUSE = 'pause'
+    OUTBOUND_HIGH_WATER = 1 << 20
+    OUTBOUND_LOW_WATER = 1 << 18
+    OUTBOUND_OVERFLOW = OVERFLOW_CLOSE
+    OUTBOUND_DROPPABLE = frozenset()
+    OUTBOUND_CLOSE_CODE = 4000
+
+    # Asynchronous handlers. A handler may return an awaitable (a coroutine, or a future of the
+    #   underlying framework: e.g. an asyncio or Tornado Future, or a Twisted Deferred) resolving
+    #   in the thread of the event loop. Its value is taken as the result of the handler (e.g.
+    #   ProtocolLayer.CANNOT_HANDLE passes the message to the next handlers), and its errors as if
+    #   the handler raised them. While it is pending:
+    #   - With ORDERED_HANDLERS, the next messages of the connection wait for it.
+    #   - Otherwise, up to MAX_CONCURRENT_HANDLERS handlers may be pending per connection.
+    #   HANDLERS_LIMITER (a HandlerLimiter, see cantrips.protocol.messaging.concurrency) may be
+    #   shared by many processors to limit their pending handlers altogether: only messages of
+    #   commands whose handlers are known to return awaitables (coroutine functions, offloaded
+    #   handlers, or handlers having returned one before) wait for it. Messages wait in
+    #   order, and reading from the other end is paused (if the adapter can) while more than
+    #   MAX_WAITING_MESSAGES are waiting.
+    ORDERED_HANDLERS = True
+    MAX_CONCURRENT_HANDLERS = 16
+    HANDLERS_LIMITER = None
+    MAX_WAITING_MESSAGES = 256
+
+    # Keepalive. When KEEPALIVE_INTERVAL (seconds) is set, connections having received nothing
+    #   (neither messages nor pongs) during an interval are pinged: with a websocket ping in the
+    #   websocket adapters, or otherwise by sending the KEEPALIVE_PING message (a (namespace,
+    #   code) pair the other end must answer with any message; None sends nothing). When
+    #   IDLE_TIMEOUT (seconds) is set, connections having received nothing for that long are
+    #   reaped: see _on_idle, add_idle_handler, and terminate(). Idle time is counted in whole intervals (or in
+    #   IDLE_TIMEOUT periods, without KEEPALIVE_INTERVAL), by a single timeout per connection
+    #   (see start_timeout) reused on each interval: the adapters schedule the timeouts of all
+    #   their connections in the shared timing wheel of their loop.
+    KEEPALIVE_INTERVAL = None
+    KEEPALIVE_PING = None
+    IDLE_TIMEOUT = None
+
     # ##################### Initialization ################################### #
 
     def __init__(self, strict=False):
@@ -76,6 +218,27 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         Initializes whether it is strict or not.
         """
         self.strict = strict
+        self._outbox = []
+        self._outbox_scheduled = False
+        self._outbox_droppable = True
+        self._outbound = deque()
+        self._outbound_closed = False
+        self._conn_closed = False
+        self._write_paused = False
+        self.outbound_bytes = 0
+        self.outbound_dropped = 0
+        self.outbound_paused = False
+        self.compression_stats = CompressionStats()
+        self._handlers_pending = 0
+        self._handlers_waiting = deque()
+        self._inbound_paused = False
+        self._keepalive = None
+        self._keepalive_seen = False
+        self._idle_time = 0
+        self._idle_handlers = []
+        self._broker = None
+        if self.MSGPACK_PER_CONNECTION:
+            self._broker = self.TRANSLATOR.create_broker(self.MSGPACK_PACKER_OPTIONS, self.MSGPACK_UNPACKER_OPTIONS)
 
     # ##################### Implementation-dependent ######################### #
 
@@ -85,9 +248,48 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
     def _conn_send(self, data, binary=None):
         raise NotImplementedError
 
+    def _conn_pause_reading(self):
+        """
+        Stops reading data from the other end (see OVERFLOW_PAUSE). Optional.
+        """
+
+    def _conn_resume_reading(self):
+        """
+        Resumes reading data from the other end. Optional.
+        """
+
+    def _conn_ping(self):
+        """
+        Pings the other end (see KEEPALIVE_INTERVAL). Websocket adapters send a ping frame.
+        """
+        if self.KEEPALIVE_PING is not None:
+            ns, code = self.KEEPALIVE_PING
+            self.send_message(ns, code)
+
     def _create_timeout(self, seconds, callback):
         raise NotImplementedError
 
+    def _call_later(self, seconds, callback):
+        raise NotImplementedError
+
+    def _conn_future(self, awaitable):
+        """
+        Runs an awaitable not being a future (e.g. the coroutine returned by a handler) in the
+          event loop, and returns its future (an object having either add_done_callback, or
+          addCallbacks like a Deferred). Needed for coroutine handlers.
+        """
+        raise NotImplementedError
+
+    def _conn_wrap_future(self, future, then):
+        """
+        Wraps a concurrent.futures.Future (resolving in another thread, e.g. a worker of a pool)
+          in a future of the event loop (like the ones _conn_future returns). When the former
+          resolves, then(result) is invoked in the thread of the event loop, and the latter
+          resolves to what it returns. Errors (of the former future, or raised by `then`) make
+          the latter fail. Needed to offload work (see cantrips.protocol.traits.decorators.offload).
+        """
+        raise NotImplementedError
+
     # ###################### Translation-related ############################# #
 
     def _trans_serialize(self, message):
@@ -96,7 +298,7 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         :param message: A message (Message instance) to serialize.
         :returns: (json|msgpack)-encoded raw data.
         """
-        return self.TRANSLATOR.serialize(message)
+        return self.TRANSLATOR.serialize(message, self._broker)
 
     def _trans_parse(self, data, binary=None):
         """
@@ -107,7 +309,24 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
           Usually this will be non-None for Websockets only.
         :returns: A parsed and built message (Message instance).
         """
-        return self.TRANSLATOR.parse_data(data, binary)
+        return self.TRANSLATOR.parse_data(data, binary, broker=self._broker)
+
+    def _trans_decode(self, data, binary=None):
+        """
+        Given a raw message data, it decodes it (without building messages) using the by-class translator.
+        :param data: (json|msgpack)-encoded raw data.
+        :param binary: Whether the received data has arrived as binary or frame.
+        :returns: A decoded object, being either a single message map or an array of them.
+        """
+        return self.TRANSLATOR.decode(data, binary, self._broker)
+
+    def _trans_build(self, payload):
+        """
+        Given a decoded message map, it builds a message using the by-class translator.
+        :param payload: A decoded message map.
+        :returns: A parsed and built message (Message instance).
+        """
+        return self.TRANSLATOR.parse_payload(payload)
 
     # ################# Related to unexpected conditions ################# #
 
@@ -120,6 +339,9 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         """
 
         self._on_forceful_close(code, reason)
+        if self.METRICS_SINK is not None:
+            self.METRICS_SINK.closed(self, code, reason)
+        self._flush_outbox()
         self._conn_close(code, reason)
 
     def _close_invalid_format(self, data, binary=None):
@@ -128,7 +350,9 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         self._forceful_close(1003, "Message format error")
 
     def _close_protocol_violation(self, message):
-        logger.debug("Unexistent or unavailable message: " + repr(message))
+        # Lazy messages are not decoded just to be logged: only their code is.
+        logger.debug("Unexistent or unavailable message: %r",
+                     message.code if isinstance(message, LazyMessage) else message)
         # 1002 sera para mensaje no disponible o violacion de protocolo
         self._forceful_close(1002, "Unexistent or unavailable message")
 
@@ -139,14 +363,155 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
 
     # ###################### Fully-Implemented ########################### #
 
-    def send_message(self, message):
+    def send_message(self, *args, **kwargs):
         """
         Takes a message and serializes it, according to the in-use translator.
-        :param message: Message being sent.
+        A namespace and a code (and further arguments) may be given instead of a message,
+          and the message will be built from them: send_message(ns, code, *args, **kwargs).
+          Any keyword argument (even `message`, as the traits send) is an argument of the
+          built message, so the parameters are not named.
         :returns: Whatever the implementation of _conn_send returns.
         """
 
-        return self._conn_send(self._trans_serialize(message), self.TRANSLATOR.format == Formats.FORMAT_INTEGER)
+        if args and isinstance(args[0], Message):
+            if len(args) > 1 or kwargs:
+                raise TypeError("send_message() takes no further arguments along with a message")
+            message = args[0]
+        else:
+            message = Message(*args, **kwargs)
+        return self.send_raw(self._trans_serialize(message), message.code)
+
+    def send_raw(self, data, command=None):
+        """
+        Sends already-serialized data (i.e. the result of serializing a message with the
+          same translator this processor uses). This is useful to serialize a message once
+          and send it to many processors.
+        :param data: (json|msgpack)-encoded raw data.
+        :param command: The (namespace, code) of the serialized message, if known. Only
+          used for instrumentation.
+        :returns: Whatever the implementation of _conn_send returns.
+        """
+
+        if self.METRICS_SINK is not None:
+            self.METRICS_SINK.message_sent(self, command, len(data))
+        if not self.BATCH_OUTPUT:
+            return self._write(data, self.TRANSLATOR.format != Formats.FORMAT_STRING,
+                               int(command in self.OUTBOUND_DROPPABLE))
+
+        self._outbox.append(data)
+        if command not in self.OUTBOUND_DROPPABLE:
+            self._outbox_droppable = False
+        if len(self._outbox) >= self.BATCH_MAX_SIZE:
+            return self._flush_outbox()
+        if not self._outbox_scheduled:
+            self._outbox_scheduled = True
+            self._call_later(self.BATCH_DELAY, self._flush_scheduled)
+
+    def flush_outbox(self):
+        """
+        Sends the pending batched messages (if any) in a single frame. It is not named flush(),
+          since adapters' base classes may define such a method (e.g. Tornado's RequestHandler).
+        :returns: Whatever the implementation of _conn_send returns, or None if nothing was pending.
+        """
+
+        return self._flush_outbox()
+
+    def _flush_outbox(self):
+        outbox = self._outbox
+        if not outbox:
+            return None
+        self._outbox = []
+        droppable = len(outbox) if self._outbox_droppable else 0
+        self._outbox_droppable = True
+        data = outbox[0] if len(outbox) == 1 else self.TRANSLATOR.serialize_batch(outbox)
+        return self._write(data, self.TRANSLATOR.format != Formats.FORMAT_STRING, droppable)
+
+    def _write(self, data, binary, droppable=0):
+        """
+        Writes data to the transport or, if the transport is not accepting more data, queues it.
+        :param data: Data to send.
+        :param binary: Whether the data is binary.
+        :param droppable: The count of messages in the data, if all of them are of the
+          OUTBOUND_DROPPABLE commands. Otherwise, 0: the data cannot be dropped.
+        :returns: Whatever the implementation of _conn_send returns, or None if the data was queued.
+        """
+
+        if self._outbound_closed:
+            return None
+        if not self._write_paused and not self._outbound:
+            return self._conn_send(data, binary)
+        self._outbound.append((data, binary, droppable))
+        self.outbound_bytes += len(data)
+        if self.outbound_bytes > self.OUTBOUND_HIGH_WATER:
+            self._outbound_overflow()
+
+    def _outbound_overflow(self):
+        """
+        Applies the OUTBOUND_OVERFLOW policy, since the queued bytes exceed the high water mark.
+        """
+
+        if self.OUTBOUND_OVERFLOW == self.OVERFLOW_PAUSE:
+            if not self.outbound_paused:
+                self.outbound_paused = True
+                self._conn_pause_reading()
+                self._on_outbound_paused()
+            return
+        if self.OUTBOUND_OVERFLOW == self.OVERFLOW_DROP and self._drop_outbound():
+            return
+        self._outbound.clear()
+        self.outbound_bytes = 0
+        self._outbound_closed = True
+        self._forceful_close(self.OUTBOUND_CLOSE_CODE, "Outbound queue overflow")
+
+    def _drop_outbound(self):
+        """
+        Drops the oldest queued messages (or batches) of the OUTBOUND_DROPPABLE commands until
+          the queued bytes do not exceed the high water mark.
+        :returns: Whether enough messages could be dropped.
+        """
+
+        kept = deque()
+        for entry in self._outbound:
+            if self.outbound_bytes > self.OUTBOUND_HIGH_WATER and entry[2]:
+                self.outbound_bytes -= len(entry[0])
+                self.outbound_dropped += entry[2]
+            else:
+                kept.append(entry)
+        self._outbound = kept
+        return self.outbound_bytes <= self.OUTBOUND_HIGH_WATER
+
+    def _conn_write_paused(self):
+        """
+        Adapters call this method when the transport does not accept more data (e.g. its
+          write buffer is full). Data will be queued until _conn_write_resumed() is called.
+        """
+
+        self._write_paused = True
+
+    def _conn_write_resumed(self):
+        """
+        Adapters call this method when the transport accepts data again. Queued data is
+          written until the transport is paused again, or the queue is empty.
+        """
+
+        self._write_paused = False
+        outbound = self._outbound
+        while outbound and not self._write_paused:
+            data, binary, droppable = outbound.popleft()
+            self.outbound_bytes -= len(data)
+            self._conn_send(data, binary)
+        if self.outbound_paused and self.outbound_bytes <= self.OUTBOUND_LOW_WATER:
+            self.outbound_paused = False
+            if not self._inbound_paused:
+                self._conn_resume_reading()
+            self._on_outbound_resumed()
+
+    def _flush_scheduled(self):
+        self._outbox_scheduled = False
+        try:
+            self._flush_outbox()
+        except Exception as e:
+            self._unknown_exception(e, 'flush')
 
     def terminate(self):
         """
@@ -157,6 +522,7 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
 
         try:
             self._on_goodbye()
+            self._flush_outbox()
             self._conn_close(1000)
         except Exception as e:
             self._unknown_exception(e, 'terminate')
@@ -169,6 +535,64 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
     def stop_timeout(self, timeout):
         timeout.force_stop()
 
+    def _keepalive_start(self):
+        period = self.KEEPALIVE_INTERVAL or self.IDLE_TIMEOUT
+        if period:
+            self._keepalive = self.start_timeout(period, self._keepalive_check)
+
+    def _keepalive_check(self, timeout, forced):
+        """
+        Runs on each keepalive interval: pings or reaps the connection if nothing was received.
+        """
+        if forced or timeout is not self._keepalive:
+            return
+        try:
+            if self._keepalive_seen:
+                self._keepalive_seen = False
+                self._idle_time = 0
+            else:
+                self._idle_time += self.KEEPALIVE_INTERVAL or self.IDLE_TIMEOUT
+                if self.IDLE_TIMEOUT and self._idle_time >= self.IDLE_TIMEOUT:
+                    self._keepalive = None
+                    self._reap()
+                    return
+                self._conn_ping()
+            timeout.reset()
+            timeout.start()
+        except Exception as e:
+            self._keepalive = None
+            self._unknown_exception(e, 'keepalive')
+
+    def add_idle_handler(self, handler):
+        """
+        Adds a handler(processor) to run when this connection is reaped for being idle (see
+          IDLE_TIMEOUT), after _on_idle and before terminate(). Traits use it to release what
+          the connection holds (e.g. UserMasterBroadcast logs its user out).
+        """
+        if handler not in self._idle_handlers:
+            self._idle_handlers.append(handler)
+
+    def remove_idle_handler(self, handler):
+        if handler in self._idle_handlers:
+            self._idle_handlers.remove(handler)
+
+    def _reap(self):
+        """
+        Terminates an idle connection (see IDLE_TIMEOUT).
+        """
+        if self.METRICS_SINK is not None:
+            self.METRICS_SINK.error(self, 1001)
+        try:
+            self._on_idle()
+        except Exception as e:
+            self._unknown_exception(e, '_on_idle')
+        for handler in list(self._idle_handlers):
+            try:
+                handler(self)
+            except Exception as e:
+                self._unknown_exception(e, 'idle handler')
+        self.terminate()
+
     # ############################ Internal Events/Hooks ########################### #
 
     # Events from the client
@@ -183,6 +607,7 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
           A use case for this is an echo server.
         """
 
+        self._keepalive_start()
         try:
             self._on_hello()
         except self.CloseConnection:
@@ -190,6 +615,25 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         except Exception as e:
             self._unknown_exception(e, '_conn_made')
 
+    def _conn_alive(self):
+        """
+        Processes the event when the other end shows it is alive without sending a message
+          (e.g. a websocket pong). Messages count by themselves.
+        """
+        self._keepalive_seen = True
+
+    def _conn_lost(self):
+        """
+        Processes the event when the connection is closed (by either end): it stops the
+          keepalive timeout, and discards the messages waiting for a handler. Pending
+          asynchronous handlers are not cancelled, but their outcome is ignored.
+        """
+        self._conn_closed = True
+        self._discard_waiting()
+        keepalive, self._keepalive = self._keepalive, None
+        if keepalive is not None:
+            self.stop_timeout(keepalive)
+
     def _conn_message(self, data, binary=None):
         """
         Processes a client message. It will parse it and dispatch it to the layers.
@@ -197,35 +641,323 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         If an exception occurs when serializing a message, or another unexpected exception occurs
           when processing a message, such scenarios can also be handled.
 
-        :param data: Data being parsed.
+        If BATCH_INPUT is set, the data may also be an array of messages. They will be processed
+          in order, each one as if it was received alone (e.g. a malformed message is handled
+          according to the `strict` attribute). Processing stops if the connection is closed.
+
+        :param data: Data being parsed. It may also be a buffer (bytearray or memoryview) which
+          will not be used after this call returns (e.g. a reused receive buffer).
         :param binary: Tells whether the incoming data is binary, text, or unspecified.
           Typically it is only specified for websockets.
+        :returns: Whether further messages may be processed (i.e. the connection was not closed).
         """
 
+        if not self.BATCH_INPUT:
+            return self._conn_process(lambda: self._trans_parse(data, binary), data, binary, len(data))
+
         try:
-            message = self._trans_parse(data, binary)
-            for layer in self.LAYERS:
-                try:
-                    # If no error occurs, processing this layer is enough.
-                    # Other layers will be processed if one of those expected
-                    #   errors occur.
-                    layer.process_message(self, message)
-                    return
-                except ProtocolLayer.ICannotHandle:
-                    # Iteration continues to the next layer.
-                    pass
-                except ProtocolLayer.NobodyCanHandle:
-                    # Iteration gets out and It's assured that it will
-                    # not be handled.
-                    break
+            payload = self._trans_decode(data, binary)
+        except self._serializer_exceptions() as error:
+            self._serializer_exception(error, data, binary)
+            return not self.strict
+        except Exception as error:
+            self._unknown_exception(error, '_conn_message')
+            return not self.strict
+
+        return self._conn_payload(payload, data, binary, len(data))
+
+    def _conn_payload(self, payload, data=None, binary=None, size=None):
+        """
+        Processes an already-decoded client message (or array of messages, if BATCH_INPUT is set).
+          Streaming transports decoding messages by themselves will call this method instead of
+          _conn_message(data, binary).
+
+        :param payload: The decoded message map, or array of them.
+        :param data: Data being parsed, if available.
+        :param binary: Tells whether the incoming data is binary, text, or unspecified.
+        :param size: The size of the received data, if known. Only used for instrumentation.
+        :returns: Whether further messages may be processed (i.e. the connection was not closed).
+        """
+
+        if not (self.BATCH_INPUT and self.TRANSLATOR.is_batch(payload)):
+            return self._conn_process(lambda: self._trans_build(payload), data, binary, size)
+        for item in payload:
+            if not self._conn_process(lambda: self._trans_build(item), data, binary):
+                return False
+        return True
+
+    def _conn_process(self, parse, data, binary=None, size=None):
+        """
+        Parses (by calling `parse`) a single message and dispatches it to the layers, or makes
+          it wait if no handler is available (see ORDERED_HANDLERS).
+
+        :param parse: A callable returning the parsed message.
+        :param data: Data being parsed.
+        :param binary: Tells whether the incoming data is binary, text, or unspecified.
+        :param size: The size of the message data, if known. Only used for instrumentation.
+        :returns: Whether further messages in the same frame may be processed
+          (i.e. the connection was not closed).
+        """
+
+        self._keepalive_seen = True
+        try:
+            if self.METRICS_SINK is None:
+                message = parse()
+                timing = None
+            else:
+                start = clock()
+                message = parse()
+                timing = (size, clock() - start)
+        except self._serializer_exceptions() as error:
+            self._serializer_exception(error, data, binary)
+            return not self.strict
+        except Exception as error:
+            self._unknown_exception(error, '_conn_message')
+            return not self.strict
+
+        if self._handlers_waiting or not self._handler_available(message):
+            return self._wait_handler(message, timing)
+        return self._process(message, timing, data, binary)
+
+    def _process(self, message, timing, data=None, binary=None):
+        """
+        Dispatches a parsed message to the layers.
+
+        :param message: A parsed message.
+        :param timing: A tuple (size, parse time) when measuring, or None.
+        :returns: Whether further messages may be processed (i.e. the connection was not closed).
+        """
+
+        try:
+            if timing is None:
+                handled = self._dispatch(message)
+            else:
+                handled = self._measured_dispatch(message, *timing)
+            if handled:
+                return True
             # Since no layer could process it, we handle it as unknown message.
             self._unknown_message(message)
         except self.CloseConnection:
             self.terminate()
+            return False
         except self._serializer_exceptions() as error:
             self._serializer_exception(error, data, binary)
         except Exception as error:
             self._unknown_exception(error, '_conn_message')
+        return not self.strict
+
+    def _serializer_exceptions(self):
+        """
+        Exceptions telling that the received data could not be parsed.
+        """
+        return (Translator.Error,) + self.TRANSLATOR.exceptions
+
+    def _measured_dispatch(self, message, size, parse_time):
+        """
+        Like dispatching a message, but measuring the dispatch and handler times, and telling
+          them (and the parse time) to the metrics sink. The handler time of asynchronous
+          handlers lasts until they resolve.
+        :returns: Whether a handler processed the message (or PENDING).
+        """
+
+        start = clock()
+        chain = type(self).dispatch_chain(message.code)
+        resolved = clock()
+        timing = (size, parse_time, resolved - start, resolved)
+        handled = None
+        try:
+            handled = self._run_chain(chain, message, 0, timing)
+        finally:
+            if handled is not PENDING:
+                self._report_received(message, timing)
+        return handled
+
+    def _report_received(self, message, timing):
+        size, parse_time, dispatch_time, started = timing
+        self.METRICS_SINK.message_received(self, message.code, size, parse_time, dispatch_time, clock() - started)
+
+    def _dispatch(self, message):
+        """
+        Runs the message through the precompiled chain of handlers for its command.
+        :param message: A parsed message.
+        :returns: Whether a handler processed the message (or PENDING).
+        """
+
+        return self._run_chain(type(self).dispatch_chain(message.code), message)
+
+    def _run_chain(self, chain, message, start=0, timing=None):
+        """
+        Runs the message through a chain of handlers (see _dispatch), from the given index.
+        :returns: Whether a handler processed the message, or PENDING if a handler returned
+          an awaitable (the chain continues when it resolves).
+        """
+
+        for index in range(start, len(chain)):
+            try:
+                # If no sentinel is returned and no error occurs, processing
+                #   this handler is enough. Other handlers will be processed
+                #   if the current one could not handle the message.
+                result = chain[index](self, message)
+            except ProtocolLayer.ICannotHandle:
+                # Iteration continues to the next handler.
+                continue
+            except ProtocolLayer.NobodyCanHandle:
+                # Iteration gets out and It's assured that it will
+                # not be handled.
+                return False
+            if result is None:
+                return True
+            if result is ProtocolLayer.CANNOT_HANDLE:
+                continue
+            if result is ProtocolLayer.NOBODY_CAN_HANDLE:
+                return False
+            future = self._handler_future(result)
+            if future is None:
+                return True
+            self._await_handler(future, chain, index, message, timing)
+            return PENDING
+        return False
+
+    # Asynchronous handlers
+
+    def _handler_future(self, result):
+        """
+        Gets the future of a handler result, or None if the result is not an awaitable.
+        """
+
+        if hasattr(result, 'add_done_callback') or hasattr(result, 'addCallbacks'):
+            return result
+        if hasattr(result, '__await__'):
+            return self._conn_future(result)
+        return None
+
+    def _handler_available(self, message):
+        """
+        Tells whether a handler may run now for a message. If the HANDLERS_LIMITER is full and
+          the handlers of the message may return awaitables, this processor waits for it to
+          release a slot.
+        """
+
+        if self._handlers_pending >= (1 if self.ORDERED_HANDLERS else self.MAX_CONCURRENT_HANDLERS):
+            return False
+        limiter = self.HANDLERS_LIMITER
+        if limiter is not None and limiter.full() and message.code in type(self)._AWAITING:
+            limiter.wait(self)
+            return False
+        return True
+
+    def _wait_handler(self, message, timing):
+        """
+        Makes a parsed message wait until a handler is available.
+        """
+
+        waiting = self._handlers_waiting
+        waiting.append((message, timing))
+        if not self._inbound_paused and len(waiting) > self.MAX_WAITING_MESSAGES:
+            self._inbound_paused = True
+            self._conn_pause_reading()
+        return True
+
+    def _resume_handlers(self):
+        """
+        Processes the waiting messages, in order, while handlers are available.
+        """
+
+        waiting = self._handlers_waiting
+        while waiting and self._handler_available(waiting[0][0]):
+            message, timing = waiting.popleft()
+            if not self._process(message, timing):
+                self._discard_waiting()
+        if self._inbound_paused and len(waiting) <= self.MAX_WAITING_MESSAGES // 2:
+            self._inbound_paused = False
+            if not self.outbound_paused:
+                self._conn_resume_reading()
+
+    def _discard_waiting(self):
+        """
+        Discards the waiting messages, since the connection is being closed.
+        """
+
+        self._handlers_waiting.clear()
+        if self.HANDLERS_LIMITER is not None:
+            self.HANDLERS_LIMITER.discard(self)
+
+    def _await_handler(self, future, chain, index, message, timing):
+        """
+        Takes a handler slot until the future returned by a handler resolves.
+        """
+
+        self._handlers_pending += 1
+        type(self)._AWAITING.add(message.code)
+        if self.HANDLERS_LIMITER is not None:
+            self.HANDLERS_LIMITER.acquire()
+
+        def resolved(result):
+            self._handler_done(chain, index, message, timing, result, None)
+
+        def failed(failure):
+            # Twisted wraps the errors in Failure objects.
+            self._handler_done(chain, index, message, timing, None, failure.value)
+
+        def done(future):
+            if future.cancelled():
+                resolved(None)
+            elif future.exception() is not None:
+                self._handler_done(chain, index, message, timing, None, future.exception())
+            else:
+                resolved(future.result())
+
+        if hasattr(future, 'addCallbacks'):
+            future.addCallbacks(resolved, failed)
+        else:
+            future.add_done_callback(done)
+
+    def _handler_done(self, chain, index, message, timing, result, error):
+        """
+        Processes the outcome of an asynchronous handler: the rest of the chain is run if it
+          could not handle the message. Then, the waiting messages are resumed.
+        """
+
+        self._handlers_pending -= 1
+        if self._conn_closed:
+            # The other end is gone: neither the rest of the chain nor the waiting messages run.
+            if self.HANDLERS_LIMITER is not None:
+                self.HANDLERS_LIMITER.release()
+            return
+        handled = None
+        proceed = False
+        try:
+            try:
+                if error is not None:
+                    raise error
+            except ProtocolLayer.ICannotHandle:
+                result = ProtocolLayer.CANNOT_HANDLE
+            except ProtocolLayer.NobodyCanHandle:
+                result = ProtocolLayer.NOBODY_CAN_HANDLE
+            if result is ProtocolLayer.CANNOT_HANDLE:
+                handled = self._run_chain(chain, message, index + 1, timing)
+            else:
+                handled = result is not ProtocolLayer.NOBODY_CAN_HANDLE
+            proceed = bool(handled)
+            if not handled:
+                self._unknown_message(message)
+                proceed = not self.strict
+        except self.CloseConnection:
+            self.terminate()
+        except self._serializer_exceptions() as error:
+            self._serializer_exception(error, None)
+            proceed = not self.strict
+        except Exception as error:
+            self._unknown_exception(error, '_handler_done')
+            proceed = not self.strict
+        finally:
+            if timing is not None and handled is not PENDING:
+                self._report_received(message, timing)
+            if not proceed:
+                self._discard_waiting()
+            if self.HANDLERS_LIMITER is not None:
+                self.HANDLERS_LIMITER.release()
+        self._resume_handlers()
 
     # Something has happened!
 
@@ -237,6 +969,8 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         Otherwise it is handled by ._on_unknown_exception.
         """
 
+        if self.METRICS_SINK is not None:
+            self.METRICS_SINK.error(self, 1011)
         if self.strict:
             self._close_unknown(error)
         else:
@@ -253,6 +987,8 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         :param binary: If the data was intended as binary. Intended only for websockets.
         """
 
+        if self.METRICS_SINK is not None:
+            self.METRICS_SINK.error(self, 1003)
         if self.strict:
             self._close_invalid_format(data, binary)
         else:
@@ -266,6 +1002,8 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         Otherwise it is handled by ._on_unknown_message.
         """
 
+        if self.METRICS_SINK is not None:
+            self.METRICS_SINK.error(self, 1002, message.code)
         if self.strict:
             self._close_protocol_violation(message)
         else:
@@ -317,6 +1055,26 @@ class MessageProcessor(six.with_metaclass(MessageProcessorMetaClass)):
         :param error: Exception being attended.
         """
 
+    def _on_outbound_paused(self):
+        """
+        Processes the event when the outbound queue exceeds the high water mark, and the
+          OVERFLOW_PAUSE policy is used: producers of messages for this connection (e.g.
+          broadcasts) should stop sending until _on_outbound_resumed() is invoked. The
+          outbound_paused attribute tells the current state.
+        """
+
+    def _on_outbound_resumed(self):
+        """
+        Processes the event when the outbound queue is below the low water mark again.
+        """
+
+    def _on_idle(self):
+        """
+        Processes the event when the connection is reaped for being idle (see IDLE_TIMEOUT),
+          before it is terminated. The other end is likely dead: this is the place to release
+          what it holds (traits may also do that: see add_idle_handler).
+        """
+
     def _on_forceful_close(self, code, reason):
         """
         Pre-process a forceful close. No exception should be triggered here.
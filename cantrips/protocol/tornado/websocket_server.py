@@ -3,10 +3,12 @@ from future.utils import istext
 try:
     from tornado.websocket import WebSocketHandler
     from tornado.ioloop import IOLoop
+    from tornado.concurrent import Future
+    from tornado.escape import utf8
 except:
     raise ImportError("You need to install tornado for this to work (pip install tornado==4.0.2)")
 from cantrips.protocol.messaging.processor import MessageProcessor
-from cantrips.task.timed import TornadoTimeout
+from cantrips.task.timed import TornadoTimingWheel, WheelTimeout
 
 
 class MessageHandler(WebSocketHandler, MessageProcessor):
@@ -14,8 +16,23 @@ class MessageHandler(WebSocketHandler, MessageProcessor):
     This handler formats the messages using json. Messages
       must match a certain specification defined in the
       derivated classes.
+
+    Compression (see MessageProcessor.COMPRESSION) needs
+      tornado>=4.1, and is negotiated through the public
+      get_compression_options: every message is compressed
+      (COMPRESSION_MIN_SIZE does not apply), the context
+      takeover settings are ignored, and the
+      compression_stats count messages as uncompressed.
+
+    Outbound backpressure relies on the futures returned by
+      write_message (tornado>=4.3): bytes are considered
+      buffered until their future resolves. Reading from the
+      other end cannot be paused.
     """
 
+    # Buffered bytes above which the connection is considered full.
+    WRITE_BUFFER_SIZE = 1 << 16
+
     def initialize(self, strict=False):
         """
         Initializes the handler by specifying whether the
@@ -25,6 +42,13 @@ class MessageHandler(WebSocketHandler, MessageProcessor):
         """
 
         MessageProcessor.__init__(self, strict=strict)
+        self._writing = 0
+        self._ioloop = IOLoop.current()
+
+    def get_compression_options(self):
+        if not self.COMPRESSION:
+            return None
+        return {'compression_level': self.COMPRESSION_LEVEL, 'mem_level': self.COMPRESSION_MEM_LEVEL}
 
     def _conn_send(self, data, binary=None):
         """
@@ -32,17 +56,75 @@ class MessageHandler(WebSocketHandler, MessageProcessor):
         """
         if binary is None:
             raise TypeError("For web-socket implementations, binary argument must be set to send ")
-        return self.write_message(data, binary)
+        data = utf8(data)
+        future = self.write_message(data, binary)
+        self.compression_stats.record(len(data))
+        self._track_write(future, len(data))
+        return future
+
+    def _track_write(self, future, size):
+        """
+        Counts the bytes being written until their write future resolves, telling the
+          processor when they exceed WRITE_BUFFER_SIZE (and when they are below its half).
+        """
+        if future is None:
+            return
+        self._writing += size
+        if self._writing > self.WRITE_BUFFER_SIZE and not self._write_paused:
+            self._conn_write_paused()
+
+        def written(future):
+            if not future.cancelled():
+                future.exception()
+            self._writing -= size
+            if self._write_paused and self._writing <= self.WRITE_BUFFER_SIZE // 2:
+                self._conn_write_resumed()
+
+        future.add_done_callback(written)
 
     def _conn_close(self, code, reason=''):
         return self.close(code, reason)
 
     def open(self):
+        # Messages are small and often sent in bursts: without this, Nagle's algorithm
+        #   delays them until the previous segments are acknowledged.
+        self.set_nodelay(True)
         self._conn_made()
 
     def on_message(self, message):
         # Tornado Websocket identifies the body being binary if it is not Unicode.
         self._conn_message(message, not istext(message))
 
+    def on_pong(self, data):
+        self._conn_alive()
+
+    def on_close(self):
+        self._conn_lost()
+
+    def _conn_ping(self):
+        self.ping(b'')
+
     def _create_timeout(self, seconds, callback):
-        return TornadoTimeout(IOLoop.current(), seconds, callback)
\ No newline at end of file
+        return WheelTimeout(TornadoTimingWheel.shared(IOLoop.current()), seconds, callback)
+
+    def _call_later(self, seconds, callback):
+        return IOLoop.current().call_later(seconds, callback)
+
+    def _conn_future(self, awaitable):
+        from tornado.gen import convert_yielded
+        return convert_yielded(awaitable)
+
+    def _conn_wrap_future(self, future, then):
+        wrapped = Future()
+
+        def transfer(done):
+            if wrapped.cancelled():
+                return
+            try:
+                wrapped.set_result(then(done.result()))
+            except Exception as e:
+                wrapped.set_exception(e)
+
+        # IOLoop.add_callback is the only thread-safe method of the loop.
+        future.add_done_callback(lambda done: self._ioloop.add_callback(transfer, done))
+        return wrapped
\ No newline at end of file
@@ -0,0 +1,28 @@
+try:
+    from cantrips.patterns.actions import AccessControlledAction
+except ImportError:
+    from cantrips.patterns.actions import Action
+
+    class AccessControlledAction(Action):
+        """
+        An action running in two steps: a check, producing a result, and either the accepted
+          or the rejected behavior, depending on such result. Released python-cantrips versions
+          do not provide it.
+
+        Each callable takes the object the action is a method of, first:
+        - check(obj, *args, **kwargs): returns the result.
+        - accepts(obj, result): tells whether the result is accepted.
+        - accepted(obj, result, *args, **kwargs) and rejected(obj, result, *args, **kwargs).
+        """
+
+        def __init__(self, check, accepts, accepted, rejected):
+            self.check = check
+            self.accepts = accepts
+            self.accepted = accepted
+            self.rejected = rejected
+
+        def __call__(self, obj, *args, **kwargs):
+            result = self.check(obj, *args, **kwargs)
+            if self.accepts(obj, result):
+                return self.accepted(obj, result, *args, **kwargs)
+            return self.rejected(obj, result, *args, **kwargs)
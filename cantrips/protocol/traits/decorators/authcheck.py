@@ -29,7 +29,7 @@ class IAuthCheck(object):
         @wraps(f)
         def wrapped(self, socket, *args, **kwargs):
             if self.auth_check(socket, True):
-                f(self, socket, *args, **kwargs)
+                return f(self, socket, *args, **kwargs)
         return wrapped
 
     @staticmethod
@@ -41,7 +41,7 @@ class IAuthCheck(object):
         @wraps(f)
         def wrapped(self, socket, *args, **kwargs):
             if self.auth_check(socket, False):
-                f(self, socket, *args, **kwargs)
+                return f(self, socket, *args, **kwargs)
         return wrapped
 
 
@@ -23,7 +23,7 @@ class IInCheck(object):
         @wraps(f)
         def wrapped(self, socket, *args, **kwargs):
             if self.in_check(socket, True):
-                f(self, socket, *args, **kwargs)
+                return f(self, socket, *args, **kwargs)
         return wrapped
 
     @staticmethod
@@ -35,5 +35,5 @@ class IInCheck(object):
         @wraps(f)
         def wrapped(self, socket, *args, **kwargs):
             if self.in_check(socket, False):
-                f(self, socket, *args, **kwargs)
+                return f(self, socket, *args, **kwargs)
         return wrapped
\ No newline at end of file
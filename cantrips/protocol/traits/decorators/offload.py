@@ -0,0 +1,152 @@
+from functools import wraps
+from threading import Lock
+from cantrips.types.exception import factory
+from cantrips.task.features import ConcurrentExecutorFeature, ConcurrentFutureFeature
+from cantrips.protocol.messaging.metrics import clock, LatencyHistogram
+
+
+def _timed_call(work, args, kwargs):
+    """
+    Runs the work in the pool, telling when it started and finished. It is a module-level
+      function, so it can be sent to other processes.
+    """
+    started = clock()
+    result = work(*args, **kwargs)
+    return started, clock(), result
+
+
+class OffloadPool(object):
+    """
+    A bounded pool of threads (or processes, if processes=True) running CPU-heavy work out of
+      the event loop. The executor is created on first use.
+
+    At most max_queue calls may wait for a free worker: further calls are rejected (with
+      OffloadPool.Error, code QUEUE_FULL). The wait (since submission until a worker starts the
+      call) and run times are measured, in nanoseconds.
+
+    With processes, the work and its arguments must be picklable (e.g. module-level functions).
+    """
+
+    Error = factory(['QUEUE_FULL'])
+
+    def __init__(self, workers=4, processes=False, max_queue=256):
+        self.workers = workers
+        self.processes = processes
+        self.max_queue = max_queue
+        self._executor = None
+        self._future_class = None
+        self._lock = Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_time = LatencyHistogram()
+        self.run_time = LatencyHistogram()
+
+    @property
+    def queue_depth(self):
+        """
+        Calls waiting for a free worker.
+        """
+        return max(0, self.pending - self.workers)
+
+    def _get_executor(self):
+        if self._executor is None:
+            thread_pool, process_pool = ConcurrentExecutorFeature.import_it()
+            self._executor = (process_pool if self.processes else thread_pool)(self.workers)
+            self._future_class = ConcurrentFutureFeature.import_it()
+        return self._executor
+
+    def submit(self, work, *args, **kwargs):
+        """
+        Runs work(*args, **kwargs) in the pool.
+        :returns: A concurrent.futures.Future resolving (in another thread) to the work result.
+        """
+        with self._lock:
+            if self.max_queue is not None and self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise self.Error("Offload queue is full (%d calls waiting)" % self.queue_depth,
+                                 self.Error.QUEUE_FULL)
+            self.pending += 1
+            self.submitted += 1
+        submitted = clock()
+        try:
+            timed = self._get_executor().submit(_timed_call, work, args, kwargs)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future = self._future_class()
+        timed.add_done_callback(lambda timed: self._done(timed, submitted, future))
+        return future
+
+    def _done(self, timed, submitted, future):
+        """
+        Counts a finished call, and resolves its future.
+        """
+        try:
+            started, finished, result = timed.result()
+        except Exception as error:
+            with self._lock:
+                self.pending -= 1
+                self.failed += 1
+            future.set_exception(error)
+            return
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.wait_time.record(started - submitted)
+            self.run_time.record(finished - started)
+        future.set_result(result)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait)
+            self._executor = None
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'processes': self.processes,
+                'pending': self.pending,
+                'queue_depth': self.queue_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'wait_ns': self.wait_time.as_dict(),
+                'run_ns': self.run_time.as_dict(),
+            }
+
+
+class IOffload(object):
+    """
+    Runs CPU-heavy parts of commands in the OFFLOAD_POOL (an OffloadPool, usually shared by
+      many objects), so the event loop keeps serving other connections meanwhile.
+    """
+
+    OFFLOAD_POOL = None
+
+    @staticmethod
+    def offload(work):
+        """
+        Wraps a method (the continuation) by running work(*args, **kwargs) in the pool first.
+          When the work finishes, the method is invoked, in the thread of the event loop, as
+          f(self, socket, result, *args, **kwargs): sending messages (or anything else touching
+          the loop) is safe there, but not inside the work.
+
+        The wrapped method returns a future of the loop of the socket (see
+          MessageProcessor._conn_wrap_future) resolving to what the method returns (or failing
+          with the error of the work or the method): handlers may return it, so the processor
+          keeps the order of the messages (see MessageProcessor.ORDERED_HANDLERS).
+        """
+        def decorator(f):
+            @wraps(f)
+            def wrapped(self, socket, *args, **kwargs):
+                future = self.OFFLOAD_POOL.submit(work, *args, **kwargs)
+                return socket._conn_wrap_future(future, lambda result: f(self, socket, result, *args, **kwargs))
+            wrapped.awaitable = True
+            return wrapped
+        return decorator
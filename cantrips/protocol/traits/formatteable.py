@@ -1,4 +1,4 @@
-from cantrips.protocol.messaging.formats import FORMAT_STRING
+from cantrips.protocol.messaging.formats import Formats
 
 
 class IFormatteable(object):
@@ -7,7 +7,7 @@ class IFormatteable(object):
       format, and pick the appropriate format value for a specified CommandSpec.
     """
 
-    COMMAND_FORMAT = FORMAT_STRING
+    COMMAND_FORMAT = Formats.FORMAT_STRING
 
     @classmethod
     def formatted(cls, prop):
@@ -15,4 +15,4 @@ class IFormatteable(object):
         Takes a property, expected to be a CommandSpec, and chooses one of its values, based on the
           value in COMMAND_FORMAT
         """
-        return getattr(cls, prop)[cls.COMMAND_FORMAT]
\ No newline at end of file
+        return cls.COMMAND_FORMAT.spec_value(getattr(cls, prop))
\ No newline at end of file
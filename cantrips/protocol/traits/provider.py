@@ -16,6 +16,9 @@ class IProtocolProvider(IFormatteable):
         Should return dict {ns => {code: direction}}. ns and code should be either both strings or
           either both integers. When being declared, cantrips.protocol.messaging.formats.CommandSpec
           should be used, considering the cls.COMMAND_FORMAT value (see the formatted(prop) method).
+
+        Commands having a fixed shape may be declared as {code: (direction, schema)} instead, where
+          schema is a struct format string for their positional arguments (see CommandSpec).
         """
 
         raise NotImplementedError
@@ -44,6 +47,20 @@ class IProtocolProvider(IFormatteable):
                 total_specs.setdefault(key, {}).update(value)
         return total_specs
 
+    @staticmethod
+    def specifications_schemas(*args):
+        """
+        Should return the schemas declared in the specifications of many given providers, as
+          a {(ns, code): schema} dict (see Translator.declare_schemas).
+        """
+
+        total_schemas = {}
+        for key, value in items(IProtocolProvider.specifications(*args)):
+            for code, direction in items(value):
+                if isinstance(direction, tuple):
+                    total_schemas[(key, code)] = direction[1]
+        return total_schemas
+
     @staticmethod
     def specifications_handlers(master_instance, *args):
         """
@@ -1,6 +1,9 @@
+from six import get_unbound_function
 from cantrips.protocol.traits.permcheck import PermCheck
 from cantrips.patterns.broadcast import IBroadcast
 from cantrips.patterns.identify import Identified, List
+from cantrips.types.events import Eventful
+from cantrips.protocol.messaging.messages import Message
 
 
 class UserEndpoint(Identified):
@@ -22,7 +25,49 @@ class UserEndpoint(Identified):
         raise NotImplementedError
 
 
-class UserEndpointList(List):
+_endpoint_notify = get_unbound_function(UserEndpoint.notify)
+
+
+def fanout_safe(notify):
+    """
+    Marks a notify() implementation of a UserBroadcast class as sending, to the users of its
+      list, the same data fanout() sends. Otherwise (e.g. notify() is overridden to route,
+      filter or audit notifications), fanout() notifies each user through notify().
+    """
+    notify.fanout_safe = True
+    return notify
+
+
+class ListEvents(Eventful):
+    """
+    Events of an EventfulList. python-cantrips 0.7 triggers events with dict.iteritems(),
+      which is not available in Python 3.
+    """
+
+    class Event(Eventful.Event):
+        # Named as its base class, so the (name-mangled) handlers attribute is the same.
+
+        def trigger(self, *args, **kwargs):
+            """
+            Runs each handler sequentially. Altering the handlers will not have effect until
+              the current call to this method ends.
+            """
+            for handler in list(self.__handlers.values()):
+                handler(*args, **kwargs)
+
+
+class EventfulList(List):
+    """
+    A list of identified objects whose create, insert and remove events are triggered
+      both in Python 2 and 3.
+    """
+
+    def __init__(self, element_class=Identified):
+        super(EventfulList, self).__init__(element_class)
+        self._events = ListEvents(('create', 'insert', 'remove'))
+
+
+class UserEndpointList(EventfulList):
     """
     Endpoint list. It can specify the class to be used as endpoint.
     """
@@ -80,6 +125,7 @@ class UserBroadcast(Identified, IBroadcast, PermCheck):
         """
         return self.list.remove(user)
 
+    @fanout_safe
     def notify(self, user, command, *args, **kwargs):
         """
         Sends a notification to a user.
@@ -88,4 +134,77 @@ class UserBroadcast(Identified, IBroadcast, PermCheck):
           More args may be supplied for the commands or overriding implementations.
         """
         ns, code = command
-        return self.list[user].notify(ns, code, *args, **kwargs)
\ No newline at end of file
+        return self.list[user].notify(ns, code, *args, **kwargs)
+
+    def broadcast(self, command, *args, **kwargs):
+        """
+        Notifies each user with a specified command. The filter criterion may be given
+          either as `criterion` or as `filter` keyword argument.
+        The message is built and serialized only once per wire format (see fanout).
+        """
+        criterion = kwargs.pop('criterion', None)
+        filter = kwargs.pop('filter', None)
+        ns, code = command
+        return self.fanout(Message(ns, code, *args, **kwargs), criterion or filter or self.BROADCAST_FILTER_ALL)
+
+    def fanout(self, message, criterion=IBroadcast.BROADCAST_FILTER_ALL):
+        """
+        Sends a message to each user satisfying the criterion. The message is serialized
+          once per translator (and msgpack packing options) in use among the users' sockets,
+          and the same raw data is sent to each socket using such translator.
+          The criterion has the same signature as broadcast filters.
+          User endpoints' notify() method is not invoked, unless their class overrides it
+          (e.g. to route, filter or audit notifications): then the message is sent through it.
+          Likewise, if this broadcast's notify() is overridden (and not marked with
+          fanout_safe), each user is notified through it instead. broadcast() is not invoked.
+          Returns the count of notified users.
+        """
+        if not getattr(type(self).notify, 'fanout_safe', False):
+            return self._notify_each(message, criterion)
+        serialized = {}
+        overrides = {}
+        count = 0
+        for key, user in self.list.items():
+            if not criterion(user, message.code, *message.args, **message.kwargs):
+                continue
+            cls = type(user)
+            try:
+                override = overrides[cls]
+            except KeyError:
+                override = overrides[cls] = get_unbound_function(cls.notify) is not _endpoint_notify
+            if override:
+                ns, code = message.code
+                user.notify(ns, code, *message.args, **message.kwargs)
+                count += 1
+                continue
+            socket = user.socket
+            socket.send_raw(self._serialize_for(socket, message, serialized), message.code)
+            count += 1
+        return count
+
+    @staticmethod
+    def _serialize_for(socket, message, serialized):
+        """
+        Serializes a message as the socket would send it, reusing the data in `serialized` (a
+          dict) already serialized for sockets using the same translator (and the same msgpack
+          packing options, for sockets having their own broker: see MSGPACK_PER_CONNECTION).
+        """
+        translator = socket.TRANSLATOR
+        broker = getattr(socket, '_broker', None)
+        key = translator if broker is None else (translator, broker.packing)
+        try:
+            return serialized[key]
+        except KeyError:
+            data = serialized[key] = translator.serialize(message, broker)
+            return data
+
+    def _notify_each(self, message, criterion):
+        """
+        Sends a message to each user satisfying the criterion through notify().
+        """
+        count = 0
+        for key, user in list(self.list.items()):
+            if criterion(user, message.code, *message.args, **message.kwargs):
+                self.notify(key, message.code, *message.args, **message.kwargs)
+                count += 1
+        return count
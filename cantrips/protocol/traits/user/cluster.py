@@ -0,0 +1,87 @@
+from six.moves import cPickle as pickle
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.traits.user.base import UserBroadcast, fanout_safe
+
+
+class ClusterBroadcast(UserBroadcast):
+    """
+    This trait, applied to a user broadcast (master or slave), makes broadcast() and notify()
+      reach the users connected to other workers (see cantrips.protocol.cluster.workers).
+      Each worker has its own instance of the broadcast (with the same key) keeping its
+      local users, and the instances talk through the bus (see cantrips.protocol.cluster.bus)
+      given as the `bus` keyword argument on construction (e.g. when creating slaves, pass
+      bus=master.bus to slave_register). Without a bus, it behaves as a local broadcast.
+
+    Broadcast criteria are sent to the other workers, so they must be picklable (e.g.
+      module-level functions, or instances of module-level classes): other workers send the
+      message to each of their users satisfying both the criterion and remote_criterion (by
+      default, accepting all of them). A criterion that cannot be pickled raises TypeError,
+      unless local=True is given. The join and part criteria of slaves must be picklable as
+      well. Notifications to users not connected to this worker are sent to every worker,
+      and the one having the user delivers it.
+    """
+
+    def __init__(self, key, *args, **kwargs):
+        kwargs.setdefault('bus', None)
+        super(ClusterBroadcast, self).__init__(key, *args, **kwargs)
+        if self.bus is not None:
+            self.bus.subscribe(self._bus_channel(), self._bus_received)
+
+    def detach_bus(self):
+        """
+        Stops receiving calls from other workers (e.g. when this broadcast is destroyed).
+        """
+        if self.bus is not None:
+            self.bus.unsubscribe(self._bus_channel())
+
+    def _bus_channel(self):
+        return 'user-broadcast', self.key
+
+    def remote_criterion(self, u, command, *args, **kwargs):
+        """
+        Criterion to send the broadcasts coming from other workers.
+        """
+        return True
+
+    def broadcast(self, command, *args, **kwargs):
+        """
+        Notifies each user with a specified command, also in other workers. Pass local=True to
+          notify only the users of this worker.
+        """
+        local = kwargs.pop('local', False)
+        if not local and self.bus is not None:
+            criterion = kwargs.get('criterion') or kwargs.get('filter')
+            if criterion is not None:
+                try:
+                    pickle.dumps(criterion, pickle.HIGHEST_PROTOCOL)
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    raise TypeError("Broadcast criteria must be picklable to reach other workers: "
+                                    "%r is not (pass local=True to notify only this worker)" % (criterion,))
+            remote_kwargs = dict((k, v) for k, v in kwargs.items() if k not in ('criterion', 'filter'))
+            self.bus.publish(self._bus_channel(), 'broadcast', command, args, remote_kwargs, criterion)
+        return super(ClusterBroadcast, self).broadcast(command, *args, **kwargs)
+
+    @fanout_safe
+    def notify(self, user, command, *args, **kwargs):
+        """
+        Sends a notification to a user, which may be connected to another worker (in such case,
+          only its key is used).
+        """
+        if user in self.list or self.bus is None:
+            return super(ClusterBroadcast, self).notify(user, command, *args, **kwargs)
+        self.bus.publish(self._bus_channel(), 'notify', getattr(user, 'key', user), command, args, kwargs)
+
+    def _bus_received(self, kind, *payload):
+        if kind == 'broadcast':
+            command, args, kwargs, criterion = payload
+            ns, code = command
+            if criterion is None:
+                remote_criterion = self.remote_criterion
+            else:
+                def remote_criterion(u, command, *args, **kwargs):
+                    return criterion(u, command, *args, **kwargs) and self.remote_criterion(u, command, *args, **kwargs)
+            self.fanout(Message(ns, code, *args, **kwargs), remote_criterion)
+        elif kind == 'notify':
+            key, command, args, kwargs = payload
+            if key in self.list:
+                super(ClusterBroadcast, self).notify(key, command, *args, **kwargs)
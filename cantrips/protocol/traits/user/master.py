@@ -1,11 +1,11 @@
+from inspect import ismethod
+from six import get_method_self
 from cantrips.iteration import items
-from cantrips.patterns.identify import List
-from cantrips.patterns.actions import AccessControlledAction
+from cantrips.protocol.traits.actions import AccessControlledAction
 from cantrips.protocol.messaging.formats import CommandSpec
-from cantrips.protocol.traits.user.base import UserBroadcast
+from cantrips.protocol.traits.user.base import UserBroadcast, EventfulList
 from cantrips.protocol.traits.provider import IProtocolProvider
 from cantrips.protocol.traits.decorators.authcheck import IAuthCheck, IAuthHandle
-from cantrips.functions import is_method, METHOD_BOUND
 
 
 class ForwardNone(object):
@@ -64,7 +64,7 @@ class ForwardBroadcast(object):
 
     def __getattr__(self, item):
         value = getattr(self.slave, item, None)
-        if is_method(value, METHOD_BOUND):
+        if ismethod(value) and get_method_self(value) is not None:
             return lambda *a, **kwa: value(self.socket, *a, **kwa)
         return value
 
@@ -142,18 +142,18 @@ class UserMasterBroadcast(UserBroadcast, IProtocolProvider, IAuthHandle):
         """
         Instantiates a master broadcast by creating a slaves  list, and some list handlers.
         """
-        super(UserMasterBroadcast, self).__init__(key, master=self, slaves=List(slave_class), *args, **kwargs)
+        super(UserMasterBroadcast, self).__init__(key, master=self, slaves=EventfulList(slave_class), *args, **kwargs)
 
         def unregister_slave(list, instance, by_val):
-            for ukey, user in instance.users():
+            for ukey, user in tuple(instance.users().items()):
                 instance.force_part(user, special=self.formatted('SPECIAL_SLAVE_UNREGISTER'))
 
         def unregister_user(list, instance, by_val):
             for skey, slave in items(instance.slaves()):
                 slave.force_part(instance, special=self.formatted('SPECIAL_USER_UNREGISTER'))
 
-        self.slaves.events.remove.register(unregister_slave)
-        self.list.events.remove.register(unregister_user)
+        self.slaves.events.remove.register('unregister-slave', unregister_slave)
+        self.list.events.remove.register('unregister-user', unregister_user)
 
     #######################
     # Funciones utilitarias
@@ -175,7 +175,7 @@ class UserMasterBroadcast(UserBroadcast, IProtocolProvider, IAuthHandle):
         """
         Destroys a slave, based on its arguments.
         """
-        return self.slaves.remove(key)
+        return self.slaves.remove(self.slaves[key])
 
     def auth_check(self, socket, state=True):
         """
@@ -197,9 +197,12 @@ class UserMasterBroadcast(UserBroadcast, IProtocolProvider, IAuthHandle):
 
     def auth_set(self, socket, *args, **kwargs):
         """
-        Sets the end_point attribute on the socket to the current user.
+        Sets the end_point attribute on the socket to the current user. The user is logged
+          out if the socket is reaped for being idle (see MessageProcessor.IDLE_TIMEOUT).
         """
         socket.end_point = kwargs['end_point']
+        if hasattr(socket, 'add_idle_handler'):
+            socket.add_idle_handler(self._on_idle)
 
     def auth_get(self, socket):
         """
@@ -212,6 +215,8 @@ class UserMasterBroadcast(UserBroadcast, IProtocolProvider, IAuthHandle):
         Unsets the end_point attribute on the socket.
         """
         del socket.end_point
+        if hasattr(socket, 'remove_idle_handler'):
+            socket.remove_idle_handler(self._on_idle)
 
     ############################
     # Funciones semi-utilitarias
@@ -224,12 +229,21 @@ class UserMasterBroadcast(UserBroadcast, IProtocolProvider, IAuthHandle):
           value indicating whether the user was logged in or not.
         """
         if user in self.users():
-            self.unregister(self.users()[user], *args, **kwargs)
+            user = self.users()[user]
+            self.unregister(user, *args, **kwargs)
             user.socket.send_message(self.formatted('AUTHENTICATE_NS'), self.formatted('AUTHENTICATE_CODE_FORCED_LOGOUT'), *args, **kwargs)
             return True
         else:
             return False
 
+    def _on_idle(self, socket):
+        """
+        Logs out the user of a socket reaped for being idle.
+        """
+        user = self.auth_get(socket)
+        if user is not None:
+            self.force_logout(user.key)
+
     ################################################
     # Funciones de comando (emitidos por el usuario)
     ################################################
@@ -0,0 +1,353 @@
+from itertools import count
+from weakref import WeakKeyDictionary, WeakValueDictionary
+from cantrips.patterns.broadcast import IBroadcast
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.cluster.ring import HashRing
+from cantrips.protocol.traits.user.base import UserEndpoint
+from cantrips.protocol.traits.user.master import UserMasterBroadcast, ForwardBroadcast
+from cantrips.protocol.traits.user.slave import UserSlaveBroadcast
+
+
+class RemoteSocket(object):
+    """
+    Stands, in the node owning a slave, for a socket connected to another node. Messages sent
+      through it are relayed to the actual socket by the bus. When the user is logged in,
+      end_point is its RemoteUserEndpoint.
+    """
+
+    def __init__(self, master, node, token):
+        self.master = master
+        self.node = node
+        self.token = token
+        self.end_point = None
+
+    def send_message(self, ns, code, *args, **kwargs):
+        self.master._relay(self.node, [self.token], Message(ns, code, *args, **kwargs))
+
+
+class RemoteUserEndpoint(UserEndpoint):
+    """
+    A user logged in another node, which joined slaves of this node. Its socket is a
+      RemoteSocket.
+    """
+
+    def slaves(self):
+        return {}
+
+
+class _Shards(object):
+    """
+    Mutable state of a sharded master (broadcasts are immutable objects).
+    """
+
+    def __init__(self):
+        self.tokens = count(1)
+        self.socket_tokens = WeakKeyDictionary()
+        self.sockets = WeakValueDictionary()
+        self.remote_users = {}
+        self.slave_args = {}
+        self.migrating = set()
+
+
+class ForwardRemote(object):
+    """
+    Like ForwardBroadcast, but for a slave owned by another node: calls are sent, with their
+      arguments, to such node, and their results are discarded.
+    """
+
+    def __init__(self, master, node, channel, socket):
+        self.master = master
+        self.node = node
+        self.channel = channel
+        self.socket = socket
+
+    def __getattr__(self, item):
+        return lambda *a, **kwa: self.master._forward_call(self.node, self.channel, self.socket, item, a, kwa)
+
+
+class ShardedMasterBroadcast(UserMasterBroadcast):
+    """
+    A master broadcast whose slaves are spread among many nodes (e.g. the workers of a
+      cantrips.protocol.cluster.workers.WorkerPool): each slave lives only in the node chosen
+      by consistent hashing on its key (see cantrips.protocol.cluster.ring.HashRing).
+
+    Users log in to the node they are connected to. Commands for a slave owned by another
+      node are sent there by forward(), with the key of the user and a token of its socket;
+      the owner runs them with a RemoteSocket, and the messages sent to it (and broadcasts
+      reaching remote users) are relayed back by the bus.
+
+    It needs the `bus` keyword argument (see cantrips.protocol.cluster.bus) shared by the
+      nodes, and the slave class must descend from ShardedSlaveBroadcast. Nodes are the
+      workers of the bus: a `ring` keyword argument may be given, otherwise every worker is
+      a node. Call add_node() and remove_node() in every node, to move the slaves (and their
+      members) to their new owners without the users reconnecting. Slave arguments must be
+      picklable to be created in (or moved to) other nodes.
+
+    Checks on slave existence in the command_*_slave commands only see the slaves of
+      this node.
+    """
+
+    REMOTE_ENDPOINT_CLASS = RemoteUserEndpoint
+
+    def __init__(self, key, slave_class, *args, **kwargs):
+        bus = kwargs.get('bus')
+        if bus is None:
+            raise ValueError("A bus is required for a sharded master")
+        kwargs.setdefault('ring', HashRing(range(bus.workers)))
+        super(ShardedMasterBroadcast, self).__init__(key, slave_class, shards=_Shards(), *args, **kwargs)
+        bus.subscribe(self._shard_channel(), self._shard_received)
+
+        def unregister_user(list, instance, by_val):
+            # Users removed by key are given as such.
+            bus.publish(self._shard_channel(), 'user-gone', bus.worker, instance.key if by_val else instance)
+
+        self.list.events.remove.register('shard-unregister-user', unregister_user)
+
+    def _shard_channel(self):
+        return 'user-shards', self.key
+
+    def owner(self, key):
+        """
+        Node owning the slave with a given key.
+        """
+        return self.ring.node_for(key)
+
+    def owns(self, key):
+        return self.owner(key) == self.bus.worker
+
+    def slave_register(self, key, *args, **kwargs):
+        """
+        Creates a slave in the node owning it. Returns the slave, or None if created in
+          another node.
+        """
+        owner = self.owner(key)
+        if owner != self.bus.worker:
+            self.bus.publish(self._shard_channel(), 'slave-register', key, args, kwargs, worker=owner)
+            return None
+        return self._slave_create(key, args, kwargs)
+
+    def _slave_create(self, key, args, kwargs):
+        """
+        Creates a slave in this node (the sender of a call may have a newer ring).
+        """
+        self.shards.slave_args[key] = (args, kwargs)
+        return super(ShardedMasterBroadcast, self).slave_register(key, *args, **kwargs)
+
+    def slave_unregister(self, key, *args, **kwargs):
+        """
+        Destroys a slave in the node owning it.
+        """
+        owner = self.owner(key)
+        if owner != self.bus.worker:
+            self.bus.publish(self._shard_channel(), 'slave-unregister', key, worker=owner)
+            return None
+        self.shards.slave_args.pop(key, None)
+        return super(ShardedMasterBroadcast, self).slave_unregister(key, *args, **kwargs)
+
+    def forward(self, socket, channel=None):
+        """
+        Like UserMasterBroadcast.forward, but slaves owned by other nodes get the call
+          through the bus. Unexistent slaves in other nodes are reported to the socket
+          when the owner gets the call.
+        """
+        if channel is None or channel in self.slaves:
+            return super(ShardedMasterBroadcast, self).forward(socket, channel)
+        owner = self.owner(channel)
+        if owner == self.bus.worker:
+            return super(ShardedMasterBroadcast, self).forward(socket, channel)
+        return ForwardRemote(self, owner, channel, socket)
+
+    def auth_check(self, socket, state=True):
+        """
+        Remote sockets were checked in their nodes: they are logged in if they have an end
+          point.
+        """
+        if not isinstance(socket, RemoteSocket):
+            return super(ShardedMasterBroadcast, self).auth_check(socket, state)
+        if (socket.end_point is not None) == state:
+            return True
+        if state:
+            result = self._result_deny(self.formatted('AUTHENTICATE_RESULT_DENY_NO_ACTIVE_SESSION'))
+        else:
+            result = self._result_deny(self.formatted('AUTHENTICATE_RESULT_DENY_ALREADY_ACTIVE_SESSION'))
+        socket.send_message(self.formatted('AUTHENTICATE_RESPONSE_NS'), self.formatted('AUTHENTICATE_RESPONSE_CODE_RESPONSE'), result=result)
+        return False
+
+    ###########
+    # Placement
+    ###########
+
+    def add_node(self, node):
+        if self.ring.add(node):
+            self._rebalance()
+
+    def remove_node(self, node):
+        if self.ring.remove(node):
+            self._rebalance()
+
+    def _rebalance(self):
+        """
+        Moves the slaves no longer owned by this node, with their members, to their owners.
+          Users are neither notified nor parted.
+        """
+        me = self.bus.worker
+        for key, slave in list(self.slaves.items()):
+            owner = self.owner(key)
+            if owner == me:
+                continue
+            members = []
+            for user_key, user in slave.users().items():
+                socket = user.socket
+                if isinstance(socket, RemoteSocket):
+                    members.append((socket.node, socket.token, user_key))
+                else:
+                    members.append((me, self._socket_token(socket), user_key))
+            args, kwargs = self.shards.slave_args.pop(key, ((), {}))
+            self.bus.publish(self._shard_channel(), 'slave-migrate', key, args, kwargs, members, worker=owner)
+            self.shards.migrating.add(key)
+            try:
+                self.slaves.remove(slave)
+            finally:
+                self.shards.migrating.discard(key)
+
+    #########
+    # Routing
+    #########
+
+    def _socket_token(self, socket):
+        shards = self.shards
+        try:
+            return shards.socket_tokens[socket]
+        except KeyError:
+            token = shards.socket_tokens[socket] = next(shards.tokens)
+            shards.sockets[token] = socket
+            return token
+
+    def _remote_socket(self, node, token, user_key):
+        """
+        Gets the socket (and, if logged in, the end point) of a user from another node.
+        """
+        if node == self.bus.worker:
+            socket = self.shards.sockets.get(token)
+            if socket is not None:
+                return socket
+        if user_key is None:
+            return RemoteSocket(self, node, token)
+        try:
+            socket = self.shards.remote_users[(node, user_key)].socket
+            socket.token = token
+        except KeyError:
+            socket = RemoteSocket(self, node, token)
+            socket.end_point = self.REMOTE_ENDPOINT_CLASS(user_key, socket)
+            self.shards.remote_users[(node, user_key)] = socket.end_point
+        return socket
+
+    def _forward_call(self, node, channel, socket, name, args, kwargs, hops=0):
+        user = self.auth_get(socket)
+        self.bus.publish(self._shard_channel(), 'call', self.bus.worker, self._socket_token(socket),
+                         None if user is None else user.key, channel, name, args, kwargs, hops, worker=node)
+
+    def _relay(self, node, tokens, message):
+        self.bus.publish(self._shard_channel(), 'deliver', tokens, message.code, message.args, message.kwargs,
+                         worker=node)
+
+    def _shard_received(self, kind, *payload):
+        if kind == 'call':
+            self._received_call(*payload)
+        elif kind == 'deliver':
+            self._received_deliver(*payload)
+        elif kind == 'invalid':
+            token, channel = payload
+            socket = self.shards.sockets.get(token)
+            if socket is not None:
+                self._forward_invalid(socket, channel)
+        elif kind == 'slave-register':
+            key, args, kwargs = payload
+            if key not in self.slaves:
+                self._slave_create(key, args, kwargs)
+        elif kind == 'slave-unregister':
+            key, = payload
+            if key in self.slaves:
+                self.slave_unregister(key)
+        elif kind == 'slave-migrate':
+            self._received_migrate(*payload)
+        elif kind == 'user-gone':
+            node, user_key = payload
+            user = self.shards.remote_users.pop((node, user_key), None)
+            if user is not None:
+                for key, slave in list(self.slaves.items()):
+                    if user in slave.users():
+                        slave.unregister(user)
+
+    def _received_call(self, node, token, user_key, channel, name, args, kwargs, hops):
+        if channel not in self.slaves:
+            owner = self.owner(channel)
+            if owner != self.bus.worker and not hops:
+                # The rings of both nodes disagree while nodes are being added or removed.
+                self.bus.publish(self._shard_channel(), 'call', node, token, user_key, channel, name, args, kwargs,
+                                 hops + 1, worker=owner)
+            else:
+                self.bus.publish(self._shard_channel(), 'invalid', token, channel, worker=node)
+            return
+        getattr(ForwardBroadcast(self.slaves[channel], self._remote_socket(node, token, user_key)), name)(*args, **kwargs)
+
+    def _received_deliver(self, tokens, code, args, kwargs):
+        """
+        Sends a relayed message to the local sockets, serializing it once per translator.
+        """
+        message = Message.from_parts(code, args, kwargs)
+        serialized = {}
+        for token in tokens:
+            socket = self.shards.sockets.get(token)
+            if socket is None:
+                continue
+            socket.send_raw(self._serialize_for(socket, message, serialized), code)
+
+    def _received_migrate(self, key, args, kwargs, members):
+        if key in self.slaves:
+            return
+        slave = self._slave_create(key, args, kwargs)
+        self.shards.migrating.add(key)
+        try:
+            for node, token, user_key in members:
+                if node == self.bus.worker:
+                    if user_key in self.users():
+                        slave.register(self.users()[user_key])
+                else:
+                    slave.register(self._remote_socket(node, token, user_key).end_point)
+        finally:
+            self.shards.migrating.discard(key)
+
+
+class ShardedSlaveBroadcast(UserSlaveBroadcast):
+    """
+    Slave broadcasts of a ShardedMasterBroadcast. Messages to members connected to other
+      nodes are relayed through the bus (once per node), and members being moved to or from
+      another node are neither notified of joins nor parted.
+    """
+
+    def force_part(self, user, *args, **kwargs):
+        if self.key in self.master.shards.migrating:
+            return False
+        return super(ShardedSlaveBroadcast, self).force_part(user, *args, **kwargs)
+
+    def fanout(self, message, criterion=IBroadcast.BROADCAST_FILTER_ALL):
+        if self.key in self.master.shards.migrating:
+            return 0
+        remote = {}
+
+        def local_criterion(*args, **kwargs):
+            # Positional only: messages may have a `user` keyword argument.
+            if not criterion(*args, **kwargs):
+                return False
+            socket = args[0].socket
+            if isinstance(socket, RemoteSocket):
+                remote.setdefault(socket.node, []).append(socket.token)
+                return False
+            return True
+
+        count = super(ShardedSlaveBroadcast, self).fanout(message, local_criterion)
+        for node, tokens in remote.items():
+            self.master._relay(node, tokens, message)
+            count += len(tokens)
+        return count
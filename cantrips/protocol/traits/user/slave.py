@@ -1,12 +1,30 @@
-from cantrips.patterns.broadcast import IBroadcast
-from base import UserBroadcast
-from cantrips.patterns.actions import AccessControlledAction
+from cantrips.protocol.traits.user.base import UserBroadcast
+from cantrips.protocol.traits.actions import AccessControlledAction
 from cantrips.protocol.messaging.formats import CommandSpec
 from cantrips.protocol.traits.decorators.authcheck import IAuthCheck
 from cantrips.protocol.traits.decorators.incheck import IInCheck
 from cantrips.protocol.traits.provider import IProtocolProvider
 
 
+def _anyone(u, command, *args, **kwargs):
+    return True
+
+
+class _OthersCriterion(object):
+    """
+    Criterion accepting the users (but the given one) satisfying another criterion. Unlike
+      the IBroadcast.BROADCAST_FILTER_* criteria, it can be pickled (provided the other
+      criterion can be pickled as well), so clustered broadcasts can send it to other workers.
+    """
+
+    def __init__(self, key, criterion):
+        self.key = key
+        self.criterion = criterion
+
+    def __call__(self, u, command, *args, **kwargs):
+        return u.key != self.key and self.criterion(u, command, *args, **kwargs)
+
+
 class UserSlaveBroadcast(UserBroadcast, IAuthCheck, IInCheck, IProtocolProvider):
     """
     This broadcast adds an existing user. It does not support login features.
@@ -32,19 +50,19 @@ class UserSlaveBroadcast(UserBroadcast, IAuthCheck, IInCheck, IProtocolProvider)
 
     @classmethod
     def part_criteria(cls, user):
-        return lambda u, command, *args, **kwargs: True
+        return _anyone
 
     @classmethod
     def join_criteria(cls, user):
-        return lambda u, command, *args, **kwargs: True
+        return _anyone
 
     @classmethod
     def _part_criteria(cls, user):
-        return IBroadcast.BROADCAST_FILTER_AND(IBroadcast.BROADCAST_FILTER_OTHERS(user), cls.part_criteria(user))
+        return _OthersCriterion(user.key, cls.part_criteria(user))
 
     @classmethod
     def _join_criteria(cls, user):
-        return IBroadcast.BROADCAST_FILTER_AND(IBroadcast.BROADCAST_FILTER_OTHERS(user), cls.join_criteria(user))
+        return _OthersCriterion(user.key, cls.join_criteria(user))
 
     @classmethod
     def specification(cls):
@@ -83,8 +101,8 @@ class UserSlaveBroadcast(UserBroadcast, IAuthCheck, IInCheck, IProtocolProvider)
         def unregister(list, instance, by_val):
             self.broadcast((self.formatted('CHANNEL_NS'), self.formatted('CHANNEL_CODE_PARTED')), filter=self._part_criteria(instance), user=instance.key)
 
-        self.list.events.remove.register(unregister)
-        self.list.events.insert.register(register)
+        self.list.events.remove.register('unregister', unregister)
+        self.list.events.insert.register('register', register)
 
     def auth_check(self, socket, state=True):
         """
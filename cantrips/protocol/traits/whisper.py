@@ -1,4 +1,4 @@
-from cantrips.patterns.actions import AccessControlledAction
+from cantrips.protocol.traits.actions import AccessControlledAction
 from cantrips.patterns.broadcast import IBroadcast
 from cantrips.protocol.messaging.formats import CommandSpec
 from cantrips.protocol.traits.decorators.authcheck import IAuthCheck
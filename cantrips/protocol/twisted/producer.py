@@ -0,0 +1,23 @@
+from zope.interface import implementer
+from twisted.internet.interfaces import IPushProducer
+
+
+@implementer(IPushProducer)
+class WriteProducer(object):
+    """
+    Registered as the producer of a transport, it tells a message processor when the
+      transport write buffer is full (pauseProducing) and when it was drained again
+      (resumeProducing). See MessageProcessor._conn_write_paused.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+
+    def pauseProducing(self):
+        self.processor._conn_write_paused()
+
+    def resumeProducing(self):
+        self.processor._conn_write_resumed()
+
+    def stopProducing(self):
+        pass
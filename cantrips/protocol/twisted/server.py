@@ -1,11 +1,13 @@
 try:
     from twisted.internet.protocol import Factory, Protocol, connectionDone
     from twisted.internet import reactor
+    from twisted.internet.defer import Deferred
 except:
     raise ImportError("You need to install twisted for this to work (pip install twisted==14.0.2)")
-import json
 from cantrips.protocol.messaging.processor import MessageProcessor
-from cantrips.task.timed import TwistedTimeout
+from cantrips.protocol.messaging.framing import FrameDecoder, LengthPrefixedDecoder, MsgPackStreamDecoder
+from cantrips.protocol.twisted.producer import WriteProducer
+from cantrips.task.timed import TwistedTimingWheel, WheelTimeout
 
 
 class MessageProtocol(Protocol, MessageProcessor):
@@ -13,8 +15,16 @@ class MessageProtocol(Protocol, MessageProcessor):
     This handler formats the messages using json. Messages
       must match a certain specification defined in the
       derivated classes.
+
+    Since TCP is a stream (chunks may split or join messages),
+      messages are delimited using FRAME_DECODER (by default,
+      length-prefixed frames). Frames larger than MAX_FRAME_SIZE
+      close the connection.
     """
 
+    FRAME_DECODER = LengthPrefixedDecoder
+    MAX_FRAME_SIZE = 1 << 20
+
     def __init__(self, strict=False):
         """
         Initializes the protocol, stating whether, upon
@@ -23,19 +33,77 @@ class MessageProtocol(Protocol, MessageProcessor):
         """
 
         MessageProcessor.__init__(self, strict=strict)
+        if issubclass(self.FRAME_DECODER, MsgPackStreamDecoder):
+            options = dict(self.TRANSLATOR.format.unpacker_options)
+            if self.MSGPACK_PER_CONNECTION:
+                options.update(self.MSGPACK_UNPACKER_OPTIONS)
+            self._decoder = self.FRAME_DECODER(self.MAX_FRAME_SIZE, options)
+        else:
+            self._decoder = self.FRAME_DECODER(self.MAX_FRAME_SIZE)
 
     def _conn_close(self, code, reason=''):
-        self.transport.write(json.dumps({'code': code, 'reason': reason}))
+        self._conn_send(self.TRANSLATOR.broker.dumps({'code': code, 'reason': reason}))
         return self.transport.loseConnection()
 
     def _conn_send(self, data, binary=None):
-        return self.transport.write(data)
+        return self.transport.write(self._decoder.encode(data))
+
+    def _conn_pause_reading(self):
+        self.transport.pauseProducing()
+
+    def _conn_resume_reading(self):
+        self.transport.resumeProducing()
 
     def connectionMade(self):
+        self.transport.registerProducer(WriteProducer(self), True)
         self._conn_made()
 
+    def connectionLost(self, reason=connectionDone):
+        self._conn_lost()
+
     def dataReceived(self, data):
-        self._conn_message(data)
+        try:
+            frames = self._decoder.feed(data)
+        except FrameDecoder.Error as e:
+            if e.code == FrameDecoder.Error.MALFORMED_STREAM:
+                # The decoder cannot resume after malformed data: the connection is closed even
+                #   if it is not strict.
+                if self.METRICS_SINK is not None:
+                    self.METRICS_SINK.error(self, 1003)
+                self._close_invalid_format(data)
+            else:
+                self._forceful_close(1009, "Frame too large")
+            return
+
+        if self._decoder.DECODED:
+            for payload in frames:
+                if not self._conn_payload(payload):
+                    break
+        else:
+            for frame in frames:
+                if not self._conn_message(frame):
+                    break
 
     def _create_timeout(self, seconds, callback):
-        return TwistedTimeout(reactor, seconds, callback)
\ No newline at end of file
+        return WheelTimeout(TwistedTimingWheel.shared(reactor), seconds, callback)
+
+    def _call_later(self, seconds, callback):
+        return reactor.callLater(seconds, callback)
+
+    def _conn_future(self, awaitable):
+        from twisted.internet.defer import ensureDeferred
+        return ensureDeferred(awaitable)
+
+    def _conn_wrap_future(self, future, then):
+        wrapped = Deferred()
+
+        def transfer(done):
+            try:
+                result = then(done.result())
+            except Exception:
+                wrapped.errback()
+            else:
+                wrapped.callback(result)
+
+        future.add_done_callback(lambda done: reactor.callFromThread(transfer, done))
+        return wrapped
\ No newline at end of file
@@ -1,12 +1,16 @@
 try:
     from autobahn.twisted.websocket import WebSocketServerProtocol
+    from autobahn.websocket.compress import PerMessageDeflateOffer, PerMessageDeflateOfferAccept
     from twisted.internet import reactor
+    from twisted.internet.defer import Deferred
 except:
     raise ImportError("You need to install twisted (pip install twisted==14.0.2) AND Autobahn for Python "
                       "(pip install autobahn) for this to work. As an alternative, you can install both Autobahn "
                       "and Twisted by executing: pip install autobahn[twisted]")
+from six import text_type
 from cantrips.protocol.messaging.processor import MessageProcessor
-from cantrips.task.timed import TwistedTimeout
+from cantrips.protocol.twisted.producer import WriteProducer
+from cantrips.task.timed import TwistedTimingWheel, WheelTimeout
 
 
 class MessageProtocol(WebSocketServerProtocol, MessageProcessor):
@@ -14,6 +18,11 @@ class MessageProtocol(WebSocketServerProtocol, MessageProcessor):
     This handler formats the messages using json. Messages
       must match a certain specification defined in the
       derivated classes.
+
+    Compression (see MessageProcessor.COMPRESSION) is
+      negotiated in onConnect: subclasses overriding it must
+      call this implementation. COMPRESSION_LEVEL is not
+      supported by Autobahn.
     """
 
     def __init__(self, strict=False):
@@ -23,17 +32,57 @@ class MessageProtocol(WebSocketServerProtocol, MessageProcessor):
           user or must be processed automatically.
         """
 
+        WebSocketServerProtocol.__init__(self)
         MessageProcessor.__init__(self, strict=strict)
 
     def _conn_close(self, code, reason=''):
-        return self.failConnection(code, reason)
+        # Newer Autobahn versions renamed failConnection to _fail_connection.
+        fail_connection = getattr(self, '_fail_connection', None) or self.failConnection
+        return fail_connection(code, reason)
 
     def _conn_send(self, data, binary=None):
         if binary is None:
             raise TypeError("For web-socket implementations, binary argument must be set to send data")
-        return self.transport.write(data, binary)
+        if isinstance(data, text_type):
+            data = data.encode('utf-8')
+        if self._perMessageCompress is None or len(data) < self.COMPRESSION_MIN_SIZE:
+            self.compression_stats.record(len(data))
+            return self.sendMessage(data, binary, doNotCompress=True)
+        sent = self.trafficStats.outgoingOctetsWebSocketLevel
+        result = self.sendMessage(data, binary)
+        self.compression_stats.record(len(data), self.trafficStats.outgoingOctetsWebSocketLevel - sent)
+        return result
+
+    def _accept_compression(self, offers):
+        """
+        Accepts the first permessage-deflate offer, according to the COMPRESSION_* settings.
+        """
+        for offer in offers:
+            if isinstance(offer, PerMessageDeflateOffer):
+                # Older Autobahn versions use camel-cased attributes.
+                accepts_no_context_takeover = getattr(offer, 'accept_no_context_takeover',
+                                                      getattr(offer, 'acceptNoContextTakeover', False))
+                return PerMessageDeflateOfferAccept(
+                    offer,
+                    not self.COMPRESSION_CLIENT_CONTEXT_TAKEOVER and accepts_no_context_takeover,
+                    0,
+                    True if not self.COMPRESSION_SERVER_CONTEXT_TAKEOVER else None,
+                    None,
+                    self.COMPRESSION_MEM_LEVEL
+                )
+
+    def onConnect(self, request):
+        if self.COMPRESSION:
+            self.perMessageCompressionAccept = self._accept_compression
+
+    def _conn_pause_reading(self):
+        self.transport.pauseProducing()
+
+    def _conn_resume_reading(self):
+        self.transport.resumeProducing()
 
     def onOpen(self):
+        self.transport.registerProducer(WriteProducer(self), True)
         self._conn_made()
 
     def onMessage(self, payload, isBinary):
@@ -42,5 +91,35 @@ class MessageProtocol(WebSocketServerProtocol, MessageProcessor):
         #   same processing happened to identify unicode and str for text and binary, respectively.
         self._conn_message(payload, isBinary)
 
+    def onPong(self, payload):
+        self._conn_alive()
+
+    def onClose(self, wasClean, code, reason):
+        self._conn_lost()
+
+    def _conn_ping(self):
+        self.sendPing()
+
     def _create_timeout(self, seconds, callback):
-        return TwistedTimeout(reactor, seconds, callback)
\ No newline at end of file
+        return WheelTimeout(TwistedTimingWheel.shared(reactor), seconds, callback)
+
+    def _call_later(self, seconds, callback):
+        return reactor.callLater(seconds, callback)
+
+    def _conn_future(self, awaitable):
+        from twisted.internet.defer import ensureDeferred
+        return ensureDeferred(awaitable)
+
+    def _conn_wrap_future(self, future, then):
+        wrapped = Deferred()
+
+        def transfer(done):
+            try:
+                result = then(done.result())
+            except Exception:
+                wrapped.errback()
+            else:
+                wrapped.callback(result)
+
+        future.add_done_callback(lambda done: reactor.callFromThread(transfer, done))
+        return wrapped
\ No newline at end of file
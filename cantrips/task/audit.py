@@ -1,7 +1,7 @@
 #-*- coding: utf-8 -*-
 from threading import Thread, Lock, Event
 from cantrips.types.exception import factory
-from .features import ConcurrentFutureFeature, TornadoFutureFeature, TwistedDeferredFeature
+from .features import ConcurrentFutureFeature, TornadoFutureFeature, TwistedDeferredFeature, AsyncioFutureFeature
 
 
 class AuditoryLock(object):
@@ -54,11 +54,12 @@ class AuditoryLock(object):
                 raise self.Error("This lock is not re-entrant, and auditor '{0}' is already auditing".format(auditor),
                                  self.Error.ALREADY_AUDITING_SAME, auditor=auditor)
             self._audits[auditor] += 1
-        elif len(self._audits) > 0:
+        else:
             #verificar si puede agregarse como nuevo auditor
-            if not self._simultaneous:
+            if len(self._audits) > 0 and not self._simultaneous:
                 raise self.Error("This lock is not simultaneous, and another auditor is already auditing",
                                  self.Error.ALREADY_AUDITING_OTHER, auditor=auditor)
+            #el primer auditor tambien se registra
             self._audits[auditor] = 1
         self._clear()
 
@@ -239,6 +240,35 @@ class AuditoryTornadoLock(AuditoryFutureLock):
     _FEATURE = TornadoFutureFeature
 
 
+class AuditoryAsyncioLock(AuditoryFutureLock):
+    """
+    Implements the AudotiryLock using asyncio's Future-oriented checks. Requires python 3.4+.
+
+    Futures are bound to an event loop: the given one or, if no loop is given, the default
+      one. Calls to `checkpoint()` must be awaited (or yielded from) when they return a Future,
+      and every call must be done in the thread of such loop.
+
+    Note that an asyncio Future is not interchangeable with the ones of concurrent.futures: do
+      not use AuditoryFutureLock in asyncio code.
+    """
+
+    _FUTURE_CLASS = None
+    _FEATURE = AsyncioFutureFeature
+
+    def __init__(self, reentrant=False, simultaneous=False, loop=None):
+        self._loop = loop
+        super(AuditoryAsyncioLock, self).__init__(reentrant, simultaneous)
+
+    def _clear(self):
+        """
+        This call will create a future (bound to the lock's loop) if no future is set, thus making
+          the `checkpoint()` calls blocking.
+        """
+        if not self._future:
+            self._future = self._FUTURE_CLASS(loop=self._loop)
+        return None
+
+
 class AuditoryTwistedLock(AuditoryLock):
     """
     Implements the AudotiryLock using Deferred-oriented checks. Using this class requires
@@ -22,6 +22,28 @@ class ConcurrentFutureFeature(Feature):
         return "You need to install concurrent.futures for this to work (pip install futures==2.2.0)"
 
 
+class ConcurrentExecutorFeature(Feature):
+    """
+    Feature - concurrent.futures executors
+    """
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports ThreadPoolExecutor and ProcessPoolExecutor from concurrent.futures.
+        Returns a pair of classes
+        """
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+        return ThreadPoolExecutor, ProcessPoolExecutor
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for concurrent.futures executors not found.
+        """
+        return "You need to install concurrent.futures for this to work (pip install futures==2.2.0)"
+
+
 class TornadoFutureFeature(Feature):
     """
     Feature - tornado.concurrent.Future
@@ -175,3 +197,74 @@ class ThreadedTimerFeature(Feature):
         """
         return "Your standard library is corrupted. Module `threading` cannot be imported. Please reinstall" \
                " your python distribution ASAP"
+
+
+class AsyncioFutureFeature(Feature):
+    """
+    Feature - asyncio.Future
+    """
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports Future from asyncio.
+        """
+        from asyncio import Future
+        return Future
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for asyncio.Future not found.
+        """
+        return "You need python 3.4 or newer for this to work"
+
+
+class AsyncioTimerFeature(Feature):
+    """
+    Feature - Timeouts for asyncio.
+    """
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports stuff related to call_later and cancel.
+        Returns a pair of functions
+        """
+        import asyncio
+
+        def create_timeout(loop, seconds, callback):
+            return loop.call_later(seconds, callback)
+
+        def delete_timeout(timeout):
+            timeout.cancel()
+
+        return create_timeout, delete_timeout
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for asyncio not found.
+        """
+        return "You need python 3.4 or newer for this to work"
+
+
+class UvloopFeature(Feature):
+    """
+    Feature - uvloop (a faster asyncio event loop).
+    """
+
+    @classmethod
+    def _import_it(cls):
+        """
+        Imports the uvloop module.
+        """
+        import uvloop
+        return uvloop
+
+    @classmethod
+    def _import_error_message(cls):
+        """
+        Message error for uvloop not found.
+        """
+        return "You need to install uvloop for this to work (pip install uvloop)"
@@ -0,0 +1,186 @@
+import time
+import logging
+from heapq import heappush, heappop, heapify
+from itertools import count
+from threading import Condition, Lock, Thread, current_thread
+
+
+logger = logging.getLogger("cantrips.task.scheduler")
+
+
+if hasattr(time, 'monotonic'):
+    monotonic = time.monotonic
+else:
+    monotonic = time.time
+
+
+class TimerEntry(object):
+    """
+    A callback scheduled in a TimerService. It is returned by schedule(), to cancel it.
+    """
+
+    __slots__ = ('deadline', 'callback', 'state')
+
+    PENDING = 0
+    FIRED = 1
+    CANCELLED = 2
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.state = self.PENDING
+
+    @property
+    def pending(self):
+        return self.state == self.PENDING
+
+
+class TimerService(object):
+    """
+    Runs scheduled callbacks in a single daemon thread (started on first use), instead of one
+      thread per timer: entries are kept in a heap, and the thread sleeps on a condition until
+      the earliest one is due (or an earlier one is scheduled).
+
+    Cancelling only marks the entry, which is discarded when it reaches the top of the heap
+      (the heap is compacted when most of it is made of cancelled entries).
+
+    Callbacks run in the thread of the service, unless an executor (any object having a
+      submit(callable) method, e.g. a bounded concurrent.futures or OffloadPool instance) is
+      given: then they are submitted to it, and run in the thread of the service only if the
+      executor rejects them. Errors raised by callbacks are logged.
+
+    Use TimerService.default() to get the service shared by the ThreadedTimeout instances.
+    """
+
+    COMPACT_MIN = 1024
+
+    _default = None
+    _default_lock = Lock()
+
+    @classmethod
+    def default(cls):
+        """
+        Gets the service shared by default, creating it on first use.
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self, executor=None, name='cantrips-timers'):
+        self.executor = executor
+        self.name = name
+        self._heap = []
+        self._sequence = count()
+        self._condition = Condition(Lock())
+        self._thread = None
+        self._stopped = False
+        self._cancelled = 0
+        self.fired = 0
+        self.rejected = 0
+
+    def __len__(self):
+        """
+        Pending (neither fired nor cancelled) entries.
+        """
+        with self._condition:
+            return len(self._heap) - self._cancelled
+
+    def schedule(self, seconds, callback):
+        """
+        Schedules a callback (invoked with no arguments) to run in the given seconds.
+        :returns: A TimerEntry, to cancel it.
+        """
+        entry = TimerEntry(monotonic() + seconds, callback)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("The timer service is stopped")
+            heappush(self._heap, (entry.deadline, next(self._sequence), entry))
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name=self.name)
+                self._thread.daemon = True
+                self._thread.start()
+            elif self._heap[0][2] is entry:
+                self._condition.notify()
+        return entry
+
+    def cancel(self, entry):
+        """
+        Cancels an entry. Returns whether it was pending.
+        """
+        with self._condition:
+            if entry.state != TimerEntry.PENDING:
+                return False
+            entry.state = TimerEntry.CANCELLED
+            entry.callback = None
+            self._cancelled += 1
+            if self._cancelled >= self.COMPACT_MIN and self._cancelled * 2 > len(self._heap):
+                self._heap[:] = [item for item in self._heap if item[2].state == TimerEntry.PENDING]
+                heapify(self._heap)
+                self._cancelled = 0
+            return True
+
+    def stop(self, timeout=None):
+        """
+        Stops the thread. Pending entries are not run.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None and thread is not current_thread():
+            thread.join(timeout)
+
+    def _next_due(self):
+        """
+        Waits until entries are due, and takes them (None if stopped). Runs with the lock held.
+        """
+        heap = self._heap
+        while not self._stopped:
+            if not heap:
+                self._condition.wait()
+                continue
+            deadline, sequence, entry = heap[0]
+            if entry.state == TimerEntry.CANCELLED:
+                heappop(heap)
+                self._cancelled -= 1
+                continue
+            delay = deadline - monotonic()
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+            now = monotonic()
+            due = []
+            while heap and heap[0][0] <= now:
+                entry = heappop(heap)[2]
+                if entry.state == TimerEntry.CANCELLED:
+                    self._cancelled -= 1
+                    continue
+                entry.state = TimerEntry.FIRED
+                due.append(entry.callback)
+                entry.callback = None
+            return due
+        return None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                due = self._next_due()
+            if due is None:
+                return
+            for callback in due:
+                self._dispatch(callback)
+
+    def _dispatch(self, callback):
+        self.fired += 1
+        if self.executor is not None:
+            try:
+                self.executor.submit(callback)
+                return
+            except Exception:
+                # A full (or shut down) executor: run it here instead of losing it.
+                self.rejected += 1
+        try:
+            callback()
+        except Exception:
+            logger.exception("Error running a scheduled callback")
@@ -1,6 +1,13 @@
+import logging
+from math import ceil
+from weakref import WeakKeyDictionary
 from six import integer_types
 from cantrips.types.exception import factory
-from .features import TornadoTimerFeature, TwistedTimerFeature, ThreadedTimerFeature
+from .features import TornadoTimerFeature, TwistedTimerFeature, AsyncioTimerFeature
+from .scheduler import TimerService
+
+
+logger = logging.getLogger("cantrips.task.timed")
 
 
 class Timeout(object):
@@ -38,7 +45,7 @@ class Timeout(object):
         """
         Terminates a timeout, if it is not already reached.
         """
-        if self.__reached is not False:
+        if self.__reached is False:
             self.__reached = True
             self._unset()
             self.__on_reach(self, forced)
@@ -120,15 +127,16 @@ class TwistedTimeout(Timeout):
             raise self.Error("Couldn't run timer", self.Error.COULDNT_RUN, e)
 
 
-class ThreadedTimeout(Timeout):
+class AsyncioTimeout(Timeout):
     """
-    Timeouts implemented with Threads
+    Timeouts implemented in asyncio.
     """
 
-    def __init__(self, seconds, on_reach):
-        self.__create_timeout, self.__cancel_timeout = ThreadedTimerFeature.import_it()
+    def __init__(self, loop, seconds, on_reach):
+        self.__create_timeout, self.__cancel_timeout = AsyncioTimerFeature.import_it()
+        self.__loop = loop
         self.__timer = None
-        super(ThreadedTimeout, self).__init__(seconds, on_reach)
+        super(AsyncioTimeout, self).__init__(seconds, on_reach)
 
     def _unset(self):
         try:
@@ -138,6 +146,289 @@ class ThreadedTimeout(Timeout):
 
     def _set(self, seconds, callback):
         try:
-            self.__timer = self.__create_timeout(seconds, callback)
+            self.__timer = self.__create_timeout(self.__loop, seconds, callback)
+        except Exception as e:
+            raise self.Error("Couldn't run timer", self.Error.COULDNT_RUN, e)
+
+
+class ThreadedTimeout(Timeout):
+    """
+    Timeouts implemented with Threads. They are run by a TimerService (by default, the
+      one shared by the whole process: see TimerService.default()) instead of having a
+      thread each.
+    """
+
+    def __init__(self, seconds, on_reach, service=None):
+        self.__service = service if service is not None else TimerService.default()
+        self.__timer = None
+        super(ThreadedTimeout, self).__init__(seconds, on_reach)
+
+    def _unset(self):
+        if self.__timer is not None:
+            self.__service.cancel(self.__timer)
+            self.__timer = None
+
+    def _set(self, seconds, callback):
+        try:
+            self.__timer = self.__service.schedule(seconds, callback)
+        except Exception as e:
+            raise self.Error("Couldn't run timer", self.Error.COULDNT_RUN, e)
+
+
+class WheelEntry(object):
+    """
+    A callback scheduled in a TimingWheel. An entry may be scheduled again after it fires or
+      is cancelled (e.g. by restarting a timeout), so it is created once.
+    """
+
+    __slots__ = ('callback', 'deadline', 'slot')
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.deadline = None
+        self.slot = None
+
+    @property
+    def scheduled(self):
+        return self.slot is not None
+
+
+class TimingWheel(object):
+    """
+    A hierarchical timing wheel: many timeouts share a single timer of the underlying loop,
+      ticking every `resolution` seconds only while there are scheduled entries. Scheduling
+      and cancelling an entry are O(1).
+
+    The first level has `slots` slots of one tick each. Each further level has `slots` slots
+      spanning a whole turn of the previous level: its entries are moved (cascaded) to lower
+      levels as the time comes closer, until they are expired in the first level. Entries
+      beyond the last level wait in it, and are placed again each turn (with a single level,
+      entries due in a later turn are placed again when their slot is reached).
+
+    Entries never fire early, and fire at most one tick (plus the loop latency) late. Errors
+      raised by their callbacks are logged.
+
+    Subclasses tell the time (_now) and start/stop the timer of the loop (_start_timer and
+      _stop_timer). Wheels are not thread-safe: they must be used from their loop only. Use
+      shared(loop) to get the wheel used by every timeout of a loop.
+    """
+
+    def __init__(self, resolution=0.1, slots=256, levels=4):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self._wheels = [[set() for index in range(slots)] for level in range(levels)]
+        self._tick = None
+        self._count = 0
+        self._timer = None
+
+    @classmethod
+    def shared(cls, loop, *args, **kwargs):
+        """
+        Gets the wheel of this class for a loop, creating it on first use (with the given
+          arguments).
+        """
+        wheels = cls.__dict__.get('_shared')
+        if wheels is None:
+            wheels = cls._shared = WeakKeyDictionary()
+        try:
+            return wheels[loop]
+        except KeyError:
+            wheel = wheels[loop] = cls(loop, *args, **kwargs)
+            return wheel
+
+    def _now(self):
+        raise NotImplementedError
+
+    def _start_timer(self, seconds, callback):
+        raise NotImplementedError
+
+    def _stop_timer(self, timer):
+        raise NotImplementedError
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, entry, seconds):
+        """
+        Schedules an entry to fire (by invoking its callback with no arguments) in the given
+          seconds. If the entry is already scheduled, it is moved.
+        """
+        if entry.slot is not None:
+            self._remove(entry)
+        now = self._now()
+        if not self._count:
+            # Idle wheels do not tick: catch up with the current time.
+            self._tick = int(now / self.resolution)
+        entry.deadline = max(self._tick + 1, int(ceil((now + seconds) / self.resolution)))
+        self._place(entry)
+        self._count += 1
+        if self._timer is None:
+            self._arm(now)
+
+    def cancel(self, entry):
+        """
+        Cancels a scheduled entry. Nothing is done if it is not scheduled.
+        """
+        if entry.slot is not None:
+            self._remove(entry)
+            if not self._count and self._timer is not None:
+                self._stop_timer(self._timer)
+                self._timer = None
+
+    def _remove(self, entry):
+        entry.slot.discard(entry)
+        entry.slot = None
+        self._count -= 1
+
+    def _place(self, entry):
+        """
+        Puts an entry in the level spanning its deadline.
+        """
+        delta = entry.deadline - self._tick
+        slots = self.slots
+        level, granularity = 0, 1
+        while level < self.levels - 1 and delta >= granularity * slots:
+            level += 1
+            granularity *= slots
+        slot = self._wheels[level][(entry.deadline // granularity) % slots]
+        slot.add(entry)
+        entry.slot = slot
+
+    def _cascade(self, level, index):
+        wheel = self._wheels[level]
+        entries, wheel[index] = wheel[index], set()
+        for entry in entries:
+            self._place(entry)
+
+    def _arm(self, now):
+        delay = max(0.0, (self._tick + 1) * self.resolution - now)
+        self._timer = self._start_timer(delay, self._on_tick)
+
+    def _on_tick(self):
+        self._timer = None
+        try:
+            self.advance(self._now())
+        finally:
+            if self._count and self._timer is None:
+                self._arm(self._now())
+
+    def advance(self, now):
+        """
+        Fires the entries due by the given time. It is invoked on each tick.
+        """
+        target = int(now / self.resolution)
+        slots = self.slots
+        first = self._wheels[0]
+        while self._tick < target:
+            if not self._count:
+                self._tick = target
+                break
+            self._tick += 1
+            tick = self._tick
+            granularity = 1
+            for level in range(1, self.levels):
+                granularity *= slots
+                if tick % granularity:
+                    break
+                self._cascade(level, (tick // granularity) % slots)
+            index = tick % slots
+            entries = first[index]
+            if entries:
+                first[index] = set()
+                due = []
+                for entry in entries:
+                    if entry.deadline > tick:
+                        # Due in a later turn (this happens when there is a single level).
+                        self._place(entry)
+                    else:
+                        entry.slot = None
+                        due.append(entry)
+                self._count -= len(due)
+                for entry in due:
+                    try:
+                        entry.callback()
+                    except Exception:
+                        logger.exception("Error running a timing wheel callback")
+
+
+class TornadoTimingWheel(TimingWheel):
+    """
+    Timing wheels ticking in a Tornado IOLoop.
+    """
+
+    def __init__(self, ioloop, resolution=0.1, slots=256, levels=4):
+        self.__create_timeout, self.__cancel_timeout = TornadoTimerFeature.import_it()
+        self.__ioloop = ioloop
+        super(TornadoTimingWheel, self).__init__(resolution, slots, levels)
+
+    def _now(self):
+        return self.__ioloop.time()
+
+    def _start_timer(self, seconds, callback):
+        return self.__create_timeout(self.__ioloop, seconds, callback)
+
+    def _stop_timer(self, timer):
+        self.__cancel_timeout(self.__ioloop, timer)
+
+
+class TwistedTimingWheel(TimingWheel):
+    """
+    Timing wheels ticking in a Twisted reactor.
+    """
+
+    def __init__(self, reactor, resolution=0.1, slots=256, levels=4):
+        self.__create_timeout, self.__cancel_timeout = TwistedTimerFeature.import_it()
+        self.__reactor = reactor
+        super(TwistedTimingWheel, self).__init__(resolution, slots, levels)
+
+    def _now(self):
+        return self.__reactor.seconds()
+
+    def _start_timer(self, seconds, callback):
+        return self.__create_timeout(self.__reactor, seconds, callback)
+
+    def _stop_timer(self, timer):
+        self.__cancel_timeout(timer)
+
+
+class AsyncioTimingWheel(TimingWheel):
+    """
+    Timing wheels ticking in an asyncio loop.
+    """
+
+    def __init__(self, loop, resolution=0.1, slots=256, levels=4):
+        self.__create_timeout, self.__cancel_timeout = AsyncioTimerFeature.import_it()
+        self.__loop = loop
+        super(AsyncioTimingWheel, self).__init__(resolution, slots, levels)
+
+    def _now(self):
+        return self.__loop.time()
+
+    def _start_timer(self, seconds, callback):
+        return self.__create_timeout(self.__loop, seconds, callback)
+
+    def _stop_timer(self, timer):
+        self.__cancel_timeout(timer)
+
+
+class WheelTimeout(Timeout):
+    """
+    Timeouts scheduled in a TimingWheel (e.g. TornadoTimingWheel.shared(ioloop)). Its wheel
+      entry is kept, so restarting the timeout reuses it.
+    """
+
+    def __init__(self, wheel, seconds, on_reach):
+        self.__wheel = wheel
+        self.__entry = WheelEntry()
+        super(WheelTimeout, self).__init__(seconds, on_reach)
+
+    def _unset(self):
+        self.__wheel.cancel(self.__entry)
+
+    def _set(self, seconds, callback):
+        self.__entry.callback = callback
+        try:
+            self.__wheel.schedule(self.__entry, seconds)
         except Exception as e:
-            raise self.Error("Couldn't run timer", self.Error.COULDNT_RUN, e)
\ No newline at end of file
+            raise self.Error("Couldn't run timer", self.Error.COULDNT_RUN, e)
@@ -1,6 +1,7 @@
 from threading import Event
 from cantrips.types.exception import factory
-from .features import TornadoFutureFeature, TwistedDeferredFeature, ConcurrentFutureFeature, ThreadedEventFeature
+from .features import TornadoFutureFeature, TwistedDeferredFeature, ConcurrentFutureFeature, ThreadedEventFeature, \
+    AsyncioFutureFeature
 
 
 class Toll(object):
@@ -116,6 +117,35 @@ class TwistedDeferredToll(Toll):
         return self._deferred is not None
 
 
+class AsyncioFuturesToll(Toll):
+    """
+    Toll implementation based on asyncio.Future.
+
+    IMPORTANT: you should call `demand()` as an asynchronous call
+      (i.e. `await toll.demand()` or `yield from toll.demand()`).
+      Call to `supply(value)` goes as normal, but must be done in
+      the thread of the event loop (the default one, if no loop
+      is given).
+    """
+
+    def __init__(self, loop=None):
+        self._CLASS = AsyncioFutureFeature.import_it()
+        self._loop = loop
+        self._future = None
+
+    def _demand(self):
+        self._future = self._CLASS(loop=self._loop)
+        return self._future
+
+    def _supply(self, value):
+        future = self._future
+        self._future = None
+        future.set_result(value)
+
+    def demanding(self):
+        return self._future is not None
+
+
 class ThreadEventToll(Toll):
     """
     Toll implementation based on twisted.internet.defer.Deferred.
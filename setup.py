@@ -10,5 +10,5 @@ setup(
     author='Luis y Anita',
     author_email='luismasuelli@hotmail.com',
     description='Python library with small server patterns (i.e. not full protocols/managements, but just small patterns) to integrate a real-time server architecture',
-    install_requires=['python-cantrips>=0.7.5', 'enum34>=1.0.4', 'six>=1.9.0', 'msgpack-python==0.4.8']
+    install_requires=['python-cantrips>=0.7.5', 'enum34>=1.0.4', 'six>=1.9.0', 'msgpack>=0.5.2']
 )
\ No newline at end of file
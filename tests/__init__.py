@@ -0,0 +1,62 @@
+from cantrips.protocol.messaging.formats import CommandSpec
+from cantrips.protocol.messaging.layers import ProtocolLayer
+from cantrips.protocol.traits.decorators.offload import IOffload
+
+
+ECHO_NS = CommandSpec('test', 1)
+ECHO = CommandSpec('echo', 1)
+BURST = CommandSpec('burst', 2)
+BYE = CommandSpec('bye', 3)
+UNKNOWN = CommandSpec('unknown', 4)
+PING = CommandSpec('ping', 5)
+SQUARE = CommandSpec('square', 6)
+
+
+class EchoLayer(ProtocolLayer):
+    """
+    Used by the adapter tests: echoes messages, sends bursts of them, or closes the connection.
+    """
+
+    def __init__(self, processor_class):
+        super(EchoLayer, self).__init__(processor_class)
+        self.add_command_handler(ECHO_NS, ECHO, self._echo)
+        self.add_command_handler(ECHO_NS, BURST, self._burst)
+        self.add_command_handler(ECHO_NS, BYE, self._bye)
+        self.processor_class.feed_translator(ECHO_NS, UNKNOWN)
+        self.processor_class.feed_translator(ECHO_NS, PING)
+
+    def _echo(self, socket, message):
+        socket.send_message(ECHO_NS, ECHO, *message.args)
+
+    def _burst(self, socket, message):
+        for value in range(message.args[0]):
+            socket.send_message(ECHO_NS, ECHO, value)
+
+    def _bye(self, socket, message):
+        socket.send_message(ECHO_NS, BYE)
+        raise socket.CloseConnection
+
+
+def _square(message):
+    return message.args[0] ** 2
+
+
+class OffloadLayer(ProtocolLayer, IOffload):
+    """
+    Used by the adapter tests: squares numbers in the OFFLOAD_POOL (set by the tests), and
+      echoes messages like EchoLayer.
+    """
+
+    OFFLOAD_POOL = None
+
+    def __init__(self, processor_class):
+        super(OffloadLayer, self).__init__(processor_class)
+        self.add_command_handler(ECHO_NS, SQUARE, self._square)
+        self.add_command_handler(ECHO_NS, ECHO, self._echo)
+
+    @IOffload.offload(_square)
+    def _square(self, socket, result, message):
+        socket.send_message(ECHO_NS, ECHO, result)
+
+    def _echo(self, socket, message):
+        socket.send_message(ECHO_NS, ECHO, *message.args)
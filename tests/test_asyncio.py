@@ -0,0 +1,166 @@
+import unittest
+from cantrips.protocol.messaging.formats import JSONTranslator, Translator
+from cantrips.protocol.messaging.framing import LengthPrefixedDecoder
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.messaging.metrics import MemorySink
+from tests import ECHO_NS, ECHO, BURST, BYE, UNKNOWN, PING, EchoLayer
+
+try:
+    import asyncio
+    from cantrips.protocol.asyncio.server import MessageProtocol, serve
+except ImportError:
+    MessageProtocol = None
+
+
+if MessageProtocol is not None:
+
+    class EchoProtocol(MessageProtocol):
+        TRANSLATOR = JSONTranslator
+        LAYERS = [EchoLayer]
+        IDLE_TIMEOUT = 0.2
+        instances = []
+        idle = []
+
+        def connection_made(self, transport):
+            EchoProtocol.instances.append(self)
+            super(EchoProtocol, self).connection_made(transport)
+
+        def _on_idle(self):
+            EchoProtocol.idle.append(self)
+
+    class StrictEchoProtocol(EchoProtocol):
+        LAYERS = [EchoLayer]
+
+        def __init__(self, loop=None):
+            super(StrictEchoProtocol, self).__init__(strict=True, loop=loop)
+
+    class KeepaliveEchoProtocol(EchoProtocol):
+        LAYERS = [EchoLayer]
+        KEEPALIVE_INTERVAL = 0.1
+        KEEPALIVE_PING = (ECHO_NS, PING)
+        IDLE_TIMEOUT = 0.3
+
+    class FramedClient(asyncio.Protocol):
+        """
+        A length-prefixed framing client, answering the keepalive pings with an echo message.
+        """
+
+        def __init__(self, loop):
+            self.decoder = LengthPrefixedDecoder()
+            self.messages = []
+            self.close_code = None
+            self.closed = loop.create_future()
+            self.transport = None
+
+        def connection_made(self, transport):
+            self.transport = transport
+
+        def data_received(self, data):
+            for frame in self.decoder.feed(data):
+                try:
+                    message = EchoProtocol.TRANSLATOR.parse_data(frame.tobytes())
+                except Translator.Error:
+                    # The {code, reason} frame sent when the connection is closed.
+                    self.close_code = EchoProtocol.TRANSLATOR.decode(frame.tobytes())['code']
+                    continue
+                self.messages.append(message)
+                if message.code[1] == PING:
+                    self.send(ECHO, 'pong')
+
+        def send(self, code, *args):
+            data = EchoProtocol.TRANSLATOR.serialize(Message(ECHO_NS, code, *args))
+            self.transport.write(self.decoder.encode(data))
+
+        def connection_lost(self, exc):
+            self.closed.set_result(None)
+
+
+@unittest.skipIf(MessageProtocol is None, "asyncio is not available")
+class MessageProtocolTest(unittest.TestCase):
+
+    def setUp(self):
+        EchoProtocol.instances = []
+        EchoProtocol.idle = []
+        self.sink = EchoProtocol.METRICS_SINK = MemorySink()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def run_loop(self, awaitable, timeout=5):
+        return self.loop.run_until_complete(asyncio.wait_for(awaitable, timeout))
+
+    def connect(self, protocol_class):
+        server = self.run_loop(serve(lambda: protocol_class(loop=self.loop), '127.0.0.1', 0, loop=self.loop))
+
+        def close():
+            server.close()
+            self.run_loop(server.wait_closed())
+
+        self.addCleanup(close)
+        port = server.sockets[0].getsockname()[1]
+        transport, client = self.run_loop(self.loop.create_connection(lambda: FramedClient(self.loop),
+                                                                      '127.0.0.1', port))
+        return client
+
+    def disconnect(self, client):
+        client.transport.close()
+        self.run_loop(client.closed)
+        self.run_loop(asyncio.sleep(0.01))
+
+    def receive(self, client, count):
+        """
+        Waits until the client received count messages, and returns their arguments.
+        """
+        for attempt in range(1000):
+            if len(client.messages) >= count:
+                break
+            self.run_loop(asyncio.sleep(0.005))
+        return [message.args for message in client.messages]
+
+    def test_messages_are_echoed(self):
+        client = self.connect(EchoProtocol)
+        client.send(ECHO, 'hello')
+        client.send(BURST, 3)
+        self.assertEqual(self.receive(client, 4), [('hello',), (0,), (1,), (2,)])
+        self.assertEqual(len(EchoProtocol.instances), 1)
+        self.disconnect(client)
+
+    def test_terminate_closes_the_connection(self):
+        client = self.connect(EchoProtocol)
+        client.send(ECHO, 'hello')
+        self.receive(client, 1)
+        EchoProtocol.instances[0].terminate()
+        self.run_loop(client.closed)
+        self.assertEqual(client.close_code, 1000)
+
+    def test_close_connection_from_a_handler(self):
+        client = self.connect(EchoProtocol)
+        client.send(BYE)
+        self.run_loop(client.closed)
+        self.assertEqual([message.code[1] for message in client.messages], [BYE])
+        self.assertEqual(client.close_code, 1000)
+
+    def test_strict_protocol_violations_close_the_connection(self):
+        client = self.connect(StrictEchoProtocol)
+        client.send(UNKNOWN)
+        self.run_loop(client.closed)
+        self.assertEqual(client.close_code, 1002)
+        self.assertEqual(self.sink.errors, {1002: 1})
+
+    def test_idle_connection_is_reaped(self):
+        client = self.connect(EchoProtocol)
+        self.run_loop(client.closed)
+        self.assertEqual(len(EchoProtocol.idle), 1)
+        self.assertEqual(self.sink.errors, {1001: 1})
+
+    def test_pinged_connection_is_kept(self):
+        client = self.connect(KeepaliveEchoProtocol)
+        self.run_loop(asyncio.sleep(0.6))
+        self.assertFalse(client.closed.done())
+        self.assertTrue([message for message in client.messages if message.code[1] == PING])
+        self.assertEqual(EchoProtocol.idle, [])
+        self.assertEqual(self.sink.errors, {})
+        self.disconnect(client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from cantrips.task.audit import AuditoryLock, AuditoryFutureLock, AuditoryAsyncioLock
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+class AuditoryLockTest(unittest.TestCase):
+
+    def assertError(self, code, method, *args):
+        with self.assertRaises(AuditoryLock.Error) as context:
+            method(*args)
+        self.assertEqual(context.exception.code, code)
+
+    def test_first_auditor_is_recorded(self):
+        lock = AuditoryFutureLock()
+        self.assertIsNone(lock.checkpoint())
+        lock.audit_start('first')
+        checkpoint = lock.checkpoint()
+        self.assertIsNotNone(checkpoint)
+        self.assertError(AuditoryLock.Error.ALREADY_AUDITING_SAME, lock.audit_start, 'first')
+        self.assertError(AuditoryLock.Error.ALREADY_AUDITING_OTHER, lock.audit_start, 'second')
+        lock.audit_end('first')
+        self.assertTrue(checkpoint.done())
+        self.assertIsNone(lock.checkpoint())
+        self.assertError(AuditoryLock.Error.NOT_AUDITING, lock.audit_end, 'first')
+
+    def test_reentrant_and_simultaneous_auditors_are_counted(self):
+        lock = AuditoryFutureLock(reentrant=True, simultaneous=True)
+        lock.audit_start('first')
+        lock.audit_start('first')
+        lock.audit_start('second')
+        checkpoint = lock.checkpoint()
+        for auditor in ('first', 'second', 'first'):
+            self.assertFalse(checkpoint.done())
+            lock.audit_end(auditor)
+        self.assertTrue(checkpoint.done())
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class AuditoryAsyncioLockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_checkpoint_waits_for_the_auditors(self):
+        lock = AuditoryAsyncioLock(simultaneous=True, loop=self.loop)
+        self.assertIsNone(lock.checkpoint())
+        lock.audit_start('first')
+        lock.audit_start('second')
+        checkpoint = lock.checkpoint()
+        self.assertIs(checkpoint.get_loop(), self.loop)
+        self.loop.call_later(0.01, lock.audit_end, 'first')
+        self.loop.call_later(0.02, lock.audit_end, 'second')
+        self.loop.run_until_complete(asyncio.wait_for(checkpoint, 5))
+        self.assertIsNone(lock.checkpoint())
+
+    def test_checkpoints_after_an_auditory_wait_again(self):
+        lock = AuditoryAsyncioLock(loop=self.loop)
+        lock.audit_start('first')
+        first = lock.checkpoint()
+        lock.audit_end('first')
+        lock.audit_start('first')
+        second = lock.checkpoint()
+        self.assertTrue(first.done())
+        self.assertFalse(second.done())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+import json
+import unittest
+from cantrips.patterns.broadcast import IBroadcast
+from cantrips.protocol.messaging.formats import CommandSpec, JSONTranslator, MsgPackTranslator
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.messaging.processor import MessageProcessor
+from cantrips.protocol.traits.user.base import UserBroadcast, UserEndpoint, UserEndpointList
+from cantrips.protocol.traits.user.master import UserMasterBroadcast
+from cantrips.protocol.traits.user.slave import UserSlaveBroadcast
+
+
+ROOM_NS = CommandSpec('room', 0x21)
+ROOM_CODE_SAID = CommandSpec('said', 0x01)
+MSGPACK_TRANSLATOR = MsgPackTranslator()
+MSGPACK_TRANSLATOR.namespace(ROOM_NS).add_command(ROOM_CODE_SAID)
+
+
+class Socket(object):
+
+    TRANSLATOR = JSONTranslator()
+
+    def __init__(self):
+        self.raw = []
+        self.messages = []
+
+    def send_message(self, ns, code, *args, **kwargs):
+        self.messages.append(((ns, code), args, kwargs))
+
+    def send_raw(self, data, command=None):
+        self.raw.append(data)
+
+
+class MsgPackSocket(MessageProcessor):
+    """
+    Records the sent data. It uses the packing options of the translator.
+    """
+
+    TRANSLATOR = MSGPACK_TRANSLATOR
+    LAYERS = []
+
+    def __init__(self):
+        super(MsgPackSocket, self).__init__()
+        self.sent = []
+
+    def _conn_send(self, data, binary=None):
+        self.sent.append(data)
+
+
+class OwnPackerSocket(MsgPackSocket):
+    """
+    Keeps its own packer, with the default options.
+    """
+
+    MSGPACK_PER_CONNECTION = True
+
+
+class SingleFloatSocket(OwnPackerSocket):
+    """
+    Keeps its own packer, packing floats with single precision.
+    """
+
+    MSGPACK_PACKER_OPTIONS = {'use_bin_type': True, 'use_single_float': True}
+
+
+class AuditedUser(UserEndpoint):
+    """
+    Overrides notify(): it must be used by broadcasts.
+    """
+
+    notified = []
+
+    def notify(self, ns, code, *args, **kwargs):
+        self.notified.append((self.key, (ns, code)))
+        return super(AuditedUser, self).notify(ns, code, *args, **kwargs)
+
+
+class AuditedUserList(UserEndpointList):
+
+    @classmethod
+    def endpoint_class(cls):
+        return UserEndpoint
+
+
+class Broadcast(UserBroadcast):
+
+    @classmethod
+    def endpoint_list(cls):
+        return AuditedUserList()
+
+    def register(self, user, *args, **kwargs):
+        return self.list.insert(user)
+
+
+class RoutedBroadcast(Broadcast):
+    """
+    Overrides notify(): broadcasts must notify each user through it.
+    """
+
+    routed = []
+
+    def notify(self, user, command, *args, **kwargs):
+        self.routed.append((user, command))
+        return super(RoutedBroadcast, self).notify(user, command, *args, **kwargs)
+
+
+class FanoutTest(unittest.TestCase):
+
+    def setUp(self):
+        AuditedUser.notified = []
+        RoutedBroadcast.routed = []
+        self.broadcast = Broadcast('room')
+        self.plain = [Socket(), Socket()]
+        self.audited = Socket()
+        for index, socket in enumerate(self.plain):
+            self.broadcast.register(UserEndpoint('plain-%d' % index, socket))
+        self.broadcast.register(AuditedUser('audited', self.audited))
+
+    def test_data_is_serialized_once(self):
+        self.assertEqual(self.broadcast.broadcast(('room', 'said'), 'hello'), 3)
+        self.assertEqual(len(self.plain[0].raw), 1)
+        self.assertIs(self.plain[0].raw[0], self.plain[1].raw[0])
+
+    def test_overridden_notify_is_used(self):
+        self.broadcast.broadcast(('room', 'said'), 'hello')
+        self.assertEqual(AuditedUser.notified, [('audited', ('room', 'said'))])
+        self.assertEqual(self.audited.raw, [])
+        self.assertEqual(self.audited.messages, [(('room', 'said'), ('hello',), {})])
+
+    def test_criterion_applies_to_every_user(self):
+        others = IBroadcast.BROADCAST_FILTER_OTHERS(self.broadcast.users()['audited'])
+        self.assertEqual(self.broadcast.broadcast(('room', 'said'), 'hello', filter=others), 2)
+        self.assertEqual(AuditedUser.notified, [])
+
+    def test_overridden_broadcast_notify_is_used(self):
+        broadcast = RoutedBroadcast('room')
+        sockets = [Socket(), Socket()]
+        for index, socket in enumerate(sockets):
+            broadcast.register(UserEndpoint('plain-%d' % index, socket))
+        others = IBroadcast.BROADCAST_FILTER_OTHERS(broadcast.users()['plain-0'])
+        self.assertEqual(broadcast.broadcast(('room', 'said'), 'hello', filter=others), 1)
+        self.assertEqual(RoutedBroadcast.routed, [('plain-1', ('room', 'said'))])
+        self.assertEqual([socket.raw for socket in sockets], [[], []])
+        self.assertEqual(sockets[1].messages, [(('room', 'said'), ('hello',), {})])
+
+
+    def test_sockets_get_the_data_of_their_packer(self):
+        broadcast = Broadcast('room')
+        sockets = [MsgPackSocket(), OwnPackerSocket(), OwnPackerSocket(), SingleFloatSocket()]
+        for index, socket in enumerate(sockets):
+            broadcast.register(UserEndpoint('user-%d' % index, socket))
+        broadcast.broadcast((ROOM_NS, ROOM_CODE_SAID), 1.5)
+        for socket in sockets:
+            socket.send_message(Message(ROOM_NS, ROOM_CODE_SAID, 1.5))
+            self.assertEqual(socket.sent[0], socket.sent[1])
+        self.assertNotEqual(sockets[1].sent[0], sockets[3].sent[0])
+        self.assertIs(sockets[1].sent[0], sockets[2].sent[0])
+
+
+class IdleSocket(MessageProcessor):
+    """
+    Records the commands of the sent messages, and the close code.
+    """
+
+    TRANSLATOR = JSONTranslator
+    LAYERS = []
+
+    def __init__(self):
+        super(IdleSocket, self).__init__()
+        self.sent = []
+        self.closed = None
+
+    def _conn_send(self, data, binary=None):
+        self.sent.append(json.loads(data)['code'])
+
+    def _conn_close(self, code, reason=''):
+        self.closed = code
+
+
+class MasterUser(UserEndpoint):
+
+    def slaves(self):
+        return dict((key, slave) for key, slave in self.master.slaves.items() if self.key in slave.users())
+
+
+class MasterUserList(UserEndpointList):
+
+    @classmethod
+    def endpoint_class(cls):
+        return MasterUser
+
+
+class Master(UserMasterBroadcast):
+
+    @classmethod
+    def endpoint_list(cls):
+        return MasterUserList()
+
+
+class IdleLogoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.master = Master('lobby', UserSlaveBroadcast)
+        self.room = self.master.slave_register('room')
+        self.socket = IdleSocket()
+        user = self.master.register('user-1', self.socket, master=self.master)
+        self.master.auth_set(self.socket, end_point=user)
+        self.room.register(user)
+
+    def test_reaped_users_are_logged_out(self):
+        self.socket._reap()
+        self.assertNotIn('user-1', self.master.users())
+        self.assertNotIn('user-1', self.room.users())
+        self.assertIn('auth.forced-logout', self.socket.sent)
+        self.assertEqual(self.socket.closed, 1000)
+
+    def test_logged_out_sockets_are_not_handled_anymore(self):
+        self.master.force_logout('user-1')
+        self.master.auth_clear(self.socket)
+        self.socket.sent = []
+        self.socket._reap()
+        self.assertEqual(self.socket.sent, [])
+        self.assertEqual(self.socket.closed, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+import os
+import json
+import pickle
+import shutil
+import socket
+import tempfile
+import unittest
+import multiprocessing
+from cantrips.protocol.cluster.bus import AsyncioBusReader, LocalBus, UnixBus
+from cantrips.protocol.cluster.workers import WorkerPool
+from cantrips.protocol.messaging.formats import JSONTranslator
+from cantrips.protocol.traits.user.base import UserEndpoint, UserEndpointList
+from cantrips.protocol.traits.user.cluster import ClusterBroadcast
+from cantrips.protocol.traits.user.slave import UserSlaveBroadcast
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+CLUSTER_SUPPORTED = asyncio is not None and hasattr(socket, 'SO_REUSEPORT') and hasattr(socket, 'AF_UNIX')
+
+
+class Socket(object):
+
+    TRANSLATOR = JSONTranslator()
+
+    def __init__(self):
+        self.received = []
+
+    def send_raw(self, data, command=None):
+        self.received.append(json.loads(data)['args'])
+
+
+class Broadcast(ClusterBroadcast):
+
+    @classmethod
+    def endpoint_list(cls):
+        return UserEndpointList()
+
+    def register(self, user, *args, **kwargs):
+        return self.list.insert(user)
+
+
+class Named(object):
+    """
+    A picklable criterion accepting the users having any of the given keys.
+    """
+
+    def __init__(self, *keys):
+        self.keys = keys
+
+    def __call__(self, u, command, *args, **kwargs):
+        return u.key in self.keys
+
+
+class ClusterBroadcastTest(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [Broadcast('room', bus=bus) for bus in LocalBus.group(2)]
+        self.sockets = {}
+        for index, node in enumerate(self.nodes):
+            for key in ('a%d' % index, 'b%d' % index):
+                self.sockets[key] = Socket()
+                node.register(UserEndpoint(key, socket=self.sockets[key]))
+
+    def received(self):
+        return dict((key, socket.received) for key, socket in self.sockets.items())
+
+    def test_broadcasts_reach_every_worker(self):
+        self.nodes[0].broadcast(('room', 'said'), 'hi')
+        self.assertEqual(self.received(), {'a0': [['hi']], 'b0': [['hi']], 'a1': [['hi']], 'b1': [['hi']]})
+
+    def test_filters_apply_on_every_worker(self):
+        self.nodes[0].broadcast(('room', 'said'), 'hi', filter=Named('a0', 'a1'))
+        self.nodes[1].broadcast(('room', 'parted'), criterion=Named('b0'), user='b1')
+        self.assertEqual(self.received(), {'a0': [['hi']], 'b0': [[]], 'a1': [['hi']], 'b1': []})
+
+    def test_unpicklable_filters_need_local(self):
+        with self.assertRaises(TypeError):
+            self.nodes[0].broadcast(('room', 'said'), 'hi', filter=lambda u, command, *a, **kw: True)
+        self.assertEqual(self.received(), {'a0': [], 'b0': [], 'a1': [], 'b1': []})
+        self.nodes[0].broadcast(('room', 'said'), 'hi', filter=lambda u, command, *a, **kw: u.key == 'a0', local=True)
+        self.assertEqual(self.received(), {'a0': [['hi']], 'b0': [], 'a1': [], 'b1': []})
+
+    def test_join_and_part_criteria_are_picklable(self):
+        users = self.nodes[0].list
+        for criteria in (UserSlaveBroadcast._join_criteria, UserSlaveBroadcast._part_criteria):
+            criterion = pickle.loads(pickle.dumps(criteria(users['a0'])))
+            self.assertFalse(criterion(users['a0'], ('channel', 'joined')))
+            self.assertTrue(criterion(users['b0'], ('channel', 'joined')))
+
+
+@unittest.skipIf(not hasattr(socket, 'AF_UNIX'), "Needs Unix sockets")
+class UnixBusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='cantrips-bus-test-')
+        self.buses = [UnixBus(self.directory, worker, 2) for worker in range(2)]
+        self.calls = []
+
+    def tearDown(self):
+        for bus in self.buses:
+            bus.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def record(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+    def test_keyword_arguments_reach_the_handler(self):
+        self.buses[1].subscribe('call', self.record)
+        self.buses[0].publish('call', 1, 2, three=3, worker=1)
+        self.buses[1].receive()
+        self.assertEqual(self.calls, [((1, 2), {'three': 3})])
+
+    def test_failing_calls_do_not_stop_the_others(self):
+        def fail(*args, **kwargs):
+            raise ValueError("failing handler")
+
+        self.buses[1].subscribe('call', self.record)
+        self.buses[1].subscribe('fail', fail)
+        self.buses[0].publish('fail', 1)
+        self.buses[0]._socket.sendto(b'not a pickle', self.buses[0].path(1))
+        self.buses[0].publish('call', 2)
+        self.buses[1].receive()
+        self.assertEqual(self.calls, [((2,), {})])
+        self.assertEqual(self.buses[1].received, 3)
+
+
+class ClusterTarget(object):
+    """
+    Serves a worker: each connection is answered, per received chunk, with the index of the
+      worker and the calls it dropped after publishing a 'ping' to worker 1. Worker 0 pings
+      worker 1 on start, and worker 1 exits once pinged (events are reported to a queue).
+    """
+
+    def __init__(self, events):
+        self.events = events
+
+    def __call__(self, worker, bus, sock):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        reader = AsyncioBusReader(loop, bus)
+
+        def ping(origin):
+            self.events.put((worker, origin))
+            if worker == 1:
+                loop.stop()
+
+        class Answer(asyncio.Protocol):
+
+            def connection_made(self, transport):
+                self.transport = transport
+
+            def data_received(self, data):
+                bus.publish('ping', worker, worker=1)
+                self.transport.write(('%d %d' % (worker, bus.dropped)).encode('ascii'))
+
+        bus.subscribe('ping', ping)
+        loop.run_until_complete(loop.create_server(Answer, sock=sock))
+        reader.start()
+        if worker == 0:
+            bus.publish('ping', worker, worker=1)
+        try:
+            loop.run_forever()
+        finally:
+            reader.stop()
+            loop.close()
+
+
+@unittest.skipIf(not CLUSTER_SUPPORTED, "Needs asyncio, Unix sockets and SO_REUSEPORT")
+class WorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = multiprocessing.get_context('fork').Queue()
+        self.pool = WorkerPool(ClusterTarget(self.events), 0, '127.0.0.1', workers=2)
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def ask(self):
+        client = socket.create_connection(('127.0.0.1', self.pool.port), timeout=5)
+        try:
+            client.sendall(b'?')
+            return client.recv(64).decode('ascii')
+        finally:
+            client.close()
+
+    def test_calls_are_delivered_and_exited_workers_cleaned_up(self):
+        directory = self.pool.directory
+        self.assertEqual(self.events.get(timeout=5), (1, 0))
+        # Worker 1 returned after being pinged: its bus was closed and removed.
+        worker1 = self.pool.processes[1]
+        worker1.join(5)
+        self.assertEqual(worker1.exitcode, 0)
+        self.assertFalse(os.path.exists(os.path.join(directory, 'worker-1.sock')))
+        self.assertTrue(os.path.exists(os.path.join(directory, 'worker-0.sock')))
+        # Worker 0 keeps serving the shared port alone, and its calls to worker 1 are dropped.
+        self.assertEqual(self.ask(), '0 1')
+        self.assertEqual(self.ask(), '0 2')
+        self.pool.stop()
+        self.assertEqual(self.pool.processes, [])
+        self.assertIsNone(self.pool.directory)
+        self.assertFalse(os.path.exists(directory))
+
@@ -0,0 +1,284 @@
+import unittest
+from cantrips.features import Feature
+from cantrips.protocol.messaging.formats import CommandSpec, CompactTranslator, JSONTranslator, MsgPackTranslator, \
+    StructTranslator, MsgPackFeature, Formats, JSON_BACKENDS, RECORD_TAG, json_backend, select_json_backend
+from cantrips.protocol.messaging.layers import ProtocolLayer
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.messaging.processor import MessageProcessor
+
+
+SAY_NS = CommandSpec('say', 0x11)
+SAY_CODE_SAY = CommandSpec('say', 0x01)
+
+
+class IndexedKeywordsTest(unittest.TestCase):
+
+    SAY_NS = CommandSpec('say', 0x11)
+    SAY_CODE_SAY = CommandSpec('say', 0x01, ('message', 'target'))
+
+    def setUp(self):
+        self.translator = CompactTranslator()
+        self.translator.namespace(self.SAY_NS).add_command(self.SAY_CODE_SAY)
+        self.code = self.translator.untranslate(self.SAY_NS, self.SAY_CODE_SAY)
+
+    def test_declared_indices_are_expanded(self):
+        message = self.translator.parse_payload([self.code, [], {0: 'hello', 1: 'room'}])
+        self.assertEqual(message.kwargs, {'message': 'hello', 'target': 'room'})
+
+    def test_out_of_range_indices_are_rejected(self):
+        for key in (2, -1, -2):
+            with self.assertRaises(CompactTranslator.Error) as context:
+                self.translator.parse_payload([self.code, [], {key: 'hello'}])
+            self.assertEqual(context.exception.code, CompactTranslator.Error.EXPECTED_KWARGS_KEYS_AS_STRING)
+
+
+class TranslationMemoTest(unittest.TestCase):
+
+    SAY_CODE_SHOUT = CommandSpec('shout', 0x02)
+
+    def setUp(self):
+        self.translator = MsgPackTranslator()
+        self.translator.namespace(SAY_NS).add_command(SAY_CODE_SAY)
+        self.full_command = self.translator.untranslate(SAY_NS, SAY_CODE_SAY)
+
+    def stats(self):
+        stats = self.translator.translation_stats()
+        return stats['translated'], stats['untranslated']
+
+    def test_known_commands_are_memoized(self):
+        self.assertEqual(self.stats(), (1, 1))
+        self.assertEqual(self.translator.translate(self.full_command), (SAY_NS, SAY_CODE_SAY))
+        self.assertRaises(KeyError, self.translator.translate, self.full_command + 1)
+        self.assertEqual(self.stats(), (1, 1))
+        self.translator.untranslate(SAY_NS.integer, SAY_CODE_SAY.integer)
+        self.translator.untranslate(SAY_NS.integer, SAY_CODE_SAY.integer)
+        self.assertEqual(self.stats(), (1, 2))
+
+    def test_unknown_raw_values_are_not_memoized(self):
+        for index in range(3):
+            self.assertEqual(self.translator.untranslate(SAY_NS.integer, 0x7f), self.full_command - 1 + 0x7f)
+        self.assertEqual(self.stats(), (1, 1))
+
+    def test_commands_added_later_are_translated(self):
+        shout = self.translator.untranslate(SAY_NS, self.SAY_CODE_SHOUT)
+        self.assertRaises(KeyError, self.translator.translate, shout)
+        self.translator.untranslate(SAY_NS, self.SAY_CODE_SHOUT)
+        self.assertEqual(self.stats(), (1, 1))
+        self.translator.namespace(SAY_NS).add_command(self.SAY_CODE_SHOUT)
+        self.assertEqual(self.translator.translate(shout), (SAY_NS, self.SAY_CODE_SHOUT))
+        self.assertEqual(self.translator.untranslate(SAY_NS, self.SAY_CODE_SHOUT), shout)
+        self.assertEqual(self.stats(), (2, 2))
+
+    def test_replaced_commands_are_translated_to_the_new_spec(self):
+        self.translator.translate(self.full_command)
+        replacement = CommandSpec('talk', SAY_CODE_SAY.integer)
+        self.translator.namespace(SAY_NS).add_command(replacement)
+        self.assertEqual(self.translator.translate(self.full_command), (SAY_NS, replacement))
+
+
+class RecordFallbackTest(unittest.TestCase):
+
+    MOVE_NS = CommandSpec('move', 0x12)
+    MOVE_CODE_TO = CommandSpec('to', 0x01, schema='iif')
+
+    def setUp(self):
+        self.translator = StructTranslator()
+        self.translator.namespace(self.MOVE_NS).add_command(self.MOVE_CODE_TO)
+
+    def roundtrip(self, *args, **kwargs):
+        data = self.translator.serialize(Message(self.MOVE_NS, self.MOVE_CODE_TO, *args, **kwargs))
+        message = self.translator.parse_data(data, True)
+        return bytearray(data[:1])[0] == RECORD_TAG, message.args, message.kwargs
+
+    def test_fitting_messages_are_records(self):
+        self.assertEqual(self.roundtrip(1, 2, 0.5), (True, (1, 2, 0.5), {}))
+
+    def test_other_messages_use_the_compact_envelope(self):
+        for args in [(1, 2, 'a'), (1.5, 2, 3.0), (2 ** 40, 1, 1.0)]:
+            record, received, kwargs = self.roundtrip(*args)
+            self.assertFalse(record)
+            self.assertEqual(tuple(received), args)
+        self.assertEqual(self.roundtrip(1, 2, 0.5, speed=3), (False, (1, 2, 0.5), {'speed': 3}))
+
+
+class LazyParseTest(unittest.TestCase):
+
+    SAY_NS = CommandSpec('say', 0x11)
+    SAY_CODE_SAY = CommandSpec('say', 0x01)
+
+    def translators(self):
+        for translator_class in (MsgPackTranslator, CompactTranslator):
+            translator = translator_class(lazy=True)
+            translator.namespace(self.SAY_NS).add_command(self.SAY_CODE_SAY)
+            yield translator
+
+    def test_arguments_are_decoded(self):
+        for translator in self.translators():
+            data = translator.serialize(Message(self.SAY_NS, self.SAY_CODE_SAY, 'hello', to='room'))
+            message = translator.parse_data(data, True)
+            self.assertEqual((message.args, message.kwargs), (('hello',), {'to': 'room'}))
+
+    def test_trailing_data_is_rejected(self):
+        extra_data = MsgPackFeature.import_it()[0].exceptions.ExtraData
+        for translator in self.translators():
+            data = translator.serialize(Message(self.SAY_NS, self.SAY_CODE_SAY, 'hello')) + b'\xc0'
+            # The same error as the eager parsing.
+            self.assertRaises(extra_data, translator.decode, data, True)
+            self.assertRaises(extra_data, translator.parse_data, data, True)
+
+
+class SayLayer(ProtocolLayer):
+
+    def __init__(self, processor_class):
+        super(SayLayer, self).__init__(processor_class)
+        self.add_command_handler(SAY_NS, SAY_CODE_SAY, self._say)
+
+    def _say(self, socket, message):
+        socket.received.append(message.args)
+
+
+class SendingProcessor(MessageProcessor):
+    """
+    Records the sent data, and the arguments of the received messages.
+    """
+
+    TRANSLATOR = JSONTranslator
+    LAYERS = [SayLayer]
+
+    def __init__(self):
+        super(SendingProcessor, self).__init__()
+        self.sent = []
+        self.received = []
+
+    def _conn_send(self, data, binary=None):
+        self.sent.append(data)
+
+
+class MsgPackProcessor(SendingProcessor):
+    """
+    Keeps a msgpack codec per connection.
+    """
+
+    TRANSLATOR = MsgPackTranslator
+    LAYERS = [SayLayer]
+    MSGPACK_PER_CONNECTION = True
+
+
+class PerConnectionMsgPackTest(unittest.TestCase):
+
+    def translators(self):
+        for translator_class in (MsgPackTranslator, CompactTranslator):
+            for lazy in (False, True):
+                translator = translator_class(lazy=lazy)
+                translator.namespace(SAY_NS).add_command(SAY_CODE_SAY)
+                yield translator, translator.create_broker(MessageProcessor.MSGPACK_PACKER_OPTIONS,
+                                                           MessageProcessor.MSGPACK_UNPACKER_OPTIONS)
+
+    def test_string_format_has_no_broker(self):
+        self.assertRaises(ValueError, JSONTranslator().create_broker)
+
+    def test_split_stream_is_parsed(self):
+        for translator, broker in self.translators():
+            frames = [translator.serialize(Message(SAY_NS, SAY_CODE_SAY, u'ol\u00e1', index), broker)
+                      for index in range(3)]
+            self.assertEqual(translator.parse_data(frames[0], True, broker=broker).args, (u'ol\u00e1', 0))
+            # A truncated frame fails, and the broker is ready for the next frames.
+            self.assertRaises(translator.exceptions, translator.parse_data, frames[1][:-2], True, broker=broker)
+            for index in (1, 2):
+                self.assertEqual(translator.parse_data(memoryview(frames[index]), True, broker=broker).args,
+                                 (u'ol\u00e1', index))
+
+    def test_trailing_data_is_rejected(self):
+        for translator, broker in self.translators():
+            data = translator.serialize(Message(SAY_NS, SAY_CODE_SAY, 'hello'), broker)
+            with self.assertRaises(ValueError) as context:
+                translator.parse_data(data + b'\xc0', True, broker=broker)
+            self.assertIn('Extra data', str(context.exception))
+            self.assertEqual(translator.parse_data(data, True, broker=broker).args, ('hello',))
+
+    def test_streaming_api(self):
+        translator, broker = next(self.translators())
+        unpacker = broker.stream(broker.dumps([1, 2]) + broker.dumps(3))
+        self.assertEqual(unpacker.unpack(), [1, 2])
+        self.assertRaises(ValueError, broker.finish)
+        self.assertEqual(unpacker.unpack(), 3)
+        broker.finish()
+        self.assertEqual(broker.loads(broker.dumps({u'a': b'b'})), {u'a': b'b'})
+
+    def test_processors_keep_their_own_broker(self):
+        first, second = MsgPackProcessor(), MsgPackProcessor()
+        self.assertIsNot(first._broker, second._broker)
+        first.send_message(SAY_NS, SAY_CODE_SAY, 'hello')
+        second._conn_message(first.sent[0], True)
+        self.assertEqual(second.received, [('hello',)])
+
+
+class JSONBackendsTest(unittest.TestCase):
+
+    DATA = u'{"text": "ol\u00e1", "values": [1, 2.5, null]}'
+    VALUE = {u'text': u'ol\u00e1', u'values': [1, 2.5, None]}
+
+    def backends(self):
+        """
+        The installed backends.
+        """
+        for name, feature in JSON_BACKENDS:
+            try:
+                yield name, json_backend(name)
+            except Feature.Error:
+                pass
+
+    def inputs(self, text):
+        data = text.encode('utf-8')
+        # A view of a reused buffer, like the ones given by the adapters.
+        buffer = bytearray(b'  ' + data + b'  ')
+        return [text, data, bytearray(data), memoryview(data), memoryview(buffer)[2:-2]]
+
+    def test_std_backend_is_installed(self):
+        self.assertIn('json', [name for name, backend in self.backends()])
+
+    def test_every_input_is_loaded(self):
+        for name, (broker, exceptions) in self.backends():
+            for data in self.inputs(self.DATA):
+                self.assertEqual(broker.loads(data), self.VALUE, (name, type(data)))
+            self.assertEqual(broker.loads(broker.dumps(self.VALUE)), self.VALUE, name)
+
+    def test_invalid_inputs_raise_the_backend_exceptions(self):
+        for name, (broker, exceptions) in self.backends():
+            for data in self.inputs(u'{"text": '):
+                self.assertRaises(exceptions, broker.loads, data)
+
+    def test_translators_parse_buffers(self):
+        for name, backend in self.backends():
+            translator = JSONTranslator(backend=name)
+            translator.namespace(SAY_NS).add_command(SAY_CODE_SAY)
+            data = translator.serialize(Message(SAY_NS, SAY_CODE_SAY, u'ol\u00e1'))
+            for item in self.inputs(data)[1:]:
+                self.assertEqual(translator.parse_data(item, False).args, (u'ol\u00e1',), name)
+
+    def test_selected_backend_is_used_by_connections(self):
+        try:
+            for name, (broker, exceptions) in self.backends():
+                select_json_backend(name)
+                self.assertIs(Formats.FORMAT_STRING.broker, broker)
+                self.assertIs(Formats.FORMAT_STRING.exceptions, exceptions)
+                processor = SendingProcessor()
+                processor.send_message(SAY_NS, SAY_CODE_SAY, u'ol\u00e1')
+                expected = broker.dumps({'code': 'say.say', 'args': (u'ol\u00e1',), 'kwargs': {}})
+                self.assertEqual(processor.sent, [expected], name)
+        finally:
+            select_json_backend()
+
+    def test_running_connections_use_the_selected_backend(self):
+        processor = SendingProcessor()
+        try:
+            for name, (broker, exceptions) in self.backends():
+                select_json_backend(name)
+                processor.send_message(SAY_NS, SAY_CODE_SAY, 1)
+                self.assertEqual(processor.sent[-1], broker.dumps({'code': 'say.say', 'args': (1,), 'kwargs': {}}))
+        finally:
+            select_json_backend()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from cantrips.protocol.messaging.framing import FrameDecoder, LengthPrefixedDecoder, MsgPackStreamDecoder
+
+
+class LengthPrefixedDecoderTest(unittest.TestCase):
+
+    def test_frames_split_across_chunks(self):
+        decoder = LengthPrefixedDecoder()
+        data = decoder.encode(b'hello') + decoder.encode(b'world')
+        self.assertEqual([frame.tobytes() for frame in decoder.feed(data[:7])], [])
+        self.assertEqual([frame.tobytes() for frame in decoder.feed(data[7:12])], [b'hello'])
+        self.assertEqual([frame.tobytes() for frame in decoder.feed(data[12:])], [b'world'])
+
+    def test_large_frames_are_rejected(self):
+        decoder = LengthPrefixedDecoder(max_frame_size=4)
+        with self.assertRaises(FrameDecoder.Error) as raised:
+            decoder.feed(decoder.encode(b'hello'))
+        self.assertEqual(raised.exception.code, FrameDecoder.Error.FRAME_TOO_LARGE)
+
+
+class MsgPackStreamDecoderTest(unittest.TestCase):
+
+    def test_objects_split_across_chunks(self):
+        decoder = MsgPackStreamDecoder()
+        self.assertEqual(decoder.feed(b'\x92\x01'), [])
+        self.assertEqual(decoder.feed(b'\x02\x03'), [[1, 2], 3])
+
+    def test_malformed_data_is_reported(self):
+        decoder = MsgPackStreamDecoder()
+        with self.assertRaises(FrameDecoder.Error) as raised:
+            decoder.feed(b'\xc1')
+        self.assertEqual(raised.exception.code, FrameDecoder.Error.MALFORMED_STREAM)
+
+
+if __name__ == '__main__':
+    unittest.main()
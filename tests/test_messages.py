@@ -0,0 +1,55 @@
+import pickle
+import unittest
+from cantrips.types.arguments import Arguments
+from cantrips.protocol.messaging.messages import FrozenKwargs, Message, LazyMessage
+
+
+class MessageTest(unittest.TestCase):
+
+    def test_arguments_are_accessible(self):
+        message = Message('say', 'say', 1, 2, text='hello')
+        self.assertEqual(message.code, ('say', 'say'))
+        self.assertEqual((message[0], message.text, len(message)), (1, 'hello', 3))
+        self.assertTrue('text' in message and 1 in message)
+        self.assertFalse('user' in message or 2 in message)
+        self.assertRaises(AttributeError, getattr, message, 'user')
+        self.assertRaises(IndexError, message.__getitem__, 2)
+
+    def test_messages_are_read_only(self):
+        message = Message('say', 'say', 1, text='hello')
+        self.assertRaises(AttributeError, setattr, message, 'text', 'bye')
+        self.assertRaises(TypeError, message.__setitem__, 0, 2)
+        with self.assertRaises(TypeError):
+            message.kwargs['text'] = 'bye'
+        self.assertRaises(TypeError, message.kwargs.update, text='bye')
+        self.assertRaises(TypeError, message.kwargs.pop, 'text')
+        self.assertEqual(message.kwargs, {'text': 'hello'})
+
+    def test_built_messages_are_read_only(self):
+        kwargs = {'text': 'hello'}
+        message = Message.from_parts(('say', 'say'), (1,), kwargs)
+        kwargs['text'] = 'bye'
+        self.assertIsInstance(message.kwargs, FrozenKwargs)
+        self.assertEqual(message.text, 'hello')
+        lazy = LazyMessage.from_loader(('say', 'say'), lambda: ((1,), {'text': 'hello'}))
+        self.assertRaises(TypeError, lazy.kwargs.update, text='bye')
+
+    def test_string_representations(self):
+        message = Message('say', 'say', 1, text='hello')
+        self.assertEqual(str(message), str(((1,), {'text': 'hello'})))
+        self.assertEqual(bytes(message), str(message).encode('utf-8'))
+
+    def test_addition(self):
+        total = Message('say', 'say', 1, text='hello', user='me') + Message('say', 'said', 2, text='bye')
+        self.assertIsInstance(total, Arguments)
+        self.assertEqual((total.args, dict(total.kwargs)), ((1, 2), {'text': 'bye', 'user': 'me'}))
+        self.assertRaises(TypeError, lambda: Message('say', 'say') + (1,))
+
+    def test_pickling(self):
+        message = Message('say', 'say', 1, text='hello')
+        kwargs = pickle.loads(pickle.dumps(message.kwargs, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual((type(kwargs), kwargs), (FrozenKwargs, {'text': 'hello'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+from cantrips.protocol.messaging.formats import CommandSpec, JSONTranslator
+from cantrips.protocol.messaging.layers import ProtocolLayer
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.messaging.metrics import LatencyHistogram, MemorySink
+from cantrips.protocol.messaging.processor import MessageProcessor
+
+
+NAMESPACE = CommandSpec('metered', 1)
+REPLY = CommandSpec('reply', 1)
+FAIL = CommandSpec('fail', 2)
+IGNORED = CommandSpec('ignored', 3)
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in range(1 << histogram.sub_bucket_bits):
+            histogram.record(value)
+        self.assertEqual(len(histogram.buckets), 1 << histogram.sub_bucket_bits)
+        for value in range(1 << histogram.sub_bucket_bits):
+            self.assertEqual(histogram._lowest(histogram._index(value)), value)
+        self.assertEqual((histogram.percentile(50), histogram.min, histogram.max), (31, 0, 63))
+
+    def test_buckets_have_a_bounded_relative_width(self):
+        histogram = LatencyHistogram()
+        error = 1.0 / (1 << (histogram.sub_bucket_bits - 1))
+        previous = 0
+        for value in list(range(60, 5000)) + [10 ** power + 7 for power in range(4, 16)]:
+            index = histogram._index(value)
+            lowest = histogram._lowest(index)
+            self.assertGreaterEqual(index, previous)
+            self.assertLessEqual(lowest, value)
+            self.assertLessEqual(value - lowest, value * error)
+            previous = index
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+        for percent in (50, 90, 99, 99.9):
+            expected = 1000 * percent
+            self.assertLessEqual(abs(histogram.percentile(percent) - expected), expected * 0.035)
+        self.assertEqual(histogram.percentile(100), 100000 - 100000 % 2048)
+        self.assertEqual(histogram.percentile(0), 1)
+        self.assertEqual(histogram.mean, 50000.5)
+
+    def test_values_are_clamped(self):
+        histogram = LatencyHistogram()
+        self.assertEqual((histogram.percentile(50), histogram.mean), (0, 0.0))
+        histogram.record(-5)
+        histogram.record(1000)
+        self.assertEqual((histogram.min, histogram.max, histogram.total), (0, 1000, 1000))
+        # Percentiles never exceed the recorded extremes.
+        self.assertEqual(histogram.percentile(100), 992)
+        histogram.record(1001)
+        self.assertEqual(histogram.percentile(100), 992)
+        single = LatencyHistogram()
+        single.record(1001)
+        self.assertEqual(single.percentile(50), 1001)
+
+    def test_merge(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for value in (5, 500):
+            first.record(value)
+        for value in (50, 5000, 5000):
+            second.record(value)
+        first.merge(second)
+        first.merge(LatencyHistogram())
+        self.assertEqual((first.count, first.total, first.min, first.max), (5, 10555, 5, 5000))
+        self.assertEqual(sum(first.buckets.values()), 5)
+        self.assertEqual(first.percentile(100), second.percentile(100))
+        empty = LatencyHistogram()
+        empty.merge(second)
+        self.assertEqual((empty.min, empty.max, empty.buckets), (50, 5000, second.buckets))
+
+    def test_merge_requires_the_same_precision(self):
+        histogram = LatencyHistogram()
+        self.assertRaises(ValueError, histogram.merge, LatencyHistogram(sub_bucket_bits=4))
+        self.assertEqual(histogram.count, 0)
+
+
+class MeteredLayer(ProtocolLayer):
+
+    def __init__(self, processor_class):
+        super(MeteredLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, REPLY, self._reply)
+        self.add_command_handler(NAMESPACE, FAIL, self._fail)
+        processor_class.feed_translator(NAMESPACE, IGNORED)
+
+    def _reply(self, socket, message):
+        socket.send_message(NAMESPACE, REPLY, *message.args)
+
+    def _fail(self, socket, message):
+        raise RuntimeError(message.args)
+
+
+class MeteredProcessor(MessageProcessor):
+    TRANSLATOR = JSONTranslator
+    LAYERS = [MeteredLayer]
+
+    def __init__(self, strict=False):
+        super(MeteredProcessor, self).__init__(strict)
+        self.METRICS_SINK = MemorySink()
+        self.sent = []
+        self.closed = None
+
+    def _conn_send(self, data, binary=None):
+        self.sent.append(data)
+
+    def _conn_close(self, code, reason=''):
+        self.closed = code
+
+    def receive(self, code, *args):
+        return self._conn_message(self.TRANSLATOR.serialize(Message(NAMESPACE, code, *args)), False)
+
+
+class MemorySinkTest(unittest.TestCase):
+
+    def command(self, code):
+        return Message(NAMESPACE, code).code
+
+    def test_messages_are_counted(self):
+        processor = MeteredProcessor()
+        data = processor.TRANSLATOR.serialize(Message(NAMESPACE, REPLY, 'hello'))
+        processor.receive(REPLY, 'hello')
+        processor.receive(REPLY, 'hello')
+        metrics = processor.METRICS_SINK.command(self.command(REPLY))
+        self.assertEqual((metrics.messages_in, metrics.bytes_in), (2, 2 * len(data)))
+        self.assertEqual((metrics.messages_out, metrics.bytes_out), (2, 2 * len(data)))
+        for histogram in (metrics.parse, metrics.dispatch, metrics.handler):
+            self.assertEqual(histogram.count, 2)
+        self.assertEqual(processor.METRICS_SINK.errors, {})
+
+    def test_errors_are_counted_by_close_code(self):
+        processor = MeteredProcessor()
+        processor.receive(FAIL)
+        processor.receive(IGNORED)
+        processor._conn_message('{', False)
+        sink = processor.METRICS_SINK
+        self.assertEqual(sink.errors, {1011: 1, 1002: 1, 1003: 1})
+        self.assertEqual(sink.command(self.command(IGNORED)).errors, {1002: 1})
+        # The failed message is still measured.
+        self.assertEqual(sink.command(self.command(FAIL)).messages_in, 1)
+        self.assertEqual(sink.closes, {})
+        self.assertIsNone(processor.closed)
+
+    def test_forceful_closes_are_counted(self):
+        for code, receive in [(1011, lambda processor: processor.receive(FAIL)),
+                              (1002, lambda processor: processor.receive(IGNORED)),
+                              (1003, lambda processor: processor._conn_message('{', False))]:
+            processor = MeteredProcessor(strict=True)
+            self.assertFalse(receive(processor))
+            self.assertEqual(processor.closed, code)
+            self.assertEqual((processor.METRICS_SINK.errors, processor.METRICS_SINK.closes), ({code: 1}, {code: 1}))
+
+    def test_snapshot(self):
+        processor = MeteredProcessor()
+        processor.receive(REPLY, 'hello')
+        processor._conn_message('{', False)
+        snapshot = processor.METRICS_SINK.snapshot()
+        self.assertEqual(list(snapshot['commands']), ['metered.reply'])
+        self.assertEqual(snapshot['commands']['metered.reply']['messages_in'], 1)
+        self.assertEqual(snapshot['errors'], {1003: 1})
+        processor.METRICS_SINK.reset()
+        self.assertEqual(processor.METRICS_SINK.snapshot(), {'commands': {}, 'errors': {}, 'closes': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
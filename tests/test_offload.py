@@ -0,0 +1,43 @@
+import threading
+import unittest
+from cantrips.protocol.traits.decorators.offload import OffloadPool
+
+
+class OffloadPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.pool = OffloadPool(workers=2, max_queue=1)
+        self.addCleanup(self.pool.shutdown)
+        self.addCleanup(self.release.set)
+
+    def blocked(self, value):
+        self.release.wait(5)
+        return value
+
+    def test_queue_depth_is_not_negative_while_warming_up(self):
+        self.assertEqual(self.pool.queue_depth, 0)
+        self.pool.submit(self.blocked, 1)
+        self.assertEqual((self.pool.pending, self.pool.queue_depth), (1, 0))
+        self.assertEqual(self.pool.as_dict()['queue_depth'], 0)
+
+    def test_calls_beyond_the_queue_are_rejected(self):
+        futures = [self.pool.submit(self.blocked, value) for value in range(3)]
+        self.assertEqual(self.pool.queue_depth, 1)
+        with self.assertRaises(OffloadPool.Error) as context:
+            self.pool.submit(self.blocked, 3)
+        self.assertEqual(context.exception.code, OffloadPool.Error.QUEUE_FULL)
+        self.release.set()
+        self.assertEqual([future.result(5) for future in futures], [0, 1, 2])
+        stats = self.pool.as_dict()
+        self.assertEqual((stats['submitted'], stats['completed'], stats['rejected'], stats['pending']), (3, 3, 1, 0))
+        self.assertEqual((stats['wait_ns']['count'], stats['run_ns']['count']), (3, 3))
+
+    def test_failures_are_counted(self):
+        future = self.pool.submit(int, 'not a number')
+        self.assertRaises(ValueError, future.result, 5)
+        self.assertEqual((self.pool.failed, self.pool.completed, self.pool.pending), (1, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,665 @@
+import logging
+import unittest
+from cantrips.protocol.messaging.concurrency import HandlerLimiter
+from cantrips.protocol.messaging.formats import CommandSpec, Formats, JSONTranslator, CompactTranslator
+from cantrips.protocol.messaging.layers import ProtocolLayer
+from cantrips.protocol.messaging.messages import Message, LazyMessage
+from cantrips.protocol.messaging.processor import MessageProcessor, PENDING
+
+
+NAMESPACE = CommandSpec('test', 1)
+COMMAND = CommandSpec('run', 1)
+NOTICE = CommandSpec('notice', 2)
+SCRIPTED = CommandSpec('scripted', 3)
+OTHER = CommandSpec('other', 4)
+MISSING = CommandSpec('missing', 99)
+
+
+class ManualFuture(object):
+    """
+    A future resolved by the test (with set_result), having the interface of asyncio futures.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+        self._done = False
+        self._result = None
+
+    def add_done_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def cancelled(self):
+        return False
+
+    def exception(self):
+        return None
+
+    def result(self):
+        return self._result
+
+    def set_result(self, result):
+        self._done = True
+        self._result = result
+        for callback in self._callbacks:
+            callback(self)
+
+
+class PendingLayer(ProtocolLayer):
+    """
+    Its handler records the message and returns a future, kept in the processor to resolve it.
+    """
+
+    def __init__(self, processor_class):
+        super(PendingLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, COMMAND, self._run)
+        processor_class.feed_translator(NAMESPACE, NOTICE)
+
+    def _run(self, socket, message):
+        future = ManualFuture()
+        socket.handled.append((message.args[0], future))
+        return future
+
+
+class PendingProcessor(MessageProcessor):
+    TRANSLATOR = JSONTranslator
+    LAYERS = [PendingLayer]
+
+    def __init__(self):
+        super(PendingProcessor, self).__init__(strict=False)
+        self.handled = []
+        self.closed = None
+        self.paused = False
+
+    def _conn_send(self, data, binary=None):
+        pass
+
+    def _conn_close(self, code, reason=''):
+        self.closed = code
+
+    def _conn_pause_reading(self):
+        self.paused = True
+
+    def _conn_resume_reading(self):
+        self.paused = False
+
+    def receive(self, value):
+        return self._conn_message(self.TRANSLATOR.serialize(Message(NAMESPACE, COMMAND, value)), False)
+
+    def values(self):
+        return [value for value, future in self.handled]
+
+    def resolve(self, index):
+        self.handled[index][1].set_result(None)
+
+
+class LimitedProcessor(PendingProcessor):
+    LAYERS = [PendingLayer]
+    HANDLERS_LIMITER = HandlerLimiter(1)
+
+
+class NoticeLayer(ProtocolLayer):
+    """
+    Its handler records the message synchronously.
+    """
+
+    def __init__(self, processor_class):
+        super(NoticeLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, NOTICE, self._notice)
+
+    def _notice(self, socket, message):
+        socket.handled.append((message.args[0], None))
+
+
+class MixedLimitedProcessor(LimitedProcessor):
+    LAYERS = [PendingLayer, NoticeLayer]
+
+    def notice(self, value):
+        return self._conn_message(self.TRANSLATOR.serialize(Message(NAMESPACE, NOTICE, value)), False)
+
+
+class AsyncHandlersTest(unittest.TestCase):
+
+    def setUp(self):
+        LimitedProcessor.HANDLERS_LIMITER = HandlerLimiter(1)
+        MixedLimitedProcessor.HANDLERS_LIMITER = HandlerLimiter(1)
+
+    def test_ordered_messages_wait_for_the_pending_handler(self):
+        processor = PendingProcessor()
+        for value in range(3):
+            self.assertTrue(processor.receive(value))
+        self.assertEqual(processor.values(), [0])
+        processor.resolve(0)
+        self.assertEqual(processor.values(), [0, 1])
+        processor.resolve(1)
+        processor.resolve(2)
+        self.assertEqual(processor.values(), [0, 1, 2])
+        self.assertEqual(len(processor._handlers_waiting), 0)
+
+    def test_reading_pauses_while_too_many_messages_wait(self):
+        processor = PendingProcessor()
+        processor.MAX_WAITING_MESSAGES = 2
+        for value in range(4):
+            processor.receive(value)
+        self.assertTrue(processor.paused)
+        processor.resolve(0)
+        processor.resolve(1)
+        self.assertFalse(processor.paused)
+
+    def test_limiter_is_shared_among_processors(self):
+        first, second = LimitedProcessor(), LimitedProcessor()
+        first.receive(1)
+        second.receive(2)
+        self.assertEqual((first.values(), second.values()), ([1], []))
+        first.resolve(0)
+        self.assertEqual(second.values(), [2])
+        self.assertEqual(LimitedProcessor.HANDLERS_LIMITER.pending, 1)
+        second.resolve(0)
+        self.assertEqual(LimitedProcessor.HANDLERS_LIMITER.pending, 0)
+
+    def test_limiter_does_not_hold_synchronous_handlers(self):
+        limiter = MixedLimitedProcessor.HANDLERS_LIMITER
+        first, second = MixedLimitedProcessor(), MixedLimitedProcessor()
+        first.receive(1)
+        self.assertTrue(limiter.full())
+        second.notice('a')
+        second.receive(2)
+        self.assertEqual(second.values(), ['a'])
+        self.assertEqual(limiter.pending, 1)
+        first.resolve(0)
+        self.assertEqual(second.values(), ['a', 2])
+
+    def test_waiting_messages_are_discarded_on_disconnect(self):
+        processor = PendingProcessor()
+        for value in range(3):
+            processor.receive(value)
+        processor._conn_lost()
+        self.assertEqual(len(processor._handlers_waiting), 0)
+        processor.resolve(0)
+        self.assertEqual(processor.values(), [0])
+        self.assertEqual(processor._handlers_pending, 0)
+
+    def test_disconnect_releases_the_limiter(self):
+        limiter = LimitedProcessor.HANDLERS_LIMITER
+        first, second, third = LimitedProcessor(), LimitedProcessor(), LimitedProcessor()
+        first.receive(1)
+        second.receive(2)
+        third.receive(3)
+        second._conn_lost()
+        self.assertNotIn(second, limiter._waiting)
+        first._conn_lost()
+        first.resolve(0)
+        self.assertEqual((first.values(), second.values(), third.values()), ([1], [], [3]))
+        self.assertIsNone(first.closed)
+        third.resolve(0)
+        self.assertEqual(limiter.pending, 0)
+        self.assertEqual(len(limiter._waiting), 0)
+
+
+class ScriptedLayer(ProtocolLayer):
+    """
+    Its handler records its call and returns what the processor script tells for its name
+      (a value, or a callable taking the layer).
+    """
+
+    NAME = None
+
+    def __init__(self, processor_class):
+        super(ScriptedLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, SCRIPTED, self._handle)
+        self.add_namespace_handler(NAMESPACE, self._handle_namespace)
+        processor_class.feed_translator(NAMESPACE, OTHER)
+
+    def _handle(self, socket, message):
+        socket.calls.append(self.NAME)
+        outcome = socket.script.get(self.NAME)
+        return outcome(self) if callable(outcome) else outcome
+
+    def _handle_namespace(self, socket, message):
+        socket.calls.append(self.NAME + '-namespace')
+
+
+class FirstLayer(ScriptedLayer):
+    NAME = 'first'
+
+
+class SecondLayer(ScriptedLayer):
+    NAME = 'second'
+
+
+class ScriptedProcessor(PendingProcessor):
+    LAYERS = [FirstLayer, SecondLayer]
+
+    def __init__(self, **script):
+        super(ScriptedProcessor, self).__init__()
+        self.script = script
+        self.calls = []
+        self.unknown = []
+
+    def _on_unknown_message(self, message):
+        self.unknown.append(message.code)
+
+    def receive_scripted(self):
+        return self._conn_message(self.TRANSLATOR.serialize(Message(NAMESPACE, SCRIPTED)), False)
+
+
+class DispatchTest(unittest.TestCase):
+
+    def test_chain_has_one_handler_per_layer(self):
+        chain = ScriptedProcessor.dispatch_chain((NAMESPACE, SCRIPTED))
+        self.assertEqual(len(chain), 2)
+        self.assertIs(ScriptedProcessor.dispatch_chain((NAMESPACE, SCRIPTED)), chain)
+        processor = ScriptedProcessor()
+        processor._conn_message(processor.TRANSLATOR.serialize(Message(NAMESPACE, OTHER)), False)
+        self.assertEqual(processor.calls, ['first-namespace'])
+
+    def test_invalidated_chains_are_rebuilt(self):
+        chain = ScriptedProcessor.dispatch_chain((NAMESPACE, SCRIPTED))
+        ScriptedProcessor.invalidate_dispatch()
+        self.assertIsNot(ScriptedProcessor.dispatch_chain((NAMESPACE, SCRIPTED)), chain)
+
+    def test_handled_messages_stop_the_chain(self):
+        processor = ScriptedProcessor()
+        self.assertTrue(processor.receive_scripted())
+        self.assertEqual((processor.calls, processor.unknown), (['first'], []))
+
+    def test_cannot_handle_continues_the_chain(self):
+        for outcome in (ProtocolLayer.CANNOT_HANDLE, lambda layer: layer.i_cannot_handle()):
+            processor = ScriptedProcessor(first=outcome)
+            processor.receive_scripted()
+            self.assertEqual((processor.calls, processor.unknown), (['first', 'second'], []))
+
+    def test_nobody_can_handle_stops_the_chain(self):
+        for outcome in (ProtocolLayer.NOBODY_CAN_HANDLE, lambda layer: layer.nobody_can_handle()):
+            processor = ScriptedProcessor(first=outcome)
+            processor.receive_scripted()
+            self.assertEqual(processor.calls, ['first'])
+            self.assertEqual(processor.unknown, [(NAMESPACE, SCRIPTED)])
+
+    def test_unhandled_messages_are_unknown(self):
+        processor = ScriptedProcessor(first=ProtocolLayer.CANNOT_HANDLE, second=ProtocolLayer.CANNOT_HANDLE)
+        processor.receive_scripted()
+        self.assertEqual(processor.unknown, [(NAMESPACE, SCRIPTED)])
+
+    def test_pending_handlers_finish_the_chain(self):
+        future = ManualFuture()
+        processor = ScriptedProcessor(first=future)
+        message = Message(NAMESPACE, SCRIPTED)
+        self.assertIs(processor._dispatch(message), PENDING)
+        self.assertEqual(processor._handlers_pending, 1)
+        future.set_result(None)
+        self.assertEqual((processor.calls, processor.unknown), (['first'], []))
+        self.assertEqual(processor._handlers_pending, 0)
+
+    def test_pending_handlers_resolving_to_sentinels(self):
+        for result, calls, unknown in [(ProtocolLayer.CANNOT_HANDLE, ['first', 'second'], []),
+                                       (ProtocolLayer.NOBODY_CAN_HANDLE, ['first'], [(NAMESPACE, SCRIPTED)])]:
+            future = ManualFuture()
+            processor = ScriptedProcessor(first=future)
+            processor.receive_scripted()
+            future.set_result(result)
+            self.assertEqual((processor.calls, processor.unknown), (calls, unknown))
+
+    def test_pending_handlers_after_pending_handlers(self):
+        first, second = ManualFuture(), ManualFuture()
+        processor = ScriptedProcessor(first=first, second=second)
+        processor.receive_scripted()
+        processor.receive_scripted()
+        first.set_result(ProtocolLayer.CANNOT_HANDLE)
+        self.assertEqual(processor.calls, ['first', 'second'])
+        self.assertEqual(processor._handlers_pending, 1)
+        second.set_result(None)
+        # The waiting message runs once the chain of the first one finishes.
+        self.assertEqual(processor.calls, ['first', 'second', 'first'])
+
+class WritingProcessor(PendingProcessor):
+    """
+    Records the sent frames, and the scheduled callbacks (to be run by the test).
+    """
+
+    LAYERS = [PendingLayer]
+    OUTBOUND_HIGH_WATER = 100
+    OUTBOUND_LOW_WATER = 40
+
+    def __init__(self):
+        super(WritingProcessor, self).__init__()
+        self.sent = []
+        self.scheduled = []
+        self.producers = []
+
+    def _conn_send(self, data, binary=None):
+        self.sent.append(data)
+
+    def _call_later(self, seconds, callback):
+        self.scheduled.append(callback)
+
+    def _on_outbound_paused(self):
+        self.producers.append('paused')
+
+    def _on_outbound_resumed(self):
+        self.producers.append('resumed')
+
+    def run_scheduled(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+    def frames(self):
+        """
+        The values of the messages in each sent frame.
+        """
+        return [[message.args[0] for message in self.TRANSLATOR.parse_data(data, batched=True)]
+                for data in self.sent]
+
+    def send_values(self, *values):
+        for value in values:
+            self.send_message(NAMESPACE, NOTICE, value)
+
+
+class BatchedProcessor(WritingProcessor):
+    LAYERS = [PendingLayer]
+    BATCH_OUTPUT = True
+    BATCH_MAX_SIZE = 2
+    OUTBOUND_OVERFLOW = MessageProcessor.OVERFLOW_DROP
+
+
+class OutboundBatchingTest(unittest.TestCase):
+
+    def test_messages_are_sent_at_once_without_batching(self):
+        processor = WritingProcessor()
+        processor.send_values(1, 2)
+        self.assertEqual((processor.frames(), processor.scheduled), ([[1], [2]], []))
+
+    def test_batches_are_sent_when_full(self):
+        processor = BatchedProcessor()
+        processor.BATCH_MAX_SIZE = 3
+        processor.send_values(1, 2)
+        self.assertEqual(processor.sent, [])
+        processor.send_values(3, 4)
+        self.assertEqual(processor.frames(), [[1, 2, 3]])
+        self.assertEqual(len(processor.scheduled), 1)
+
+    def test_batches_are_sent_when_scheduled(self):
+        processor = BatchedProcessor()
+        processor.BATCH_MAX_SIZE = 3
+        processor.send_values(1)
+        processor.run_scheduled()
+        processor.send_values(2, 3)
+        processor.run_scheduled()
+        processor.run_scheduled()
+        # A single message is sent as is, and nothing is sent when nothing is pending.
+        self.assertEqual(processor.frames(), [[1], [2, 3]])
+        self.assertEqual(processor.sent[0], processor.TRANSLATOR.serialize(Message(NAMESPACE, NOTICE, 1)))
+
+    def test_batches_are_flushed_on_demand(self):
+        processor = BatchedProcessor()
+        processor.BATCH_MAX_SIZE = 3
+        processor.send_values(1, 2)
+        processor.flush_outbox()
+        processor.flush_outbox()
+        processor.send_values(3)
+        processor.terminate()
+        self.assertEqual(processor.frames(), [[1, 2], [3]])
+        self.assertEqual(processor.closed, 1000)
+
+    def test_batches_are_flushed_before_a_forceful_close(self):
+        processor = BatchedProcessor()
+        processor.send_values(1)
+        processor._close_invalid_format('?')
+        self.assertEqual((processor.frames(), processor.closed), ([[1]], 1003))
+
+
+class SendMessageTest(unittest.TestCase):
+
+    def sent(self, processor):
+        return [processor.TRANSLATOR.parse_data(data) for data in processor.sent]
+
+    def test_messages_are_sent(self):
+        processor = WritingProcessor()
+        processor.send_message(Message(NAMESPACE, NOTICE, 1, to='room'))
+        message, = self.sent(processor)
+        self.assertEqual((message.code, message.args, message.kwargs), ((NAMESPACE, NOTICE), (1,), {'to': 'room'}))
+
+    def test_messages_are_built(self):
+        processor = WritingProcessor()
+        processor.send_message(NAMESPACE, NOTICE, 1, result='ok', message='hello')
+        message, = self.sent(processor)
+        self.assertEqual((message.code, message.args, message.kwargs),
+                         ((NAMESPACE, NOTICE), (1,), {'result': 'ok', 'message': 'hello'}))
+
+    def test_messages_take_no_further_arguments(self):
+        processor = WritingProcessor()
+        self.assertRaises(TypeError, processor.send_message, Message(NAMESPACE, NOTICE), 1)
+        self.assertRaises(TypeError, processor.send_message, Message(NAMESPACE, NOTICE), to='room')
+        self.assertEqual(processor.sent, [])
+
+
+class OutboundBackpressureTest(unittest.TestCase):
+
+    def test_data_is_queued_while_writes_are_paused(self):
+        processor = WritingProcessor()
+        processor._conn_write_paused()
+        processor.send_values(1, 2)
+        self.assertEqual(processor.sent, [])
+        self.assertEqual(processor.outbound_bytes, sum(len(data) for data, _, _ in processor._outbound))
+        processor._conn_write_resumed()
+        processor.send_values(3)
+        self.assertEqual((processor.frames(), processor.outbound_bytes), ([[1], [2], [3]], 0))
+
+    def test_queued_data_keeps_its_order(self):
+        processor = WritingProcessor()
+        processor._conn_write_paused()
+        processor.send_values(1)
+        processor._write_paused = False
+        # Not written before the queued data, even when the transport accepts data again.
+        processor.send_values(2)
+        self.assertEqual(processor.sent, [])
+        processor._conn_write_resumed()
+        self.assertEqual(processor.frames(), [[1], [2]])
+
+    def test_overflow_closes_the_connection(self):
+        processor = WritingProcessor()
+        processor._conn_write_paused()
+        processor.send_values(*['x' * 20] * 5)
+        self.assertEqual(processor.closed, processor.OUTBOUND_CLOSE_CODE)
+        self.assertEqual(processor.outbound_bytes, 0)
+        processor._conn_write_resumed()
+        processor.send_values('y')
+        self.assertEqual(processor.sent, [])
+
+    def test_overflow_drops_the_oldest_droppable_messages(self):
+        processor = WritingProcessor()
+        processor.OUTBOUND_OVERFLOW = processor.OVERFLOW_DROP
+        processor.OUTBOUND_DROPPABLE = frozenset([Message(NAMESPACE, NOTICE).code])
+        processor._conn_write_paused()
+        processor.send_values(*range(5))
+        self.assertIsNone(processor.closed)
+        self.assertGreater(processor.outbound_dropped, 0)
+        self.assertLessEqual(processor.outbound_bytes, processor.OUTBOUND_HIGH_WATER)
+        processor._conn_write_resumed()
+        self.assertEqual(sum(processor.frames(), []), list(range(processor.outbound_dropped, 5)))
+
+    def test_overflow_pauses_the_producers(self):
+        processor = WritingProcessor()
+        processor.OUTBOUND_OVERFLOW = processor.OVERFLOW_PAUSE
+        processor._conn_write_paused()
+        processor.send_values(*['x' * 20] * 5)
+        self.assertIsNone(processor.closed)
+        self.assertTrue(processor.outbound_paused and processor.paused)
+        self.assertEqual(processor.producers, ['paused'])
+        processor.send_values('x' * 20)
+        self.assertEqual(processor.producers, ['paused'])
+        processor._conn_write_resumed()
+        self.assertFalse(processor.outbound_paused or processor.paused)
+        self.assertEqual((processor.producers, len(processor.sent)), (['paused', 'resumed'], 6))
+
+    def test_producers_stay_paused_above_the_low_water_mark(self):
+        processor = WritingProcessor()
+        processor.OUTBOUND_OVERFLOW = processor.OVERFLOW_PAUSE
+        processor._conn_write_paused()
+        processor.send_values(*['x' * 20] * 5)
+        sent = []
+
+        def send(data, binary=None):
+            sent.append(data)
+            if len(sent) == 2:
+                processor._conn_write_paused()
+
+        processor._conn_send = send
+        processor._conn_write_resumed()
+        self.assertGreater(processor.outbound_bytes, processor.OUTBOUND_LOW_WATER)
+        self.assertTrue(processor.outbound_paused)
+        processor._conn_write_resumed()
+        self.assertFalse(processor.outbound_paused)
+
+
+class OutboundDropTest(unittest.TestCase):
+
+    def send(self, processor, code, count):
+        for index in range(count):
+            processor.send_message(NAMESPACE, code, 'x' * 20)
+
+    def test_batches_of_droppable_commands_are_dropped(self):
+        processor = BatchedProcessor()
+        processor.OUTBOUND_DROPPABLE = frozenset([Message(NAMESPACE, NOTICE).code])
+        processor._conn_write_paused()
+        self.send(processor, NOTICE, 10)
+        self.assertIsNone(processor.closed)
+        self.assertGreater(processor.outbound_dropped, 0)
+        self.assertEqual(processor.outbound_dropped % 2, 0)
+        self.assertLessEqual(processor.outbound_bytes, processor.OUTBOUND_HIGH_WATER)
+
+    def test_batches_having_other_commands_are_kept(self):
+        processor = BatchedProcessor()
+        processor.OUTBOUND_DROPPABLE = frozenset([Message(NAMESPACE, NOTICE).code])
+        processor._conn_write_paused()
+        for index in range(5):
+            self.send(processor, NOTICE, 1)
+            self.send(processor, COMMAND, 1)
+        self.assertEqual(processor.outbound_dropped, 0)
+        self.assertEqual(processor.closed, processor.OUTBOUND_CLOSE_CODE)
+
+
+class RecordingLayer(ProtocolLayer):
+    """
+    Its handler records the value of each message.
+    """
+
+    def __init__(self, processor_class):
+        super(RecordingLayer, self).__init__(processor_class)
+        self.add_command_handler(NAMESPACE, COMMAND, self._run)
+
+    def _run(self, socket, message):
+        socket.handled.append(message.args[0])
+
+
+class BatchInputProcessor(PendingProcessor):
+    LAYERS = [RecordingLayer]
+    BATCH_INPUT = True
+
+    def __init__(self, strict=True):
+        super(BatchInputProcessor, self).__init__()
+        self.strict = strict
+
+    def serialize(self, value):
+        """
+        Serializes a message for the value, or a message of an unknown command for None.
+        """
+        message = Message(NAMESPACE, MISSING) if value is None else Message(NAMESPACE, COMMAND, value)
+        return self.TRANSLATOR.serialize(message)
+
+    def receive_single(self, value):
+        return self._conn_message(self.serialize(value), self.TRANSLATOR.format != Formats.FORMAT_STRING)
+
+    def frame(self, *values):
+        """
+        Receives a frame carrying an array with a message for each value.
+        """
+        data = self.TRANSLATOR.serialize_batch([self.serialize(value) for value in values])
+        return self._conn_message(data, self.TRANSLATOR.format != Formats.FORMAT_STRING)
+
+
+class CompactBatchInputProcessor(BatchInputProcessor):
+    TRANSLATOR = CompactTranslator
+    LAYERS = [RecordingLayer]
+
+
+class InboundBatchingTest(unittest.TestCase):
+
+    PROCESSORS = (BatchInputProcessor, CompactBatchInputProcessor)
+
+    def test_messages_are_dispatched_in_order(self):
+        for processor_class in self.PROCESSORS:
+            processor = processor_class()
+            self.assertTrue(processor.frame(1, 2, 3))
+            self.assertEqual(processor.handled, [1, 2, 3])
+            self.assertIsNone(processor.closed)
+
+    def test_single_messages_are_still_accepted(self):
+        for processor_class in self.PROCESSORS:
+            processor = processor_class()
+            self.assertTrue(processor.receive_single(1))
+            self.assertEqual(processor.handled, [1])
+
+    def test_empty_arrays_dispatch_nothing(self):
+        for processor_class in self.PROCESSORS:
+            processor = processor_class()
+            self.assertTrue(processor.frame())
+            self.assertEqual((processor.handled, processor.closed), ([], None))
+
+    def test_a_bad_element_closes_like_a_bad_message(self):
+        for processor_class in self.PROCESSORS:
+            single = processor_class()
+            self.assertFalse(single.receive_single(None))
+            batched = processor_class()
+            self.assertFalse(batched.frame(1, None, 3))
+            # The messages before the bad one were dispatched, and the ones after it were not.
+            self.assertEqual(batched.handled, [1])
+            self.assertEqual(batched.closed, single.closed)
+            self.assertEqual(batched.closed, 1003)
+
+    def test_bad_elements_are_skipped_when_not_strict(self):
+        for processor_class in self.PROCESSORS:
+            processor = processor_class(strict=False)
+            self.assertTrue(processor.frame(1, None, 3))
+            self.assertEqual((processor.handled, processor.closed), ([1, 3], None))
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self, logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class ProtocolViolationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("cantrips.protocol.message.processor")
+        self.handler = RecordingHandler()
+        self.level = self.logger.level
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+
+    def test_lazy_arguments_are_not_decoded_to_be_logged(self):
+        loads = []
+
+        def loader():
+            loads.append(None)
+            return ('hello',), {}
+
+        processor = PendingProcessor()
+        processor._close_protocol_violation(LazyMessage.from_loader((NAMESPACE, NOTICE), loader))
+        self.assertEqual(loads, [])
+        self.assertEqual(processor.closed, 1002)
+        self.assertIn(repr((NAMESPACE, NOTICE)), self.handler.messages[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from cantrips.protocol.cluster.bus import LocalBus
+from cantrips.protocol.messaging.formats import JSONTranslator
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.traits.user.base import UserEndpoint, UserEndpointList
+from cantrips.protocol.traits.user.sharding import ShardedMasterBroadcast, ShardedSlaveBroadcast
+
+
+class User(UserEndpoint):
+
+    def slaves(self):
+        return {}
+
+
+class UserList(UserEndpointList):
+
+    @classmethod
+    def endpoint_class(cls):
+        return User
+
+
+class Master(ShardedMasterBroadcast):
+
+    @classmethod
+    def endpoint_list(cls):
+        return UserList()
+
+
+class Slave(ShardedSlaveBroadcast):
+
+    def _command_is_allowed_join(self, socket):
+        return self._result_allow('ok')
+
+
+class Socket(object):
+    """
+    Records the commands of the messages sent to it, either serialized or not.
+    """
+
+    TRANSLATOR = JSONTranslator()
+
+    def __init__(self):
+        self.received = []
+
+    def send_message(self, *args, **kwargs):
+        self.received.append(Message(*args, **kwargs).code)
+
+    def send_raw(self, data, command=None):
+        self.received.append(command)
+
+    def take(self):
+        received, self.received = self.received, []
+        return received
+
+
+class ShardedBroadcastTest(unittest.TestCase):
+
+    def setUp(self):
+        self.masters = [Master('chat', Slave, bus=bus) for bus in LocalBus.group(2)]
+        self.sockets = [Socket(), Socket()]
+        for index, (master, socket) in enumerate(zip(self.masters, self.sockets)):
+            master.auth_set(socket, end_point=master.register('user-%d' % index, socket))
+        # A slave owned by the second node.
+        self.key = next(key for key in ('room-%d' % index for index in range(100))
+                        if self.masters[0].owner(key) == 1)
+
+    def members(self, node):
+        return sorted(key for key, user in self.masters[node].slaves[self.key].users().items())
+
+    def join_all(self):
+        self.masters[0].slave_register(self.key)
+        for master, socket in zip(self.masters, self.sockets):
+            master.forward(socket, self.key).command_join()
+        for socket in self.sockets:
+            socket.take()
+
+    def test_slaves_are_created_in_their_owner(self):
+        self.assertIsNone(self.masters[0].slave_register(self.key))
+        self.assertNotIn(self.key, self.masters[0].slaves)
+        self.assertIn(self.key, self.masters[1].slaves)
+
+    def test_forwarded_commands_run_in_the_owner(self):
+        self.masters[0].slave_register(self.key)
+        self.masters[0].forward(self.sockets[0], self.key).command_join()
+        self.assertEqual(self.members(1), ['user-0'])
+        response = (Slave.formatted('CHANNEL_RESPONSE_NS'), Slave.formatted('CHANNEL_RESPONSE_CODE_RESPONSE'))
+        self.assertEqual(self.sockets[0].take(), [response])
+
+    def test_unknown_slaves_are_reported(self):
+        self.masters[0].forward(self.sockets[0], self.key).command_join()
+        self.assertEqual(len(self.sockets[0].take()), 1)
+        self.assertNotIn(self.key, self.masters[1].slaves)
+
+    def test_broadcasts_are_relayed_to_other_nodes(self):
+        self.join_all()
+        self.assertEqual(self.members(1), ['user-0', 'user-1'])
+        self.masters[1].slaves[self.key].broadcast(('room', 'said'), message='hello')
+        self.assertEqual(self.sockets[0].take(), [('room', 'said')])
+        self.assertEqual(self.sockets[1].take(), [('room', 'said')])
+
+    def test_removed_nodes_give_their_slaves_and_members(self):
+        self.join_all()
+        for master in self.masters:
+            master.remove_node(1)
+        self.assertNotIn(self.key, self.masters[1].slaves)
+        self.assertEqual(self.members(0), ['user-0', 'user-1'])
+        # Members are moved silently: neither parted nor joined.
+        self.assertEqual((self.sockets[0].take(), self.sockets[1].take()), ([], []))
+        self.masters[0].slaves[self.key].broadcast(('room', 'said'), message='hello')
+        self.assertEqual(self.sockets[0].take(), [('room', 'said')])
+        self.assertEqual(self.sockets[1].take(), [('room', 'said')])
+
+    def test_logged_out_users_leave_remote_slaves(self):
+        self.join_all()
+        self.masters[0].unregister(self.masters[0].users()['user-0'])
+        self.assertEqual(self.members(1), ['user-1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
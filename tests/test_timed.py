@@ -0,0 +1,155 @@
+import random
+import threading
+import unittest
+from cantrips.task.scheduler import TimerService
+from cantrips.task.timed import AsyncioTimeout, ThreadedTimeout, TimingWheel, WheelEntry
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+class ManualTimingWheel(TimingWheel):
+    """
+    A wheel with a clock moved by the test: its timer is kept as a (deadline, callback) pair.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.now = 0.0
+        self.timer = None
+        super(ManualTimingWheel, self).__init__(*args, **kwargs)
+
+    def _now(self):
+        return self.now
+
+    def _start_timer(self, seconds, callback):
+        self.timer = (self.now + seconds, callback)
+        return self.timer
+
+    def _stop_timer(self, timer):
+        self.timer = None
+
+    def run_until(self, now):
+        """
+        Runs the timer of the wheel while it is due by the given time.
+        """
+        while self.timer is not None and self.timer[0] <= now:
+            self.now, callback = self.timer
+            self.timer = None
+            callback()
+        self.now = now
+
+
+class TimingWheelTest(unittest.TestCase):
+
+    def test_entries_fire_on_time(self):
+        for trial in range(200):
+            rng = random.Random(trial)
+            wheel = ManualTimingWheel(resolution=1.0, slots=rng.choice([2, 4, 8]), levels=rng.choice([1, 2, 3]))
+            pending, wrong = {}, []
+
+            def fire(entry):
+                # Errors raised by callbacks are logged by the wheel: they are collected instead.
+                expected = pending.pop(entry)
+                if not expected - 1e-9 <= wheel.now <= expected + wheel.resolution + 1e-9:
+                    wrong.append((expected, wheel.now))
+
+            for step in range(200):
+                choice = rng.random()
+                if choice < 0.4:
+                    entry = WheelEntry()
+                    entry.callback = (lambda entry=entry: fire(entry))
+                    seconds = rng.uniform(0, 100)
+                    pending[entry] = wheel.now + seconds
+                    wheel.schedule(entry, seconds)
+                elif choice < 0.5 and pending:
+                    entry = rng.choice(list(pending))
+                    wheel.cancel(entry)
+                    del pending[entry]
+                else:
+                    wheel.run_until(wheel.now + rng.uniform(0, 5))
+            wheel.run_until(wheel.now + 1000)
+            self.assertEqual(wrong, [])
+            self.assertEqual(pending, {})
+            self.assertEqual(len(wheel), 0)
+
+    def test_single_level_does_not_fire_early(self):
+        wheel = ManualTimingWheel(resolution=1.0, slots=4, levels=1)
+        fired = []
+        wheel.schedule(WheelEntry(lambda: fired.append(wheel.now)), 10)
+        wheel.run_until(9)
+        self.assertEqual(fired, [])
+        wheel.run_until(11)
+        self.assertEqual(fired, [10])
+
+    def test_failing_callback_does_not_drop_its_siblings(self):
+        wheel = ManualTimingWheel(resolution=1.0, slots=4, levels=2)
+        fired = []
+
+        def fail():
+            raise ValueError("failing callback")
+
+        wheel.schedule(WheelEntry(fail), 2)
+        wheel.schedule(WheelEntry(lambda: fired.append(wheel.now)), 2)
+        wheel.schedule(WheelEntry(lambda: fired.append(wheel.now)), 5)
+        wheel.run_until(10)
+        self.assertEqual(fired, [2, 5])
+        self.assertEqual(len(wheel), 0)
+
+
+class ThreadedTimeoutTest(unittest.TestCase):
+
+    def test_timeouts_run_in_the_given_service(self):
+        service = TimerService(name='test-timers')
+        reached = threading.Event()
+        timeout = ThreadedTimeout(0.01, lambda timeout, forced: reached.set(), service)
+        timeout.start()
+        self.assertEqual(len(service), 1)
+        self.assertTrue(reached.wait(5))
+        self.assertEqual(service.fired, 1)
+        service.stop()
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class AsyncioTimeoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.reached = []
+
+    def timeout(self, seconds):
+        return AsyncioTimeout(self.loop, seconds, lambda timeout, forced: self.reached.append(forced))
+
+    def run_for(self, seconds):
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def test_timeout_is_reached(self):
+        timeout = self.timeout(0.01)
+        timeout.start()
+        self.assertRaises(AsyncioTimeout.Error, timeout.start)
+        self.run_for(0.05)
+        self.assertEqual(self.reached, [False])
+
+    def test_forced_stop_cancels_the_timer(self):
+        timeout = self.timeout(0.01)
+        timeout.start()
+        timeout.force_stop()
+        self.assertEqual(self.reached, [True])
+        self.run_for(0.05)
+        self.assertEqual(self.reached, [True])
+        self.assertRaises(AsyncioTimeout.Error, timeout.force_stop)
+
+    def test_timeout_is_restarted_after_reset(self):
+        timeout = self.timeout(0.01)
+        timeout.start()
+        self.run_for(0.05)
+        timeout.reset()
+        timeout.start()
+        self.run_for(0.05)
+        self.assertEqual(self.reached, [False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from cantrips.task.toll import Toll, AsyncioFuturesToll
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class AsyncioFuturesTollTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.toll = AsyncioFuturesToll(loop=self.loop)
+
+    def assertError(self, code, method, *args):
+        with self.assertRaises(Toll.Error) as context:
+            method(*args)
+        self.assertEqual(context.exception.code, code)
+
+    def test_demand_waits_for_the_supplied_value(self):
+        self.assertFalse(self.toll.demanding())
+        demand = self.toll.demand()
+        self.assertIs(demand.get_loop(), self.loop)
+        self.assertTrue(self.toll.demanding())
+        self.loop.call_later(0.01, self.toll.supply, 'value')
+        self.assertEqual(self.loop.run_until_complete(asyncio.wait_for(demand, 5)), 'value')
+        self.assertFalse(self.toll.demanding())
+
+    def test_demands_and_supplies_must_alternate(self):
+        self.assertError(Toll.Error.NOT_DEMANDING, self.toll.supply, 'value')
+        self.toll.demand()
+        self.assertError(Toll.Error.ALREADY_DEMANDING, self.toll.demand)
+        self.toll.supply('value')
+        self.assertIsNotNone(self.toll.demand())
+
+
+if __name__ == '__main__':
+    unittest.main()
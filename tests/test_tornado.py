@@ -0,0 +1,216 @@
+import unittest
+from cantrips.protocol.messaging.formats import JSONTranslator
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.messaging.metrics import MemorySink
+from cantrips.protocol.traits.decorators.offload import OffloadPool
+from tests import ECHO_NS, ECHO, BURST, BYE, UNKNOWN, SQUARE, EchoLayer, OffloadLayer
+
+try:
+    from tornado.gen import Return, coroutine, sleep
+    from tornado.testing import AsyncHTTPTestCase, gen_test
+    from tornado.web import Application
+    from tornado.websocket import websocket_connect
+    from cantrips.protocol.tornado.websocket_server import MessageHandler
+except ImportError:
+    MessageHandler = None
+    AsyncHTTPTestCase = unittest.TestCase
+    gen_test = coroutine = lambda method: method
+
+
+if MessageHandler is not None:
+
+    class EchoHandler(MessageHandler):
+        TRANSLATOR = JSONTranslator
+        LAYERS = [EchoLayer]
+        opened = []
+
+        def open(self):
+            super(EchoHandler, self).open()
+            self.opened.append(self)
+
+    class BatchedEchoHandler(EchoHandler):
+        LAYERS = [EchoLayer]
+        BATCH_OUTPUT = True
+        BATCH_MAX_SIZE = 2
+
+    class CompressedEchoHandler(EchoHandler):
+        LAYERS = [EchoLayer]
+        COMPRESSION = True
+
+    class OffloadHandler(EchoHandler):
+        LAYERS = [OffloadLayer]
+
+    class IdleEchoHandler(EchoHandler):
+        LAYERS = [EchoLayer]
+        IDLE_TIMEOUT = 0.2
+        idle = []
+
+        def _on_idle(self):
+            self.idle.append(self)
+
+    class KeepaliveEchoHandler(IdleEchoHandler):
+        LAYERS = [EchoLayer]
+        KEEPALIVE_INTERVAL = 0.1
+        IDLE_TIMEOUT = 0.3
+
+
+@unittest.skipIf(MessageHandler is None, "Tornado is not installed")
+class MessageHandlerTest(AsyncHTTPTestCase):
+
+    def get_app(self):
+        EchoHandler.opened = []
+        IdleEchoHandler.idle = []
+        IdleEchoHandler.METRICS_SINK = MemorySink()
+        KeepaliveEchoHandler.METRICS_SINK = MemorySink()
+        return Application([
+            (r'/echo', EchoHandler),
+            (r'/strict', EchoHandler, {'strict': True}),
+            (r'/batched', BatchedEchoHandler),
+            (r'/compressed', CompressedEchoHandler),
+            (r'/offload', OffloadHandler),
+            (r'/batched-strict', BatchedEchoHandler, {'strict': True}),
+            (r'/idle', IdleEchoHandler),
+            (r'/keepalive', KeepaliveEchoHandler),
+        ])
+
+    def connect(self, path, **kwargs):
+        return websocket_connect('ws://127.0.0.1:%d%s' % (self.get_http_port(), path), **kwargs)
+
+    def count_decompressed(self, client):
+        """
+        Counts the messages the client decompresses.
+        """
+        decompressed = []
+        decompressor = client.protocol._decompressor
+        decompress = decompressor.decompress
+
+        def counting(data, *args, **kwargs):
+            decompressed.append(data)
+            return decompress(data, *args, **kwargs)
+
+        decompressor.decompress = counting
+        return decompressed
+
+    @coroutine
+    def echo_compressed(self):
+        """
+        Echoes a small and a large message through a compressed connection.
+        :returns: The count of messages the client decompressed, and the stats of the server.
+        """
+        client = yield self.connect('/compressed', compression_options={})
+        decompressed = self.count_decompressed(client)
+        for value in ('hi', 'x' * 1000):
+            client.write_message(self.serialize(ECHO, value))
+            reply = yield client.read_message()
+            self.assertEqual([message.args for message in self.parse(reply)], [(value,)])
+        client.close()
+        raise Return((len(decompressed), EchoHandler.opened[0].compression_stats))
+
+    def serialize(self, code, *args):
+        return EchoHandler.TRANSLATOR.serialize(Message(ECHO_NS, code, *args))
+
+    def parse(self, data):
+        return EchoHandler.TRANSLATOR.parse_data(data, False, batched=True)
+
+    @gen_test
+    def test_echo(self):
+        client = yield self.connect('/echo')
+        client.write_message(self.serialize(ECHO, 'hello'))
+        reply = yield client.read_message()
+        self.assertEqual([message.args for message in self.parse(reply)], [('hello',)])
+        client.close()
+
+    @gen_test
+    def test_terminate_closes_the_socket(self):
+        client = yield self.connect('/echo')
+        client.write_message(self.serialize(ECHO, 'hello'))
+        yield client.read_message()
+        EchoHandler.opened[0].terminate()
+        self.assertIsNone((yield client.read_message()))
+        self.assertEqual(client.close_code, 1000)
+
+    @gen_test
+    def test_close_connection_closes_the_socket(self):
+        client = yield self.connect('/echo')
+        client.write_message(self.serialize(BYE))
+        reply = yield client.read_message()
+        self.assertEqual(self.parse(reply)[0].code[1], BYE)
+        self.assertIsNone((yield client.read_message()))
+        self.assertEqual(client.close_code, 1000)
+
+    @gen_test
+    def test_forceful_close_closes_the_socket(self):
+        client = yield self.connect('/strict')
+        client.write_message(self.serialize(UNKNOWN))
+        self.assertIsNone((yield client.read_message()))
+        self.assertEqual(client.close_code, 1002)
+
+    @gen_test
+    def test_messages_are_compressed(self):
+        decompressed, stats = yield self.echo_compressed()
+        # Tornado compresses every message, and they cannot be told apart.
+        self.assertEqual(decompressed, 2)
+        self.assertEqual((stats.messages, stats.compressed_messages), (2, 0))
+
+    @gen_test
+    def test_offloaded_results_are_sent_in_order(self):
+        pool = OffloadLayer.OFFLOAD_POOL = OffloadPool(workers=2)
+        self.addCleanup(pool.shutdown)
+        client = yield self.connect('/offload')
+        client.write_message(self.serialize(SQUARE, 3))
+        client.write_message(self.serialize(SQUARE, 4))
+        client.write_message(self.serialize(ECHO, 'after'))
+        replies = []
+        for index in range(3):
+            replies.extend(message.args for message in self.parse((yield client.read_message())))
+        self.assertEqual(replies, [(9,), (16,), ('after',)])
+        self.assertEqual((pool.submitted, pool.completed, pool.failed), (2, 2, 0))
+        self.assertEqual((pool.pending, pool.queue_depth), (0, 0))
+        self.assertEqual((pool.wait_time.count, pool.run_time.count), (2, 2))
+        client.close()
+
+    @gen_test
+    def test_batched_messages_are_flushed(self):
+        client = yield self.connect('/batched')
+        client.write_message(self.serialize(BURST, 3))
+        first = yield client.read_message()
+        second = yield client.read_message()
+        self.assertEqual([message.args for message in self.parse(first)], [(0,), (1,)])
+        self.assertEqual([message.args for message in self.parse(second)], [(2,)])
+        client.close()
+
+    @gen_test
+    def test_batched_messages_are_flushed_before_closing(self):
+        client = yield self.connect('/batched-strict')
+        client.write_message(self.serialize(BYE))
+        reply = yield client.read_message()
+        self.assertEqual(self.parse(reply)[0].code[1], BYE)
+        self.assertIsNone((yield client.read_message()))
+        self.assertEqual(client.close_code, 1000)
+        client = yield self.connect('/batched-strict')
+        client.write_message(self.serialize(UNKNOWN))
+        self.assertIsNone((yield client.read_message()))
+        self.assertEqual(client.close_code, 1002)
+
+    @gen_test
+    def test_idle_connection_is_reaped(self):
+        client = yield self.connect('/idle')
+        self.assertIsNone((yield client.read_message()))
+        self.assertEqual(client.close_code, 1000)
+        self.assertEqual(len(IdleEchoHandler.idle), 1)
+        self.assertEqual(IdleEchoHandler.METRICS_SINK.errors, {1001: 1})
+
+    @gen_test
+    def test_pinged_connection_is_kept(self):
+        client = yield self.connect('/keepalive')
+        yield sleep(0.6)
+        client.write_message(self.serialize(ECHO, 'hello'))
+        reply = yield client.read_message()
+        self.assertEqual([message.args for message in self.parse(reply)], [('hello',)])
+        self.assertEqual(KeepaliveEchoHandler.idle, [])
+        self.assertEqual(KeepaliveEchoHandler.METRICS_SINK.errors, {})
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
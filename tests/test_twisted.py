@@ -0,0 +1,275 @@
+import unittest
+from cantrips.protocol.messaging.formats import JSONTranslator, Translator
+from cantrips.protocol.messaging.framing import LengthPrefixedDecoder
+from cantrips.protocol.messaging.messages import Message
+from cantrips.protocol.messaging.metrics import MemorySink
+from cantrips.protocol.traits.decorators.offload import OffloadPool
+from tests import ECHO_NS, ECHO, PING, SQUARE, EchoLayer, OffloadLayer
+
+try:
+    from twisted.internet import reactor
+    from twisted.internet.defer import Deferred, inlineCallbacks
+    from twisted.internet.endpoints import TCP4ClientEndpoint, connectProtocol
+    from twisted.internet.protocol import Factory, Protocol
+    from twisted.internet.task import deferLater
+    from twisted.trial.unittest import TestCase
+    from cantrips.protocol.twisted.server import MessageProtocol
+except ImportError:
+    MessageProtocol = None
+    Protocol = object
+    TestCase = unittest.TestCase
+    inlineCallbacks = lambda method: method
+
+try:
+    from autobahn.twisted.websocket import WebSocketClientFactory, WebSocketClientProtocol, WebSocketServerFactory
+    from autobahn.websocket.compress import PerMessageDeflateOffer, PerMessageDeflateResponseAccept
+    from cantrips.protocol.twisted.websocket_server import MessageProtocol as WebSocketMessageProtocol
+except ImportError:
+    WebSocketMessageProtocol = None
+
+
+class Tracked(object):
+    """
+    Mixin for the server protocols: tells when they are lost, and records their reaping.
+    """
+
+    IDLE_TIMEOUT = 0.2
+    instances = []
+    idle = []
+
+    def _conn_made(self):
+        self.lost = Deferred()
+        Tracked.instances.append(self)
+        super(Tracked, self)._conn_made()
+
+    def _conn_lost(self):
+        super(Tracked, self)._conn_lost()
+        self.lost.callback(None)
+
+    def _on_idle(self):
+        Tracked.idle.append(self)
+
+
+class KeepaliveTests(object):
+    """
+    Keepalive and reaping tests, run against a live server. Subclasses tell the IDLE and
+      KEEPALIVE server protocols, and connect(protocol_class) a client having a `closed`
+      Deferred.
+    """
+
+    def setUp(self):
+        Tracked.instances = []
+        Tracked.idle = []
+        self.sink = self.IDLE.METRICS_SINK = self.KEEPALIVE.METRICS_SINK = MemorySink()
+
+    @inlineCallbacks
+    def test_idle_connection_is_reaped(self):
+        client = yield self.connect(self.IDLE)
+        yield client.closed
+        yield Tracked.instances[0].lost
+        self.assertEqual(len(Tracked.idle), 1)
+        self.assertEqual(self.sink.errors, {1001: 1})
+
+    @inlineCallbacks
+    def test_pinged_connection_is_kept(self):
+        client = yield self.connect(self.KEEPALIVE)
+        yield deferLater(reactor, 0.6, lambda: None)
+        self.assertFalse(client.closed.called)
+        self.assertEqual(Tracked.idle, [])
+        self.assertEqual(self.sink.errors, {})
+        client.transport.loseConnection()
+        yield client.closed
+        yield Tracked.instances[0].lost
+
+
+class FramedClient(Protocol):
+    """
+    A length-prefixed framing client, answering the keepalive pings with an echo message.
+    """
+
+    translator = None
+
+    def __init__(self):
+        self.decoder = LengthPrefixedDecoder()
+        self.messages = []
+        self.closed = Deferred()
+
+    def dataReceived(self, data):
+        for frame in self.decoder.feed(data):
+            try:
+                message = self.translator.parse_data(frame.tobytes())
+            except Translator.Error:
+                # The {code, reason} frame sent when the connection is closed.
+                continue
+            self.messages.append(message)
+            if message.code[1] == PING:
+                self.send(ECHO, 'pong')
+
+    def send(self, code, *args):
+        data = self.translator.serialize(Message(ECHO_NS, code, *args))
+        self.transport.write(self.decoder.encode(data))
+
+    def connectionLost(self, reason=None):
+        self.closed.callback(None)
+
+
+if MessageProtocol is not None:
+
+    class EchoProtocol(Tracked, MessageProtocol):
+        TRANSLATOR = JSONTranslator
+        LAYERS = [EchoLayer]
+
+    class KeepaliveEchoProtocol(EchoProtocol):
+        LAYERS = [EchoLayer]
+        KEEPALIVE_INTERVAL = 0.1
+        KEEPALIVE_PING = (ECHO_NS, PING)
+        IDLE_TIMEOUT = 0.3
+
+    class OffloadProtocol(EchoProtocol):
+        LAYERS = [OffloadLayer]
+
+    FramedClient.translator = EchoProtocol.TRANSLATOR
+
+
+@unittest.skipIf(MessageProtocol is None, "Twisted is not installed")
+class MessageProtocolTest(KeepaliveTests, TestCase):
+
+    timeout = 5
+
+    if MessageProtocol is not None:
+        IDLE = EchoProtocol
+        KEEPALIVE = KeepaliveEchoProtocol
+
+    def connect(self, protocol_class):
+        port = reactor.listenTCP(0, Factory.forProtocol(protocol_class), interface='127.0.0.1')
+        self.addCleanup(port.stopListening)
+        endpoint = TCP4ClientEndpoint(reactor, '127.0.0.1', port.getHost().port)
+        return connectProtocol(endpoint, FramedClient())
+
+    @inlineCallbacks
+    def test_offloaded_results_are_sent_in_order(self):
+        pool = OffloadLayer.OFFLOAD_POOL = OffloadPool(workers=2)
+        self.addCleanup(pool.shutdown)
+        client = yield self.connect(OffloadProtocol)
+        client.send(SQUARE, 3)
+        client.send(SQUARE, 4)
+        client.send(ECHO, 'after')
+        for attempt in range(100):
+            if len(client.messages) >= 3:
+                break
+            yield deferLater(reactor, 0.01, lambda: None)
+        self.assertEqual([message.args for message in client.messages], [(9,), (16,), ('after',)])
+        self.assertEqual((pool.submitted, pool.completed, pool.failed), (2, 2, 0))
+        self.assertEqual((pool.pending, pool.queue_depth), (0, 0))
+        self.assertEqual((pool.wait_time.count, pool.run_time.count), (2, 2))
+        client.transport.loseConnection()
+        yield client.closed
+        yield Tracked.instances[0].lost
+
+    @inlineCallbacks
+    def test_keepalive_pings_are_sent(self):
+        client = yield self.connect(self.KEEPALIVE)
+        yield deferLater(reactor, 0.35, lambda: None)
+        self.assertTrue([message for message in client.messages if message.code[1] == PING])
+        client.transport.loseConnection()
+        yield client.closed
+        yield Tracked.instances[0].lost
+
+
+if WebSocketMessageProtocol is not None:
+
+    class WebSocketEchoProtocol(Tracked, WebSocketMessageProtocol):
+        TRANSLATOR = JSONTranslator
+        LAYERS = [EchoLayer]
+
+    class KeepaliveWebSocketEchoProtocol(WebSocketEchoProtocol):
+        LAYERS = [EchoLayer]
+        KEEPALIVE_INTERVAL = 0.1
+        IDLE_TIMEOUT = 0.3
+
+    class CompressedWebSocketEchoProtocol(WebSocketEchoProtocol):
+        LAYERS = [EchoLayer]
+        COMPRESSION = True
+
+    class WebSocketClient(WebSocketClientProtocol):
+        """
+        Autobahn answers the keepalive pings by itself. Received messages are recorded, telling
+          whether they were compressed.
+        """
+
+        def __init__(self):
+            WebSocketClientProtocol.__init__(self)
+            self.closed = Deferred()
+            self.received = None
+            self.messages = []
+
+        def onOpen(self):
+            self.factory.opened.callback(self)
+
+        def onMessage(self, payload, isBinary):
+            self.messages.append((payload, self._isMessageCompressed))
+            received, self.received = self.received, None
+            if received is not None:
+                received.callback(payload)
+
+        def send(self, code, *args):
+            self.received = Deferred()
+            self.sendMessage(EchoProtocol.TRANSLATOR.serialize(Message(ECHO_NS, code, *args)).encode('utf-8'))
+            return self.received
+
+        def onClose(self, wasClean, code, reason):
+            self.closed.callback(None)
+
+
+@unittest.skipIf(WebSocketMessageProtocol is None, "Autobahn is not installed")
+class WebSocketMessageProtocolTest(KeepaliveTests, TestCase):
+
+    timeout = 5
+
+    if WebSocketMessageProtocol is not None:
+        IDLE = WebSocketEchoProtocol
+        KEEPALIVE = KeepaliveWebSocketEchoProtocol
+
+    def connect(self, protocol_class, compression=False):
+        server = WebSocketServerFactory(u'ws://127.0.0.1')
+        server.protocol = protocol_class
+        port = reactor.listenTCP(0, server, interface='127.0.0.1')
+        self.addCleanup(port.stopListening)
+        client = WebSocketClientFactory(u'ws://127.0.0.1:%d' % port.getHost().port)
+        client.protocol = WebSocketClient
+        if compression:
+            client.setProtocolOptions(perMessageCompressionOffers=[PerMessageDeflateOffer()],
+                                      perMessageCompressionAccept=PerMessageDeflateResponseAccept)
+        client.opened = Deferred()
+        reactor.connectTCP('127.0.0.1', port.getHost().port, client)
+        return client.opened
+
+    @inlineCallbacks
+    def test_only_large_messages_are_compressed(self):
+        client = yield self.connect(CompressedWebSocketEchoProtocol, compression=True)
+        for value in ('hi', 'x' * 1000):
+            reply = yield client.send(ECHO, value)
+            self.assertEqual(EchoProtocol.TRANSLATOR.parse_data(reply.decode('utf-8')).args, (value,))
+        self.assertEqual([compressed for payload, compressed in client.messages], [False, True])
+        stats = Tracked.instances[0].compression_stats
+        self.assertEqual((stats.messages, stats.compressed_messages), (2, 1))
+        self.assertGreater(stats.compressed_input_bytes, 1000)
+        self.assertLess(stats.compressed_output_bytes, stats.compressed_input_bytes)
+        client.transport.loseConnection()
+        yield client.closed
+        yield Tracked.instances[0].lost
+
+    @inlineCallbacks
+    def test_compression_is_not_forced(self):
+        client = yield self.connect(CompressedWebSocketEchoProtocol)
+        yield client.send(ECHO, 'x' * 1000)
+        self.assertEqual([compressed for payload, compressed in client.messages], [False])
+        stats = Tracked.instances[0].compression_stats
+        self.assertEqual((stats.messages, stats.compressed_messages), (1, 0))
+        client.transport.loseConnection()
+        yield client.closed
+        yield Tracked.instances[0].lost
+
+
+if __name__ == '__main__':
+    unittest.main()